@@ -61,14 +61,17 @@ INSTALLED_APPS = [
     'notices',
     'calendarapp',
     'classrooms',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'accounts.middleware.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -165,7 +168,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -185,14 +188,57 @@ LOGOUT_REDIRECT_URL = '/ui/login'
 
 # Database configuration - using MySQL
 
+# API 令牌：有效期（小时，0 为不过期）与认证缓存时间（秒）
+TOKEN_EXPIRE_HOURS = int(os.getenv('TOKEN_EXPIRE_HOURS', '720'))
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', '60'))
+
+# 缓存：会话、令牌认证、身份（Principal）与考勤范围缓存的失效都依赖各进程看到同一份缓存，
+# 多进程部署（如 gunicorn 多个 worker）必须使用共享缓存：
+# 设置 REDIS_URL 时使用 Redis（需 pip install redis），否则使用数据库缓存表（需执行 createcachetable）；
+# 仅 DEBUG 下的单进程开发服务器使用进程内缓存
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+elif DEBUG:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'}}
+
 # Session security
+# 30 分钟滑动过期：会话先读共享缓存再读数据库，剩余有效期低于 SESSION_RENEW_FRACTION 时才续期写入
+SESSION_ENGINE = 'accounts.sessions'
+SESSION_CACHE_ALIAS = 'default'
 SESSION_COOKIE_AGE = 30 * 60
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_RENEW_FRACTION = float(os.getenv('SESSION_RENEW_FRACTION', '0.5'))
 
 # 学期配置
 SEMESTER_START_DATE = os.getenv('SEMESTER_START_DATE', '2024-09-01')  # 学期开始日期（格式：YYYY-MM-DD），默认为9月1日
 SEMESTER_TOTAL_WEEKS = int(os.getenv('SEMESTER_TOTAL_WEEKS', '20'))  # 学期总周数
 
+# 考勤配置
+# 虚拟默认考勤：没有考勤记录即视为"正常"，只存储迟到/缺勤/请假等异常记录（默认关闭）
+# 启用后可执行 python manage.py prune_default_attendance 清理已存储的默认记录
+ATTENDANCE_VIRTUAL_DEFAULT = os.getenv('ATTENDANCE_VIRTUAL_DEFAULT', 'False').lower() == 'true'
+# 学生自助签到：签到码轮换周期（秒）、上课后多少分钟算迟到、写入队列容量/批量/间隔（秒）
+CHECKIN_CODE_WINDOW = int(os.getenv('CHECKIN_CODE_WINDOW', '60'))
+CHECKIN_LATE_MINUTES = int(os.getenv('CHECKIN_LATE_MINUTES', '10'))
+CHECKIN_QUEUE_SIZE = int(os.getenv('CHECKIN_QUEUE_SIZE', '10000'))
+CHECKIN_BATCH_SIZE = int(os.getenv('CHECKIN_BATCH_SIZE', '500'))
+CHECKIN_FLUSH_INTERVAL = float(os.getenv('CHECKIN_FLUSH_INTERVAL', '0.2'))
+
+# 操作日志异步写入：队列容量、每批条数、刷新间隔（秒）、排队超过多少秒计为延迟写入
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv('AUDIT_LOG_QUEUE_SIZE', '10000'))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', '500'))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', '1.0'))
+AUDIT_LOG_LATE_SECONDS = float(os.getenv('AUDIT_LOG_LATE_SECONDS', '5'))
+
+# 后台导入/导出任务：工作线程数与上传暂存、导出结果目录
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_STORAGE_DIR = os.getenv('JOB_STORAGE_DIR', str(BASE_DIR / 'job_files'))
+# 导出结果文件保留时长（小时），过期后由 manage.py purge_job_files 删除
+JOB_RESULT_RETENTION_HOURS = int(os.getenv('JOB_RESULT_RETENTION_HOURS', '24'))
+
 CSRF_TRUSTED_ORIGINS = [
     'http://172.18.150.222:8080',
     'https://edu.李钧宇.com/',
@@ -50,5 +50,6 @@ urlpatterns = [
     path('api/grades/', include('grades.urls')),
     path('api/notices/', include('notices.urls')),
     path('api/calendar/', include('calendarapp.urls')),
+    path('api/jobs/', include('jobs.urls')),
     path('api-auth/', include('rest_framework.urls')),
 ]
@@ -1,10 +1,12 @@
 from django.shortcuts import render, redirect
 from django.db.models import Count
 from accounts.models import UserProfile, StudentProfile, TeacherProfile
+from accounts.principal import principal_of
 from organization.models import College, Major, Class
 from courses.models import Course, CourseSchedule
 from classrooms.models import Classroom
 from attendance_app.models import Attendance
+from attendance_app.services import daily_student_status
 from grades.models import Grade
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -335,12 +337,12 @@ class DashboardDataView(APIView):
         
         if department_id:
             # Filter by department (Major)
-            base_students = base_students.filter(school_class__major_id=department_id)
+            base_students = base_students.filter(major_id=department_id)
             base_teachers = base_teachers.filter(department_id=department_id)
             base_courses = base_courses.filter(department_id=department_id)
         elif college_id:
             # Filter by college
-            base_students = base_students.filter(school_class__major__college_id=college_id)
+            base_students = base_students.filter(college_id=college_id)
             base_teachers = base_teachers.filter(department__college_id=college_id)
             base_courses = base_courses.filter(department__college_id=college_id)
         
@@ -513,32 +515,21 @@ class DashboardDataView(APIView):
             next_month = month_start.replace(year=month_start.year + 1, month=1)
         else:
             next_month = month_start.replace(month=month_start.month + 1)
-        def _user_college(user):
-            profile = getattr(user, 'profile', None)
-            role = getattr(profile, 'role', None)
-            if role in ['teacher', 'head_teacher']:
-                tp = getattr(profile, 'teacher_profile', None)
-                if tp and tp.department:
-                    return getattr(tp.department, 'college', None)
-            if role == 'student':
-                sp = getattr(profile, 'student_profile', None)
-                if sp and sp.school_class and sp.school_class.major:
-                    return getattr(sp.school_class.major, 'college', None)
-            return None
-        role = getattr(getattr(request.user, 'profile', None), 'role', None)
+        principal = principal_of(request)
+        role = principal.role
         base_qs = CalendarEvent.objects.filter(start_time__gte=month_start, start_time__lt=next_month)
         if role in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']:
             month_events = base_qs.order_by('start_time')
         elif role in ['teacher', 'head_teacher']:
-            col = _user_college(request.user)
+            col = principal.college_id
             if col:
-                month_events = base_qs.filter(Q(visibility='all') | (Q(visibility='college') & Q(college=col)) | Q(created_by=request.user)).order_by('start_time')
+                month_events = base_qs.filter(Q(visibility='all') | (Q(visibility='college') & Q(college_id=col)) | Q(created_by=request.user)).order_by('start_time')
             else:
                 month_events = base_qs.filter(Q(visibility='all') | Q(created_by=request.user)).order_by('start_time')
         elif role == 'student':
-            col = _user_college(request.user)
+            col = principal.college_id
             if col:
-                month_events = base_qs.filter(Q(visibility='all') | (Q(visibility='college') & Q(college=col))).order_by('start_time')
+                month_events = base_qs.filter(Q(visibility='all') | (Q(visibility='college') & Q(college_id=col))).order_by('start_time')
             else:
                 month_events = base_qs.filter(visibility='all').order_by('start_time')
         else:
@@ -687,48 +678,11 @@ class DashboardDataView(APIView):
         att_end_date = now.date()
         att_start_date = att_end_date - timedelta(days=days_window - 1)
 
-        att_qs = Attendance.objects.filter(
-            date__gte=att_start_date,
-            date__lte=att_end_date,
+        # 启用虚拟默认考勤时，"正常"人数由当天有课的学生数减去异常人数得出
+        att_map_data = daily_student_status(
+            att_start_date, att_end_date, college_id=college_id, major_id=department_id
         )
-        if department_id:
-            att_qs = att_qs.filter(student__school_class__major_id=department_id)
-        elif college_id:
-            att_qs = att_qs.filter(student__school_class__major__college_id=college_id)
-
-        # 统计口径：同一天同一学生，根据“当前所有课程状态”取最严重状态
-        # 严重程度优先级：absent > late > leave > present
-        status_priority = {'present': 0, 'leave': 1, 'late': 2, 'absent': 3}
-        per_day_student_status = {}
-        for row in att_qs.values('date', 'student', 'status', 'id').order_by('date', 'student', 'id'):
-            d = row['date']
-            s_id = row['student']
-            s = row['status']
-            day_map = per_day_student_status.setdefault(d, {})
-            if s_id not in day_map:
-                day_map[s_id] = s
-            else:
-                old = day_map[s_id]
-                # 如果新状态更严重，则覆盖
-                if status_priority.get(s, 0) > status_priority.get(old, 0):
-                    day_map[s_id] = s
 
-        # 统计每天各状态的学生人数
-        att_map_data = {}
-        for d, stu_map in per_day_student_status.items():
-            day_counts = {'present': 0, 'late': 0, 'absent': 0, 'leave': 0}
-            for _sid, st in stu_map.items():
-                if st in day_counts:
-                    day_counts[st] += 1
-            att_map_data[d] = day_counts
-
-        # 补齐时间窗口内没有记录的日期
-        curr_d = att_start_date
-        while curr_d <= att_end_date:
-            if curr_d not in att_map_data:
-                att_map_data[curr_d] = {'present': 0, 'late': 0, 'absent': 0, 'leave': 0}
-            curr_d += timedelta(days=1)
-                
         att_dates_list = []
         att_present_list = []
         att_late_list = []
@@ -746,28 +700,7 @@ class DashboardDataView(APIView):
             curr_d += timedelta(days=1)
 
         # Calculate Today's Attendance Stats（按学生人数，按严重程度优先级合并所有课程）
-        today_date = now.date()
-        att_today_qs = Attendance.objects.filter(date=today_date)
-        if department_id:
-            att_today_qs = att_today_qs.filter(student__school_class__major_id=department_id)
-        elif college_id:
-            att_today_qs = att_today_qs.filter(student__school_class__major__college_id=college_id)
-
-        today_status_by_student = {}
-        for row in att_today_qs.values('student', 'status', 'id').order_by('student', 'id'):
-            s_id = row['student']
-            s = row['status']
-            if s_id not in today_status_by_student:
-                today_status_by_student[s_id] = s
-            else:
-                old = today_status_by_student[s_id]
-                if status_priority.get(s, 0) > status_priority.get(old, 0):
-                    today_status_by_student[s_id] = s
-
-        att_today_map = {'present': 0, 'late': 0, 'absent': 0, 'leave': 0}
-        for _sid, st in today_status_by_student.items():
-            if st in att_today_map:
-                att_today_map[st] += 1
+        att_today_map = att_map_data[att_end_date]
 
         # 统计每个学院的学生人数
         college_student_counts = []
@@ -876,9 +809,8 @@ class GlobalSearchView(APIView):
         }
         
         # 根据用户权限定义可访问的管理页面列表
-        user_role = None
-        if hasattr(request.user, 'profile'):
-            user_role = request.user.profile.role
+        principal = principal_of(request)
+        user_role = principal.role or None
         
         # 定义所有管理页面
         all_pages = [
@@ -895,7 +827,7 @@ class GlobalSearchView(APIView):
         ]
         
         # 根据用户角色过滤可访问的页面
-        if getattr(request.user, 'is_superuser', False):
+        if principal.is_superuser:
             management_pages = all_pages
         elif user_role:
             management_pages = [p for p in all_pages if user_role in p['roles']]
@@ -915,34 +847,13 @@ class GlobalSearchView(APIView):
                 if len(results['pages']) >= limit:
                     break
         
-        # 根据用户权限获取可搜索的学生范围
-        user = request.user
-        
-        # 获取基础查询集
-        if getattr(user, 'is_superuser', False):
+        # 根据用户权限获取可搜索的学生范围（普通教师不能搜索学生）
+        if principal.is_school_admin:
             base_qs = StudentProfile.objects.all()
-        elif hasattr(user, 'profile'):
-            role = user.profile.role
-            if role in ['super_admin', 'principal', 'vice_principal']:
-                base_qs = StudentProfile.objects.all()
-            elif role == 'head_teacher':
-                from personnel.models import Teacher as PersonnelTeacher
-                teacher = getattr(user.profile, 'teacher_profile', None)
-                if teacher:
-                    try:
-                        pt = PersonnelTeacher.objects.get(employee_id=teacher.teacher_id)
-                        base_qs = StudentProfile.objects.filter(school_class__head_teacher=pt)
-                    except PersonnelTeacher.DoesNotExist:
-                        base_qs = StudentProfile.objects.none()
-                else:
-                    base_qs = StudentProfile.objects.none()
-            elif role == 'teacher':
-                # 普通教师不能搜索学生
-                base_qs = StudentProfile.objects.none()
-            elif role == 'student':
-                base_qs = StudentProfile.objects.filter(user_profile=user.profile)
-            else:
-                base_qs = StudentProfile.objects.none()
+        elif principal.role == 'head_teacher' and principal.teacher_id:
+            base_qs = StudentProfile.objects.filter(school_class_id__in=principal.head_class_ids)
+        elif principal.is_student:
+            base_qs = StudentProfile.objects.filter(user_profile_id=principal.user_profile_id)
         else:
             base_qs = StudentProfile.objects.none()
         
@@ -0,0 +1,99 @@
+"""
+带缓存的令牌认证
+
+DRF 自带的 TokenAuthentication 每个请求都要做一次 Token + User 连接查询。
+这里把 令牌 -> (用户, 签发时间) 缓存一小段时间，稳定状态下认证不访问数据库；
+令牌删除（注销、轮换、改密码）与用户信息变化时主动清除缓存，其余情况靠短 TTL 兜底。
+
+令牌有效期由 settings.TOKEN_EXPIRE_HOURS 控制（0 表示永不过期），
+过期令牌在下次使用时删除并返回 401，客户端可在过期前调用轮换接口换取新令牌。
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+TOKEN_CACHE_PREFIX = 'auth_token:'
+
+
+def token_cache_key(key: str) -> str:
+    # 缓存键不直接包含令牌原文，避免共享缓存中暴露令牌
+    return TOKEN_CACHE_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_cache_timeout() -> int:
+    return getattr(settings, 'TOKEN_CACHE_TIMEOUT', 60)
+
+
+def token_lifetime():
+    hours = getattr(settings, 'TOKEN_EXPIRE_HOURS', 0)
+    return timedelta(hours=hours) if hours else None
+
+
+def token_expired(created) -> bool:
+    lifetime = token_lifetime()
+    return lifetime is not None and created + lifetime <= timezone.now()
+
+
+def token_expires_at(token):
+    lifetime = token_lifetime()
+    return token.created + lifetime if lifetime is not None else None
+
+
+def uncache_tokens(keys) -> None:
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def uncache_user_tokens(user_id) -> None:
+    uncache_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+def revoke_user_tokens(user) -> None:
+    """删除用户的全部令牌（改密码、管理员重置密码后强制重新登录）；缓存由 Token 的 post_delete 信号清除"""
+    Token.objects.filter(user=user).delete()
+
+
+@transaction.atomic
+def rotate_token(user) -> Token:
+    """作废旧令牌并签发新令牌"""
+    revoke_user_tokens(user)
+    return Token.objects.create(user=user)
+
+
+def issue_token(user) -> Token:
+    """登录时签发令牌：沿用未过期的旧令牌，已过期则轮换"""
+    token = Token.objects.filter(user=user).first()
+    if token is None or token_expired(token.created):
+        token = rotate_token(user)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Authorization: Token <key>，与 TokenAuthentication 兼容"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is None:
+            token = Token.objects.select_related('user').filter(key=key).first()
+            if token is None:
+                raise exceptions.AuthenticationFailed('无效的令牌')
+            cached = (token.user, token.created)
+            cache.set(cache_key, cached, token_cache_timeout())
+
+        user, created = cached
+        if token_expired(created):
+            cache.delete(cache_key)
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('令牌已过期，请重新登录')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('用户已停用或删除')
+        # 由缓存内容构造令牌对象作为 request.auth，与 TokenAuthentication 的返回值一致
+        return user, Token(key=key, user=user, created=created)
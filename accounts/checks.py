@@ -0,0 +1,16 @@
+"""部署检查：令牌、会话、身份（Principal）缓存的主动失效依赖各进程共享同一份缓存"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        '默认缓存为进程内缓存（LocMemCache）',
+        hint='多进程部署时，注销、改密码后的旧令牌与会话以及角色、可见范围的变化，'
+             '在其他进程中要到缓存过期后才生效；请设置 REDIS_URL 或关闭 DEBUG 使用数据库缓存',
+        id='accounts.W001',
+    )]
@@ -1,10 +1,18 @@
 import csv
 import openpyxl
 from io import StringIO, BytesIO
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.db import transaction
 from .models import UserProfile, StudentProfile, TeacherProfile
-from organization.models import Class as SchoolClass, College
+from .services import OrgScopeSync, StudentNumberAllocator
+from organization.models import Class as SchoolClass, College, Major
+from personnel.models import Teacher as PersonnelTeacher
+
+
+DEFAULT_PASSWORD = '123456'
+# 每块写入的行数：User / UserProfile / 角色档案各一次 bulk_create
+IMPORT_CHUNK_SIZE = 1000
 
 
 class ImportResult:
@@ -14,55 +22,58 @@ class ImportResult:
         self.errors = []
 
 
-def _get_data_from_request(request):
-    if 'file' in request.FILES:
-        f = request.FILES['file']
-        filename = f.name.lower()
-        
-        # Check if it's an Excel file
-        if filename.endswith('.xlsx') or filename.endswith('.xls'):
-            try:
-                wb = openpyxl.load_workbook(f)
-                sheet = wb.active
-                rows = list(sheet.values)
-                if not rows:
-                    return []
-                
-                headers = rows[0]
-                data = []
-                for row in rows[1:]:
-                    item = {}
-                    # 某些情况下，row[i] 可能是 None，str(None) 是 'None'，这不是我们想要的
-                    for i, header in enumerate(headers):
-                        if header:
-                            val = row[i]
-                            if val is None:
-                                val = ''
-                            else:
-                                val = str(val).strip()
-                            item[str(header).strip()] = val
-                    data.append(item)
-                return data
-            except Exception as e:
-                # If openpyxl fails, maybe try to read as CSV if it's not actually binary?
-                # But filename says xlsx. Let's assume binary format for now.
-                # If needed, we could use pandas but that's a heavy dependency.
-                # openpyxl is standard for xlsx.
-                raise ValueError(f"Failed to parse Excel file: {e}")
-        
-        # Assume CSV if not Excel
+def read_rows(f):
+    """把上传（或已暂存到磁盘）的 Excel/CSV 文件读成字典列表，按 f.name 的扩展名判断格式"""
+    filename = f.name.lower()
+    # Check if it's an Excel file
+    if filename.endswith('.xlsx') or filename.endswith('.xls'):
         try:
-            content = f.read().decode('utf-8-sig') # Handle BOM
+            wb = openpyxl.load_workbook(f)
+            sheet = wb.active
+            rows = list(sheet.values)
+            if not rows:
+                return []
+            
+            headers = rows[0]
+            data = []
+            for row in rows[1:]:
+                item = {}
+                # 某些情况下，row[i] 可能是 None，str(None) 是 'None'，这不是我们想要的
+                for i, header in enumerate(headers):
+                    if header:
+                        val = row[i]
+                        if val is None:
+                            val = ''
+                        else:
+                            val = str(val).strip()
+                        item[str(header).strip()] = val
+                data.append(item)
+            return data
+        except Exception as e:
+            # If openpyxl fails, maybe try to read as CSV if it's not actually binary?
+            # But filename says xlsx. Let's assume binary format for now.
+            # If needed, we could use pandas but that's a heavy dependency.
+            # openpyxl is standard for xlsx.
+            raise ValueError(f"Failed to parse Excel file: {e}")
+    
+    # Assume CSV if not Excel
+    try:
+        content = f.read().decode('utf-8-sig') # Handle BOM
+        reader = csv.DictReader(StringIO(content))
+        return list(reader)
+    except Exception:
+        f.seek(0)
+        try:
+            content = f.read().decode('gbk') # Try GBK for Chinese systems
             reader = csv.DictReader(StringIO(content))
             return list(reader)
-        except Exception:
-            f.seek(0)
-            try:
-                content = f.read().decode('gbk') # Try GBK for Chinese systems
-                reader = csv.DictReader(StringIO(content))
-                return list(reader)
-            except Exception as e:
-                 raise ValueError(f"Failed to decode CSV file: {e}")
+        except Exception as e:
+             raise ValueError(f"Failed to decode CSV file: {e}")
+
+
+def _get_data_from_request(request):
+    if 'file' in request.FILES:
+        return read_rows(request.FILES['file'])
 
     # Fallback to 'csv' field in body
     csv_text = request.data.get('csv', '')
@@ -73,10 +84,95 @@ def _get_data_from_request(request):
     return []
 
 
+def _chunks(items, size=IMPORT_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_usernames(usernames):
+    """分块查询已存在的用户名"""
+    existing = set()
+    for chunk in _chunks(list(usernames)):
+        existing.update(User.objects.filter(username__in=chunk).values_list('username', flat=True))
+    return existing
+
+
+def _lookup_maps(model):
+    """按 ID 和名称查找的字典；同名时取 ID 最小的一条，与 filter(name=...).first() 一致"""
+    by_id, by_name = {}, {}
+    for obj in model.objects.order_by('id'):
+        by_id[obj.id] = obj
+        by_name.setdefault(obj.name, obj)
+    return by_id, by_name
+
+
+def _resolve(by_id, by_name, obj_id, name):
+    obj = by_id.get(int(obj_id)) if obj_id and obj_id.isdigit() else None
+    if not obj and name:
+        obj = by_name.get(name)
+    return obj
+
+
+def _create_accounts(items, role, profile_model, build_profile, password):
+    """
+    bulk_create User -> UserProfile -> 角色档案
+    items 为 (username, first_name, UserProfile 字段字典, extra)；build_profile(user_profile_id, extra) 返回角色档案实例
+    MySQL 的 bulk_create 不回填主键，因此每层写入后按唯一键取回 ID
+    """
+    User.objects.bulk_create([
+        User(username=username, first_name=first_name, password=password)
+        for username, first_name, _, _ in items
+    ])
+    user_ids = dict(User.objects.filter(
+        username__in=[item[0] for item in items]
+    ).values_list('username', 'id'))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_ids[username], role=role, **profile_fields)
+        for username, _, profile_fields, _ in items
+    ])
+    profile_ids = dict(UserProfile.objects.filter(
+        user_id__in=user_ids.values()
+    ).values_list('user_id', 'id'))
+    profile_model.objects.bulk_create([
+        build_profile(profile_ids[user_ids[username]], extra)
+        for username, _, _, extra in items
+    ])
+
+
+def bulk_create_accounts(items, role, profile_model, build_profile, label, result):
+    """
+    分块写入，默认密码只哈希一次；某块失败时对半拆分重试，
+    直到定位出失败的单行，保持原有的逐行错误报告
+    """
+    password = make_password(DEFAULT_PASSWORD)
+
+    def create(chunk):
+        try:
+            with transaction.atomic():
+                _create_accounts(chunk, role, profile_model, build_profile, password)
+            result.created += len(chunk)
+        except Exception as e:
+            if len(chunk) > 1:
+                middle = len(chunk) // 2
+                create(chunk[:middle])
+                create(chunk[middle:])
+                return
+            result.errors.append(f"Error creating {label} {chunk[0][0]}: {str(e)}")
+            result.skipped += 1
+
+    for chunk in _chunks(items):
+        create(chunk)
+
+
 @transaction.atomic
 def import_students(request):
-    rows = _get_data_from_request(request)
-    result = ImportResult()
+    return import_student_rows(_get_data_from_request(request), getattr(request, 'user', None))
+
+
+def import_student_rows(rows, created_by=None, result=None):
+    """导入已解析的行；后台导入任务按块调用，并传入同一个 result 累计结果"""
+    result = result if result is not None else ImportResult()
+    parsed = []
     
     for row in rows:
         # Support both English and Chinese headers
@@ -99,47 +195,48 @@ def import_students(request):
             result.skipped += 1
             result.errors.append(f'missing username/student_id: {row}')
             continue
-            
-        if User.objects.filter(username=student_id).exists():
+        parsed.append((username, student_id, class_id, class_name, phone, status))
+
+    existing = _existing_usernames(item[1] for item in parsed)
+    classes_by_id, classes_by_name = _lookup_maps(SchoolClass)
+    created_by_id = created_by.id if created_by is not None and created_by.is_authenticated else None
+
+    items = []
+    for username, student_id, class_id, class_name, phone, status in parsed:
+        if student_id in existing:
             result.skipped += 1
             continue
-            
-        try:
-            user = User.objects.create(username=student_id)
-            user.first_name = username
-            user.set_password('123456') # Default password
-            user.save()
-            
-            profile = UserProfile.objects.create(user=user, role='student', phone=phone)
-            
-            school_class = None
-            if class_id and class_id.isdigit():
-                try:
-                    school_class = SchoolClass.objects.get(id=int(class_id))
-                except Exception:
-                    pass
-            if not school_class and class_name:
-                school_class = SchoolClass.objects.filter(name=class_name).first()
-                
-            StudentProfile.objects.create(
-                user_profile=profile, 
-                student_id=student_id, 
-                school_class=school_class, 
-                status=status,
-                created_by=getattr(request, 'user', None)
-            )
-            result.created += 1
-        except Exception as e:
-            result.errors.append(f"Error creating student {student_id}: {str(e)}")
-            result.skipped += 1
-            
+        existing.add(student_id)
+        school_class = _resolve(classes_by_id, classes_by_name, class_id, class_name)
+        items.append((student_id, username, {'phone': phone}, (student_id, school_class, status)))
+
+    bulk_create_accounts(
+        items, 'student', StudentProfile,
+        lambda profile_id, extra: StudentProfile(
+            user_profile_id=profile_id,
+            student_id=extra[0],
+            school_class=extra[1],
+            status=extra[2],
+            created_by_id=created_by_id,
+        ),
+        'student', result,
+    )
+    # bulk_create 不触发信号，按班级整批填充学生档案的专业、学院
+    OrgScopeSync().sync_profiles({extra[1].id for _, _, _, extra in items if extra[1]})
+    # 导入指定的学号与自动分配共用序号，推进对应前缀的序号行
+    StudentNumberAllocator().advance(item[0] for item in items)
     return result
 
 
 @transaction.atomic
 def import_teachers(request):
-    rows = _get_data_from_request(request)
-    result = ImportResult()
+    return import_teacher_rows(_get_data_from_request(request), getattr(request, 'user', None))
+
+
+def import_teacher_rows(rows, created_by=None, result=None):
+    """导入已解析的行；后台导入任务按块调用，并传入同一个 result 累计结果"""
+    result = result if result is not None else ImportResult()
+    parsed = []
     
     for row in rows:
         username = (row.get('username') or row.get('姓名') or '').strip()
@@ -154,40 +251,36 @@ def import_teachers(request):
             result.skipped += 1
             result.errors.append(f'missing username/teacher_id: {row}')
             continue
-            
-        if User.objects.filter(username=teacher_id).exists():
+        parsed.append((username, teacher_id, department_id, department_name, title, phone))
+
+    existing = _existing_usernames(item[1] for item in parsed)
+    # 查找专业（department 对应 Major 模型）
+    majors_by_id, majors_by_name = _lookup_maps(Major)
+    created_by_id = created_by.id if created_by is not None and created_by.is_authenticated else None
+
+    items = []
+    for username, teacher_id, department_id, department_name, title, phone in parsed:
+        if teacher_id in existing:
             result.skipped += 1
             continue
-            
-        try:
-            user = User.objects.create(username=teacher_id)
-            user.first_name = username
-            user.set_password('123456')
-            user.save()
-            
-            profile = UserProfile.objects.create(user=user, role='teacher', phone=phone)
-            
-            # 查找专业（department 对应 Major 模型）
-            from organization.models import Major
-            department = None
-            if department_id and department_id.isdigit():
-                try:
-                    department = Major.objects.get(id=int(department_id))
-                except Exception:
-                    pass
-            if not department and department_name:
-                department = Major.objects.filter(name=department_name).first()
-                
-            TeacherProfile.objects.create(
-                user_profile=profile, 
-                teacher_id=teacher_id,
-                title=title,
-                department=department, 
-                created_by=getattr(request, 'user', None)
-            )
-            result.created += 1
-        except Exception as e:
-            result.errors.append(f"Error creating teacher {teacher_id}: {str(e)}")
-            result.skipped += 1
-            
+        existing.add(teacher_id)
+        department = _resolve(majors_by_id, majors_by_name, department_id, department_name)
+        items.append((teacher_id, username, {'phone': phone}, (teacher_id, title, department)))
+
+    # bulk_create 不触发 link_personnel_teacher 信号，按工号一次查出已有的人事档案并直接关联
+    personnel_ids = set(PersonnelTeacher.objects.filter(
+        pk__in=[extra[0] for _, _, _, extra in items]
+    ).values_list('pk', flat=True))
+    bulk_create_accounts(
+        items, 'teacher', TeacherProfile,
+        lambda profile_id, extra: TeacherProfile(
+            user_profile_id=profile_id,
+            teacher_id=extra[0],
+            title=extra[1],
+            department=extra[2],
+            personnel_teacher_id=extra[0] if extra[0] in personnel_ids else None,
+            created_by_id=created_by_id,
+        ),
+        'teacher', result,
+    )
     return result
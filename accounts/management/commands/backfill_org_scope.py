@@ -0,0 +1,22 @@
+"""
+回填学生档案、考勤、成绩上的组织范围冗余字段（班级、专业、学院）
+使用方法: python manage.py backfill_org_scope [--class <班级ID> ...]
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.services import OrgScopeSync
+
+
+class Command(BaseCommand):
+    help = '按班级整批回填 StudentProfile / Attendance / Grade 的 college、major、school_class 冗余字段'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--class', dest='class_ids', type=int, nargs='+', help='只处理指定班级')
+
+    def handle(self, *args, **options):
+        sync = OrgScopeSync()
+        if options['class_ids']:
+            updated = sync.sync_classes(options['class_ids'])
+        else:
+            updated = sync.backfill()
+        self.stdout.write(self.style.SUCCESS(f'✓ 已更新 {updated} 条考勤/成绩记录'))
@@ -0,0 +1,17 @@
+"""
+按工号修复教师账号（TeacherProfile）与人事教师档案（personnel.Teacher）的关联
+使用方法: python manage.py reconcile_teacher_links
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.services import TeacherLinkReconciler
+
+
+class Command(BaseCommand):
+    help = '批量修复 TeacherProfile.personnel_teacher 关联'
+
+    def handle(self, *args, **options):
+        result = TeacherLinkReconciler().reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ 解除 {result['unlinked']} 条不一致的关联，新建 {result['linked']} 条关联"
+        ))
@@ -0,0 +1,35 @@
+from django.utils.functional import SimpleLazyObject
+
+from .principal import Principal
+
+
+class PrincipalMiddleware:
+    """
+    挂载 request.principal，首次访问时才解析
+    DRF 的令牌认证在视图内完成并回写 request.user，因此延迟到视图中取值即可拿到认证后的用户
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: Principal.for_user(request.user))
+        return self.get_response(request)
+
+
+class SlidingSessionMiddleware:
+    """
+    放在 SessionMiddleware 之后：剩余有效期不足时标记会话已修改，
+    由 SessionMiddleware 在响应阶段保存并刷新 Cookie（见 accounts/sessions.py）
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # 只有 accounts.sessions 会话后端提供 needs_renewal
+        if hasattr(session, 'needs_renewal') and session.session_key and session.needs_renewal():
+            session.modified = True
+        return response
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_add_courseschedule_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=32, unique=True, verbose_name='学号前缀')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='已分配的最大序号')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '学号序号',
+                'verbose_name_plural': '学号序号',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# 教师账号与人事教师档案的一对一关联，并按工号批量回填
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    # 只使用历史模型，不依赖 accounts.services 的当前实现
+    TeacherProfile = apps.get_model('accounts', 'TeacherProfile')
+    Teacher = apps.get_model('personnel', 'Teacher')
+    TeacherProfile.objects.filter(
+        teacher_id__in=Teacher.objects.values('employee_id'),
+    ).update(personnel_teacher_id=F('teacher_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_studentnumbersequence'),
+        ('personnel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teacherprofile',
+            name='personnel_teacher',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='account_profile', to='personnel.teacher', verbose_name='人事教师档案'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# 学生档案冗余所在班级的专业、学院，数据由 attendance_app 0008 统一回填
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_teacherprofile_personnel_teacher'),
+        ('organization', '0011_class_class_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='college',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.college', verbose_name='学院'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='major',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.major', verbose_name='专业'),
+        ),
+    ]
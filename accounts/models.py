@@ -42,6 +42,11 @@ class StudentProfile(models.Model):
     user_profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='student_profile')
     student_id = models.CharField(max_length=32, unique=True)
     school_class = models.ForeignKey(SchoolClass, on_delete=models.SET_NULL, null=True, related_name='students')
+    # 所在班级的专业、学院（冗余字段），按学院/专业筛选时不必连表；由 accounts.signals 随班级变化维护
+    major = models.ForeignKey(Major, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='专业')
+    college = models.ForeignKey(
+        'organization.College', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='学院'
+    )
     status = models.CharField(max_length=32, default='在读')
     dorm_number = models.CharField(max_length=32, blank=True, null=True, verbose_name="宿舍号")
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='students_created')
@@ -50,6 +55,23 @@ class StudentProfile(models.Model):
         return self.student_id
 
 
+class StudentNumberSequence(models.Model):
+    """
+    学号序号分配表：每个学号前缀（年级+学制+学院+专业+班级）一行，last_number 为已分配的最大序号
+    分配时 SELECT ... FOR UPDATE 锁定该行，并发添加同一班级学生时串行化
+    """
+    prefix = models.CharField(max_length=32, unique=True, verbose_name='学号前缀')
+    last_number = models.PositiveIntegerField(default=0, verbose_name='已分配的最大序号')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '学号序号'
+        verbose_name_plural = '学号序号'
+
+    def __str__(self):
+        return f"{self.prefix}:{self.last_number}"
+
+
 class TeacherProfile(models.Model):
     user_profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='teacher_profile')
     teacher_id = models.CharField(max_length=100, unique=True)
@@ -57,6 +79,12 @@ class TeacherProfile(models.Model):
     department = models.ForeignKey(Major, on_delete=models.SET_NULL, null=True, related_name='teachers')
     subject = models.ForeignKey('courses.Course', on_delete=models.SET_NULL, null=True, related_name='teachers')
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='teachers_created')
+    # 对应的人事教师档案（personnel.Teacher 以工号为主键，关联时 personnel_teacher_id 等于 teacher_id），
+    # 由 accounts.signals 随双方保存自动维护，历史数据用 reconcile_teacher_links 命令修复
+    personnel_teacher = models.OneToOneField(
+        'personnel.Teacher', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='account_profile', verbose_name='人事教师档案',
+    )
 
     def __str__(self):
         return self.teacher_id
@@ -1,23 +1,18 @@
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 import logging
 
+from .principal import ADMIN_ROLES, TEACHER_ROLES, principal_of
+
 logger = logging.getLogger(__name__)
 
 
+def _is_authenticated(request):
+    return bool(request.user and request.user.is_authenticated)
+
+
 class IsSystemAdmin(BasePermission):
     def has_permission(self, request, view):
-        try:
-            user = request.user
-            if not user or not user.is_authenticated:
-                return False
-            if getattr(user, 'is_superuser', False):
-                return True
-            profile = getattr(user, 'profile', None)
-            if not profile:
-                return False
-            return profile.role in ['super_admin', 'principal', 'vice_principal']
-        except Exception:
-            return False
+        return principal_of(request).is_school_admin
 
 
 class IsTeacherOrAdminOrReadOnly(BasePermission):
@@ -28,35 +23,25 @@ class IsTeacherOrAdminOrReadOnly(BasePermission):
     """
     def has_permission(self, request, view):
         # 对于GET、HEAD、OPTIONS请求，允许所有已认证用户访问
-        if request.method in ('GET', 'HEAD', 'OPTIONS'):
-            # 只要用户已认证即可
-            try:
-                is_auth = bool(request.user and request.user.is_authenticated)
-                if not is_auth:
-                    logger.warning(f"GET请求权限检查失败: user={request.user}, is_authenticated={getattr(request.user, 'is_authenticated', None)}")
-                return is_auth
-            except Exception as e:
-                logger.error(f"GET请求权限检查异常: {str(e)}")
-                return False
-        
+        if request.method in SAFE_METHODS:
+            is_auth = _is_authenticated(request)
+            if not is_auth:
+                logger.warning(f"GET请求权限检查失败: user={request.user}, is_authenticated={getattr(request.user, 'is_authenticated', None)}")
+            return is_auth
+
         # 对于其他请求（POST、PUT、DELETE等），需要是教师或管理员
-        user = request.user
-        try:
-            if not user or not user.is_authenticated:
-                return False
-            if getattr(user, 'is_superuser', False):
-                return True
-            profile = getattr(user, 'profile', None)
-            if not profile:
-                logger.warning(f"{request.method}请求权限不足: user={user.username}, 没有profile")
-                return False
-            allowed = profile.role in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean', 'teacher', 'head_teacher']
-            if not allowed:
-                logger.warning(f"{request.method}请求权限不足: user={user.username}, role={profile.role}")
-            return allowed
-        except Exception as e:
-            logger.error(f"{request.method}请求权限检查异常: {str(e)}")
+        principal = principal_of(request)
+        if not principal.is_authenticated:
+            return False
+        if principal.is_superuser:
+            return True
+        if not principal.role:
+            logger.warning(f"{request.method}请求权限不足: user={request.user.username}, 没有profile")
             return False
+        allowed = principal.has_role(*ADMIN_ROLES, *TEACHER_ROLES)
+        if not allowed:
+            logger.warning(f"{request.method}请求权限不足: user={request.user.username}, role={principal.role}")
+        return allowed
 
 
 class IsAdminOrDeanOrReadOnly(BasePermission):
@@ -66,26 +51,9 @@ class IsAdminOrDeanOrReadOnly(BasePermission):
     其他请求：需要是管理员或院长
     """
     def has_permission(self, request, view):
-        # 对于GET、HEAD、OPTIONS请求，允许所有已认证用户访问
-        if request.method in ('GET', 'HEAD', 'OPTIONS'):
-            try:
-                return bool(request.user and request.user.is_authenticated)
-            except Exception:
-                return False
-        
-        # 对于其他请求，需要是管理员或院长
-        user = request.user
-        try:
-            if not user or not user.is_authenticated:
-                return False
-            if getattr(user, 'is_superuser', False):
-                return True
-            profile = getattr(user, 'profile', None)
-            if not profile:
-                return False
-            return profile.role in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']
-        except Exception:
-            return False
+        if request.method in SAFE_METHODS:
+            return _is_authenticated(request)
+        return principal_of(request).is_admin
 
 
 class IsTeacherOnlyOrReadOnly(BasePermission):
@@ -95,24 +63,9 @@ class IsTeacherOnlyOrReadOnly(BasePermission):
     其他请求：需要是教师
     """
     def has_permission(self, request, view):
-        # 对于GET、HEAD、OPTIONS请求，允许所有已认证用户访问
-        if request.method in ('GET', 'HEAD', 'OPTIONS'):
-            try:
-                return bool(request.user and request.user.is_authenticated)
-            except Exception:
-                return False
-        
-        # 对于其他请求，需要是教师
-        user = request.user
-        try:
-            if not user or not user.is_authenticated:
-                return False
-            profile = getattr(user, 'profile', None)
-            if not profile:
-                return False
-            return profile.role == 'teacher'
-        except Exception:
-            return False
+        if request.method in SAFE_METHODS:
+            return _is_authenticated(request)
+        return principal_of(request).role == 'teacher'
 
 
 class IsAdminOnlyOrReadOnly(BasePermission):
@@ -122,23 +75,6 @@ class IsAdminOnlyOrReadOnly(BasePermission):
     其他请求（POST/PUT/DELETE）：需要是管理员
     """
     def has_permission(self, request, view):
-        # 对于GET、HEAD、OPTIONS请求，允许所有已认证用户访问
-        if request.method in ('GET', 'HEAD', 'OPTIONS'):
-            try:
-                return bool(request.user and request.user.is_authenticated)
-            except Exception:
-                return False
-        
-        # 对于其他请求，需要是管理员
-        user = request.user
-        try:
-            if not user or not user.is_authenticated:
-                return False
-            if getattr(user, 'is_superuser', False):
-                return True
-            profile = getattr(user, 'profile', None)
-            if not profile:
-                return False
-            return profile.role in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']
-        except Exception:
-            return False
+        if request.method in SAFE_METHODS:
+            return _is_authenticated(request)
+        return principal_of(request).is_admin
@@ -0,0 +1,173 @@
+"""
+当前用户的身份与可见范围（Principal）
+
+角色、所属学院、可管理的专业、担任班主任的班级、任课的课程安排等信息，
+原先由各权限类和 get_queryset 每次请求分别查询；现在每个用户计算一次后放入缓存，
+由 PrincipalMiddleware 以 request.principal 的形式提供给权限类和视图。
+
+缓存键包含两个版本号：
+- 用户版本：该用户的账号、档案变化时递增，只影响这一个用户
+- 公共版本：班级、专业、课程安排、人事档案变化时递增，影响所有用户
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.core.cache import cache
+
+
+SCHOOL_ADMIN_ROLES = ('super_admin', 'principal', 'vice_principal')
+COLLEGE_ADMIN_ROLES = ('dean', 'vice_dean')
+ADMIN_ROLES = SCHOOL_ADMIN_ROLES + COLLEGE_ADMIN_ROLES
+TEACHER_ROLES = ('teacher', 'head_teacher')
+
+PRINCIPAL_CACHE_PREFIX = 'principal:'
+PRINCIPAL_VERSION_KEY = 'principal:version'
+PRINCIPAL_CACHE_TIMEOUT = 300  # 秒，兜底过期时间；版本号递增即时失效，多进程部署须使用共享缓存
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def bump_principal_version(user_id: Optional[int] = None) -> None:
+    """传入 user_id 时只使该用户的缓存失效，否则使所有用户的缓存失效"""
+    _bump(PRINCIPAL_VERSION_KEY if user_id is None else f'{PRINCIPAL_VERSION_KEY}:{user_id}')
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    只包含基本类型，便于缓存
+    teacher_id / student_id 为 accounts 档案主键；employee_id、position_type、personnel_college_id
+    来自人事教师档案（personnel.Teacher，旧权限逻辑按 position_type 判断）
+    """
+    user_id: Optional[int] = None
+    is_superuser: bool = False
+    role: str = ''
+    user_profile_id: Optional[int] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    class_id: Optional[int] = None
+    college_id: Optional[int] = None
+    department_id: Optional[int] = None
+    major_ids: Tuple[int, ...] = ()
+    head_class_ids: Tuple[int, ...] = ()
+    schedule_ids: Tuple[int, ...] = ()
+    course_ids: Tuple[int, ...] = ()
+    employee_id: Optional[str] = None
+    position_type: str = ''
+    personnel_college_id: Optional[int] = None
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user_id is not None
+
+    def has_role(self, *roles) -> bool:
+        return self.role in roles
+
+    @property
+    def is_school_admin(self) -> bool:
+        """超级用户或校级管理员（超级管理员、校长、副校长），可见全部数据"""
+        return self.is_superuser or self.role in SCHOOL_ADMIN_ROLES
+
+    @property
+    def is_college_admin(self) -> bool:
+        return self.role in COLLEGE_ADMIN_ROLES
+
+    @property
+    def is_admin(self) -> bool:
+        return self.is_school_admin or self.role in COLLEGE_ADMIN_ROLES
+
+    @property
+    def is_teacher(self) -> bool:
+        return self.role in TEACHER_ROLES
+
+    @property
+    def is_student(self) -> bool:
+        return self.role == 'student'
+
+    @classmethod
+    def build(cls, user) -> 'Principal':
+        from courses.models import CourseSchedule
+        from organization.models import Class, Major
+        from personnel.models import Teacher as PersonnelTeacher
+        from .models import UserProfile
+
+        profile = UserProfile.objects.select_related(
+            'administrator_profile', 'teacher_profile__department',
+            'student_profile__school_class__major',
+        ).filter(user_id=user.pk).first()
+        personnel = PersonnelTeacher.objects.filter(user_id=user.pk).values(
+            'employee_id', 'position_type', 'college_id'
+        ).first() or {}
+
+        fields = {
+            'user_id': user.pk,
+            'is_superuser': bool(user.is_superuser),
+            'employee_id': personnel.get('employee_id'),
+            'position_type': personnel.get('position_type') or '',
+            'personnel_college_id': personnel.get('college_id'),
+        }
+        if profile is None:
+            return cls(**fields)
+        fields.update(role=profile.role, user_profile_id=profile.id)
+
+        admin = getattr(profile, 'administrator_profile', None)
+        teacher = getattr(profile, 'teacher_profile', None)
+        student = getattr(profile, 'student_profile', None)
+        if admin is not None:
+            fields.update(college_id=admin.college_id, department_id=admin.department_id)
+        if teacher is not None:
+            fields['teacher_id'] = teacher.id
+            if admin is None and teacher.department is not None:
+                fields.update(college_id=teacher.department.college_id, department_id=teacher.department_id)
+            schedules = list(CourseSchedule.objects.filter(teacher_id=teacher.id).values_list('id', 'course_id'))
+            fields['schedule_ids'] = tuple(sorted(sid for sid, _ in schedules))
+            fields['course_ids'] = tuple(sorted({cid for _, cid in schedules}))
+            fields['head_class_ids'] = tuple(Class.objects.filter(
+                head_teacher__account_profile=teacher
+            ).order_by('id').values_list('id', flat=True))
+        if student is not None:
+            fields.update(student_id=student.id, class_id=student.school_class_id)
+            if student.school_class is not None and fields.get('college_id') is None:
+                fields.update(college_id=student.school_class.major.college_id,
+                              department_id=student.school_class.major_id)
+
+        if profile.role in COLLEGE_ADMIN_ROLES and fields.get('college_id'):
+            fields['major_ids'] = tuple(Major.objects.filter(
+                college_id=fields['college_id']
+            ).order_by('id').values_list('id', flat=True))
+        elif fields.get('department_id'):
+            fields['major_ids'] = (fields['department_id'],)
+        return cls(**fields)
+
+    @classmethod
+    def for_user(cls, user) -> 'Principal':
+        if user is None or not user.is_authenticated:
+            return ANONYMOUS
+        user_version_key = f'{PRINCIPAL_VERSION_KEY}:{user.pk}'
+        versions = cache.get_many([PRINCIPAL_VERSION_KEY, user_version_key])
+        key = (f'{PRINCIPAL_CACHE_PREFIX}{versions.get(PRINCIPAL_VERSION_KEY, 1)}'
+               f'.{versions.get(user_version_key, 1)}:{user.pk}')
+        principal = cache.get(key)
+        if principal is None:
+            principal = cls.build(user)
+            cache.set(key, principal, PRINCIPAL_CACHE_TIMEOUT)
+        return principal
+
+
+ANONYMOUS = Principal()
+
+
+def principal_of(request) -> Principal:
+    """
+    优先使用中间件挂载的 request.principal；
+    后台任务等未经过中间件的请求对象按 request.user 现算
+    """
+    principal = getattr(request, 'principal', None)
+    if principal is None:
+        principal = Principal.for_user(getattr(request, 'user', None))
+    return principal
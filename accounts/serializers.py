@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.db import transaction
+from .services import StudentNumberAllocator, StudentNumberExhausted
 from .models import UserProfile, StudentProfile, TeacherProfile, AdministratorProfile
 
 
@@ -73,53 +74,15 @@ class StudentProfileSerializer(serializers.ModelSerializer):
         if not school_class:
             raise serializers.ValidationError({'school_class': '必须选择班级'})
         
-        # 自动生成学号：年级（4位）+ 学制类型数（1位）+ 学院ID（2位）+ 专业ID（2位）+ 班级ID（1位）+ 序号（2位）
-        enrollment_year = school_class.enrollment_year  # 年级ID（4位数字）
-        
-        # 从学制类型中提取数字（如 '3_year' -> '3', '5_year' -> '5', '6_year' -> '6'）
-        duration_type = school_class.major.duration_type
-        duration_number = duration_type.split('_')[0] if '_' in duration_type else '3'  # 默认3年制
-        
-        college_code = school_class.major.college.code  # 学院ID（2位数字）
-        major_code = school_class.major.code  # 专业ID（2位数字）
-        class_number = school_class.class_number  # 班级ID（1位数字）
-        
-        # 生成学号前缀：年级+学制类型数+学院ID+专业ID+班级ID
-        prefix = f"{enrollment_year}{duration_number}{college_code}{major_code}{class_number}"
-        
-        # 查找该班级下已有的学生，确定下一个序号
-        existing_students = StudentProfile.objects.filter(school_class=school_class)
-        # 提取已有的序号（学号的后两位）
-        existing_numbers = []
-        
-        for student in existing_students:
-            if student.student_id.startswith(prefix) and len(student.student_id) == len(prefix) + 2:
-                try:
-                    num = int(student.student_id[-2:])
-                    existing_numbers.append(num)
-                except ValueError:
-                    pass
-        
-        # 找到下一个可用的序号（从01开始）
-        next_num = 1
-        while next_num in existing_numbers:
-            next_num += 1
-            if next_num > 99:  # 最多99个学生
-                raise serializers.ValidationError({'school_class': '该班级学生数量已达上限（99人）'})
-        
-        # 生成学号
-        student_id = f"{prefix}{next_num:02d}"
-        
-        # 确保学号唯一性（检查 User 表，因为 username 必须唯一）
-        while User.objects.filter(username=student_id).exists():
-            next_num += 1
-            if next_num > 99:
-                raise serializers.ValidationError({'school_class': '该班级学生数量已达上限（99人）'})
-            student_id = f"{prefix}{next_num:02d}"
-        
-        validated_data['student_id'] = student_id
-        
         with transaction.atomic():
+            # 自动生成学号：班级前缀 + 序号（2位），由序号表加锁分配，并发添加时不会重号；
+            # 序号行锁持有到本事务提交，创建失败时序号随事务回滚
+            try:
+                student_id = StudentNumberAllocator().reserve_for_class(school_class)[0]
+            except StudentNumberExhausted as e:
+                raise serializers.ValidationError({'school_class': str(e)})
+            validated_data['student_id'] = student_id
+
             # Create User (username=student_id, password=123456)
             # 自动检查学生是否有账户没有就要创建，账号为学号，密码默认123456
             try:
@@ -185,14 +148,26 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
         model = TeacherProfile
         fields = ['id', 'user_profile', 'teacher_id', 'title', 'position_type', 'position_type_display', 'department', 'subject', 'name', 'name_display', 'phone', 'role', 'class_id', 'college_id', 'college_name', 'department_name', 'managed_class_info']
     
+    def _personnel(self, obj):
+        """
+        (职务类型, 管理的班级)：经 personnel_teacher 一对一关联读取，
+        列表查询已 select_related('personnel_teacher__managed_classes')，不再按工号逐个查询
+        """
+        personnel_teacher = obj.personnel_teacher
+        if personnel_teacher is None:
+            return None, None
+        position_type = None if personnel_teacher.is_deleted else personnel_teacher.position_type
+        managed_class = getattr(personnel_teacher, 'managed_classes', None)
+        if managed_class is None:
+            return position_type, None
+        return position_type, {'id': managed_class.id, 'name': managed_class.name}
+
     def get_position_type(self, obj):
         """从 personnel.Teacher 获取职务类型"""
-        from personnel.models import Teacher
-        try:
-            personnel_teacher = Teacher.objects.get(employee_id=obj.teacher_id, is_deleted=False)
-            return personnel_teacher.position_type
-        except Teacher.DoesNotExist:
+        position_type = self._personnel(obj)[0]
+        if position_type is None:
             return obj.title or obj.user_profile.role  # 如果找不到，使用 title 或 role 作为后备
+        return position_type
     
     def get_position_type_display(self, obj):
         """获取职务类型的中文显示"""
@@ -209,24 +184,7 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
         return position_type_map.get(position_type, position_type or '-')
 
     def get_managed_class_info(self, obj):
-        from personnel.models import Teacher
-        from organization.models import Class
-        try:
-            # TeacherProfile.teacher_id matches Personnel.Teacher.employee_id
-            personnel_teacher = Teacher.objects.get(employee_id=obj.teacher_id)
-            
-            # Use reverse relationship from Class to Teacher (related_name='managed_classes' on Class.head_teacher)
-            # Or direct query on Class model
-            managed_class = Class.objects.filter(head_teacher=personnel_teacher).first()
-            
-            if managed_class:
-                return {
-                    'id': managed_class.id,
-                    'name': managed_class.name
-                }
-        except Teacher.DoesNotExist:
-            pass
-        return None
+        return self._personnel(obj)[1]
     
     def validate(self, data):
         """
@@ -353,13 +311,14 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
             except College.DoesNotExist:
                 pass
         
-        try:
-            personnel_teacher = PersonnelTeacher.objects.get(employee_id=instance.teacher_id)
+        # 关联尚未建立（如历史数据未修复）时按工号兜底
+        personnel_teacher = instance.personnel_teacher or PersonnelTeacher.objects.filter(pk=instance.teacher_id).first()
+        if personnel_teacher is not None:
             personnel_teacher.name = instance.user_profile.user.first_name
             personnel_teacher.position_type = instance.user_profile.role
             personnel_teacher.college = college
             personnel_teacher.save()
-        except PersonnelTeacher.DoesNotExist:
+        else:
              personnel_teacher = PersonnelTeacher.objects.create(
                 employee_id=instance.teacher_id,
                 user=instance.user_profile.user,
@@ -373,8 +332,10 @@ class TeacherProfileSerializer(serializers.ModelSerializer):
         if 'class_id' in validated_data:
             class_id = validated_data.pop('class_id')
             from organization.models import Class
+            from organization.services import bump_organization_version
             # 清除旧的班主任关联
             Class.objects.filter(head_teacher=personnel_teacher).update(head_teacher=None)
+            bump_organization_version()
             if class_id:
                 try:
                     cls = Class.objects.get(id=class_id)
@@ -0,0 +1,264 @@
+"""学号分配、教师档案关联与组织范围冗余字段维护"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import StudentNumberSequence, StudentProfile
+from .principal import bump_principal_version
+
+
+STUDENT_NUMBER_DIGITS = 2
+MAX_STUDENT_NUMBER = 10 ** STUDENT_NUMBER_DIGITS - 1  # 每班最多 99 人
+
+
+class StudentNumberExhausted(Exception):
+    pass
+
+
+def student_id_prefix(school_class) -> str:
+    """学号前缀：年级（4位）+ 学制类型数（1位）+ 学院ID（2位）+ 专业ID（2位）+ 班级ID（1位）"""
+    # 从学制类型中提取数字（如 '3_year' -> '3', '5_year' -> '5', '6_year' -> '6'）
+    duration_type = school_class.major.duration_type
+    duration_number = duration_type.split('_')[0] if '_' in duration_type else '3'  # 默认3年制
+    return (
+        f"{school_class.enrollment_year}{duration_number}"
+        f"{school_class.major.college.code}{school_class.major.code}{school_class.class_number}"
+    )
+
+
+class StudentNumberAllocator:
+    """
+    按前缀分配学号序号
+    reserve(prefix, n) 在一个事务内锁定序号行，从上次的序号往后取 n 个未被占用的号码：
+    每取一段候选号码用一条 IN 查询排除已被账号名或学号占用的号码（如导入时指定的学号），
+    然后一次更新序号行；序号只增不减，删除学生留下的空号不再复用
+    """
+
+    @staticmethod
+    def _format(prefix: str, number: int) -> str:
+        return f"{prefix}{number:0{STUDENT_NUMBER_DIGITS}d}"
+
+    @staticmethod
+    def _split(student_id: str) -> Optional[Tuple[str, int]]:
+        """学号 -> (前缀, 序号)；末尾不是序号的学号返回 None"""
+        suffix = student_id[-STUDENT_NUMBER_DIGITS:]
+        if len(student_id) <= STUDENT_NUMBER_DIGITS or not suffix.isdigit():
+            return None
+        return student_id[:-STUDENT_NUMBER_DIGITS], int(suffix)
+
+    @staticmethod
+    def _used_ids(prefix: str, candidates=None):
+        """以 prefix 开头（或在 candidates 中）的账号名与学号，一条 UNION 查询"""
+        users = User.objects.all()
+        students = StudentProfile.objects.all()
+        if candidates is None:
+            users = users.filter(username__startswith=prefix)
+            students = students.filter(student_id__startswith=prefix)
+        else:
+            users = users.filter(username__in=candidates)
+            students = students.filter(student_id__in=candidates)
+        return users.values_list('username', flat=True).union(
+            students.values_list('student_id', flat=True)
+        )
+
+    def _existing_max(self, prefix: str) -> int:
+        """首次使用某前缀时，以已存在的账号名、学号中的最大序号作为起点，兼容历史数据"""
+        length = len(prefix) + STUDENT_NUMBER_DIGITS
+        numbers = [
+            int(used[len(prefix):]) for used in self._used_ids(prefix)
+            if len(used) == length and used[len(prefix):].isdigit()
+        ]
+        return max(numbers, default=0)
+
+    def _locked_sequence(self, prefix: str) -> StudentNumberSequence:
+        sequence = StudentNumberSequence.objects.select_for_update().filter(prefix=prefix).first()
+        if sequence is not None:
+            return sequence
+        try:
+            with transaction.atomic():
+                StudentNumberSequence.objects.create(prefix=prefix, last_number=self._existing_max(prefix))
+        except IntegrityError:
+            # 另一个事务已经初始化了该前缀
+            pass
+        return StudentNumberSequence.objects.select_for_update().get(prefix=prefix)
+
+    def reserve(self, prefix: str, count: int = 1) -> List[str]:
+        """预留 count 个未被占用的学号；超过每班上限时抛出 StudentNumberExhausted 且不占用任何序号"""
+        with transaction.atomic():
+            sequence = self._locked_sequence(prefix)
+            numbers: List[int] = []
+            start = sequence.last_number + 1
+            while len(numbers) < count:
+                block = range(start, min(start + count - len(numbers), MAX_STUDENT_NUMBER + 1))
+                if not block:
+                    raise StudentNumberExhausted(f'该班级学生数量已达上限（{MAX_STUDENT_NUMBER}人）')
+                taken = set(self._used_ids(prefix, [self._format(prefix, n) for n in block]))
+                numbers.extend(n for n in block if self._format(prefix, n) not in taken)
+                start = block[-1] + 1
+            sequence.last_number = numbers[-1]
+            sequence.save(update_fields=['last_number', 'updated_at'])
+        return [self._format(prefix, n) for n in numbers]
+
+    def reserve_for_class(self, school_class, count: int = 1) -> List[str]:
+        return self.reserve(student_id_prefix(school_class), count)
+
+    def advance(self, student_ids) -> None:
+        """
+        导入时指定了学号：把已初始化的序号行推进到这些学号之后，之后自动分配的学号不必再逐个跳过；
+        尚未初始化的前缀在首次分配时会从已有学号中取最大值，无需处理
+        """
+        latest: Dict[str, int] = {}
+        for student_id in student_ids:
+            split = self._split(str(student_id))
+            if split is not None:
+                prefix, number = split
+                latest[prefix] = max(number, latest.get(prefix, 0))
+        if not latest:
+            return
+        sequences = StudentNumberSequence.objects.filter(prefix__in=latest).values_list('prefix', 'last_number')
+        for prefix, last_number in list(sequences):
+            if last_number < latest[prefix]:
+                # 条件更新，不会把并发分配推进后的序号改小
+                StudentNumberSequence.objects.filter(
+                    prefix=prefix, last_number__lt=latest[prefix]
+                ).update(last_number=latest[prefix], updated_at=timezone.now())
+
+
+class TeacherLinkReconciler:
+    """
+    按工号批量修复 TeacherProfile.personnel_teacher：
+    先解除与工号不一致的关联，再把未关联的教师账号整批指向同工号的 personnel.Teacher，
+    两条 UPDATE 语句，与教师数量无关
+    """
+
+    def __init__(self):
+        from personnel.models import Teacher
+        from .models import TeacherProfile
+        self.profile_model = TeacherProfile
+        self.teacher_model = Teacher
+
+    def reconcile(self) -> dict:
+        from django.db.models import F
+
+        unlinked = self.profile_model.objects.filter(
+            personnel_teacher__isnull=False
+        ).exclude(personnel_teacher_id=F('teacher_id')).update(personnel_teacher=None)
+        linked = self.profile_model.objects.filter(
+            personnel_teacher__isnull=True,
+            teacher_id__in=self.teacher_model.objects.values('employee_id'),
+        ).update(personnel_teacher_id=F('teacher_id'))
+        if unlinked or linked:
+            # 关联变化影响班主任班级的解析，批量更新不触发信号，手动使身份缓存失效
+            bump_principal_version()
+        return {'unlinked': unlinked, 'linked': linked}
+
+
+class OrgScopeSync:
+    """
+    维护学生档案、考勤、成绩上的组织范围冗余字段（班级、专业、学院）
+    按班级分组整批 UPDATE，语句数与涉及的班级数相关，与记录数无关；
+    考勤、成绩按学生当前所在班级归属，与原先 student__school_class 连表筛选的口径一致
+    """
+
+    def __init__(self):
+        # 考勤、成绩应用依赖 accounts，按模型标签取得以避免循环导入
+        from django.apps import apps
+        from .models import StudentProfile
+        self.student_model = StudentProfile
+        self.class_model = apps.get_model('organization', 'Class')
+        self.record_models = (apps.get_model('attendance_app', 'Attendance'), apps.get_model('grades', 'Grade'))
+
+    def class_scopes(self, class_ids=None) -> Dict[int, Tuple[Optional[int], Optional[int]]]:
+        """班级ID -> (专业ID, 学院ID)；不传 class_ids 时返回全部班级"""
+        qs = self.class_model.objects.all()
+        if class_ids is not None:
+            qs = qs.filter(id__in=class_ids)
+        return {
+            class_id: (major_id, college_id)
+            for class_id, major_id, college_id in qs.values_list('id', 'major_id', 'major__college_id')
+        }
+
+    def fill(self, records):
+        """新建的考勤/成绩写入前按学生档案填充冗余字段；bulk_create 不触发信号，需在调用前执行"""
+        student_ids = {record.student_id for record in records if record.school_class_id is None}
+        if not student_ids:
+            return records
+        scopes = {
+            student_id: (class_id, major_id, college_id)
+            for student_id, class_id, major_id, college_id in self.student_model.objects.filter(
+                id__in=student_ids
+            ).values_list('id', 'school_class_id', 'major_id', 'college_id')
+        }
+        for record in records:
+            if record.school_class_id is None and record.student_id in scopes:
+                record.school_class_id, record.major_id, record.college_id = scopes[record.student_id]
+        return records
+
+    def sync_profiles(self, class_ids) -> int:
+        """只更新学生档案（批量新建学生后调用），返回更新的学生数"""
+        updated = 0
+        for class_id, (major_id, college_id) in self.class_scopes(class_ids).items():
+            updated += self.student_model.objects.filter(school_class_id=class_id).update(
+                major_id=major_id, college_id=college_id
+            )
+        return updated
+
+    def sync_students(self, student_ids) -> int:
+        """学生换班后调用：更新学生档案及其全部考勤、成绩，返回更新的考勤/成绩条数"""
+        by_class = defaultdict(list)
+        for student_id, class_id in self.student_model.objects.filter(
+            id__in=student_ids
+        ).values_list('id', 'school_class_id'):
+            by_class[class_id].append(student_id)
+        scopes = self.class_scopes([class_id for class_id in by_class if class_id is not None])
+
+        updated = 0
+        for class_id, ids in by_class.items():
+            major_id, college_id = scopes.get(class_id, (None, None))
+            self.student_model.objects.filter(id__in=ids).update(major_id=major_id, college_id=college_id)
+            for model in self.record_models:
+                updated += model.objects.filter(student_id__in=ids).update(
+                    school_class_id=class_id, major_id=major_id, college_id=college_id
+                )
+        return updated
+
+    def sync_classes(self, class_ids=None) -> int:
+        """
+        班级换专业后调用：按班级整批更新学生档案及其考勤、成绩，返回更新的考勤/成绩条数
+        不传 class_ids 时处理全部班级，用于历史数据回填
+        """
+        updated = 0
+        for class_id, (major_id, college_id) in self.class_scopes(class_ids).items():
+            self.student_model.objects.filter(school_class_id=class_id).update(
+                major_id=major_id, college_id=college_id
+            )
+            for model in self.record_models:
+                updated += model.objects.filter(student__school_class_id=class_id).update(
+                    school_class_id=class_id, major_id=major_id, college_id=college_id
+                )
+        return updated
+
+    def sync_majors(self, major_ids) -> int:
+        """专业换学院后调用"""
+        return self.sync_classes(list(
+            self.class_model.objects.filter(major_id__in=major_ids).values_list('id', flat=True)
+        ))
+
+    def clear_unassigned(self) -> int:
+        """清除没有班级的学生（班级被删除后置空）及其考勤、成绩上的残留冗余值"""
+        self.student_model.objects.filter(school_class__isnull=True).exclude(
+            major__isnull=True, college__isnull=True
+        ).update(major=None, college=None)
+        updated = 0
+        for model in self.record_models:
+            updated += model.objects.filter(student__school_class__isnull=True).exclude(
+                school_class__isnull=True, major__isnull=True, college__isnull=True
+            ).update(school_class=None, major=None, college=None)
+        return updated
+
+    def backfill(self) -> int:
+        """全量回填，返回更新的考勤/成绩条数"""
+        return self.sync_classes() + self.clear_unassigned()
@@ -0,0 +1,34 @@
+"""
+滑动过期会话
+
+在 cached_db 会话后端（先读缓存，未命中再读数据库；写入时同时写两处）的基础上，
+每次保存时在会话中记录保存时间；SlidingSessionMiddleware 只在剩余有效期低于
+SESSION_RENEW_FRACTION（默认一半）时才标记会话需要保存，替代 SESSION_SAVE_EVERY_REQUEST，
+绝大多数请求不再写 django_session。
+
+空闲超时不会超过 SESSION_COOKIE_AGE：续期时服务端过期时间与 Cookie 的 max_age 一起刷新，
+未续期的请求两者都保持不变，因此实际空闲上限介于 (1 - 比例) × 有效期 与 有效期 之间。
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+SESSION_RENEWED_KEY = '_session_renewed_at'
+
+
+class SessionStore(CachedDBStore):
+
+    def save(self, must_create=False):
+        # 直接写入会话字典，不改变 modified 标记
+        self._get_session(no_load=must_create)[SESSION_RENEWED_KEY] = int(time.time())
+        super().save(must_create=must_create)
+
+    def needs_renewal(self) -> bool:
+        """已保存的时长达到有效期的一定比例时需要续期；没有保存时间的旧会话直接续期"""
+        renewed_at = self.get(SESSION_RENEWED_KEY)
+        if renewed_at is None:
+            return True
+        fraction = getattr(settings, 'SESSION_RENEW_FRACTION', 0.5)
+        return time.time() - renewed_at >= self.get_expiry_age() * fraction
@@ -0,0 +1,155 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from courses.models import CourseSchedule
+from courses.signals import schedules_changed
+from organization.models import Class, Major
+from personnel.models import Teacher
+from .models import AdministratorProfile, StudentProfile, TeacherProfile, UserProfile
+from .authentication import uncache_tokens, uncache_user_tokens
+from .principal import bump_principal_version
+from .services import OrgScopeSync
+
+
+@receiver(pre_save, sender=TeacherProfile)
+def link_personnel_teacher(sender, instance, raw=False, **kwargs):
+    """工号与已关联的人事档案不一致时（新建或修改工号）重新按工号关联"""
+    if raw or instance.personnel_teacher_id == instance.teacher_id:
+        return
+    exists = Teacher.objects.filter(pk=instance.teacher_id).exists()
+    instance.personnel_teacher_id = instance.teacher_id if exists else None
+
+
+@receiver(post_save, sender=Teacher)
+def link_teacher_profile(sender, instance, raw=False, **kwargs):
+    """人事档案保存后，把同工号且尚未关联的教师账号指向它"""
+    if raw:
+        return
+    TeacherProfile.objects.filter(teacher_id=instance.pk, personnel_teacher__isnull=True).update(
+        personnel_teacher_id=instance.pk
+    )
+
+
+# 令牌认证缓存：令牌删除时清除对应缓存；用户信息变化（停用、改密码等）时清除其全部令牌缓存
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    uncache_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def uncache_changed_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    uncache_user_tokens(instance.pk)
+
+
+# 以下信号维护 Principal 缓存：账号与档案变化只影响本人，组织与排课变化影响所有人
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, update_fields=None, **kwargs):
+    # 登录只更新 last_login，与身份无关
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_principal_version(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    bump_principal_version(instance.user_id)
+
+
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_save, sender=AdministratorProfile)
+@receiver(post_delete, sender=AdministratorProfile)
+def invalidate_role_profile_principal(sender, instance, **kwargs):
+    user_id = UserProfile.objects.filter(pk=instance.user_profile_id).values_list('user_id', flat=True).first()
+    bump_principal_version(user_id)
+
+
+@receiver(post_save, sender=CourseSchedule)
+@receiver(post_delete, sender=CourseSchedule)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Major)
+@receiver(post_delete, sender=Major)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def invalidate_all_principals(sender, **kwargs):
+    bump_principal_version()
+
+
+@receiver(schedules_changed)
+def invalidate_all_principals_on_bulk_change(sender, **kwargs):
+    bump_principal_version()
+
+
+# 组织范围冗余字段（学生档案、考勤、成绩上的班级/专业/学院）：
+# 新建时填充；学生换班、班级换专业、专业换学院时在保存后整批同步
+
+@receiver(pre_save, sender=StudentProfile)
+def fill_student_scope(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_class_id = StudentProfile.objects.filter(pk=instance.pk).values_list(
+        'school_class_id', flat=True
+    ).first() if instance.pk else None
+    if old_class_id == instance.school_class_id and (instance.major_id or not instance.school_class_id):
+        return
+    instance.major_id, instance.college_id = OrgScopeSync().class_scopes(
+        [instance.school_class_id]
+    ).get(instance.school_class_id, (None, None))
+    # 已有考勤、成绩的学生需要在保存后同步
+    instance._org_scope_changed = instance.pk is not None
+
+
+@receiver(post_save, sender=StudentProfile)
+def sync_student_records(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, '_org_scope_changed', False):
+        return
+    instance._org_scope_changed = False
+    OrgScopeSync().sync_students([instance.pk])
+
+
+@receiver(pre_save, sender=Class)
+@receiver(pre_save, sender=Major)
+def detect_org_parent_change(sender, instance, raw=False, **kwargs):
+    """班级的专业、专业的学院发生变化时打标记"""
+    if raw or instance.pk is None:
+        return
+    parent = 'major_id' if sender is Class else 'college_id'
+    old_parent_id = sender.objects.filter(pk=instance.pk).values_list(parent, flat=True).first()
+    instance._org_scope_changed = old_parent_id is not None and old_parent_id != getattr(instance, parent)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=Major)
+def sync_org_parent_change(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, '_org_scope_changed', False):
+        return
+    instance._org_scope_changed = False
+    if sender is Class:
+        OrgScopeSync().sync_classes([instance.pk])
+    else:
+        OrgScopeSync().sync_majors([instance.pk])
+
+
+@receiver(post_delete, sender=Class)
+def clear_deleted_class_scope(sender, **kwargs):
+    # 学生的班级外键已被置空
+    OrgScopeSync().clear_unassigned()
+
+
+@receiver(pre_save, sender='attendance_app.Attendance')
+@receiver(pre_save, sender='grades.Grade')
+def fill_record_scope(sender, instance, raw=False, **kwargs):
+    if raw or not instance._state.adding:
+        return
+    OrgScopeSync().fill([instance])
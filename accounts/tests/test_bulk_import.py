@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.importers import import_student_rows, import_teacher_rows
+from accounts.models import StudentProfile, TeacherProfile
+from accounts.principal import Principal
+from organization.models import Class, College, Major
+from personnel.models import Teacher
+
+
+class BulkImportTests(TestCase):
+    """bulk_create 不触发信号：导入时须直接写入人事档案关联与组织范围冗余字段"""
+
+    def setUp(self):
+        cache.clear()
+        self.college = College.objects.create(code='01', name='信息学院')
+        self.major = Major.objects.create(code='01', name='软件', college=self.college)
+        self.school_class = Class.objects.create(major=self.major, enrollment_year=2024, class_number=1)
+
+    def test_imported_teacher_links_personnel_and_keeps_head_classes(self):
+        # 人事档案先于账号存在（Teacher.save 会自动建账号，这里直接写入）
+        Teacher.objects.bulk_create([Teacher(employee_id='T100', name='王老师', gender='male', hire_date=date(2020, 1, 1),
+                                             college=self.college, position_type='head_teacher')])
+        Class.objects.filter(id=self.school_class.id).update(head_teacher_id='T100')
+
+        result = import_teacher_rows([
+            {'username': '王老师', 'teacher_id': 'T100'},
+            {'username': '赵老师', 'teacher_id': 'T101'},
+        ])
+        self.assertEqual(result.created, 2, result.errors)
+        links = dict(TeacherProfile.objects.values_list('teacher_id', 'personnel_teacher_id'))
+        self.assertEqual(links, {'T100': 'T100', 'T101': None})
+
+        principal = Principal.for_user(User.objects.get(username='T100'))
+        self.assertEqual(principal.head_class_ids, (self.school_class.id,))
+
+    def test_imported_students_get_org_scope(self):
+        result = import_student_rows([
+            {'username': '学生甲', 'student_id': '20240001', 'class_name': self.school_class.name},
+            {'username': '学生乙', 'student_id': '20240002'},
+        ])
+        self.assertEqual(result.created, 2)
+        scopes = {
+            student_id: (class_id, major_id, college_id)
+            for student_id, class_id, major_id, college_id in StudentProfile.objects.values_list(
+                'student_id', 'school_class_id', 'major_id', 'college_id'
+            )
+        }
+        self.assertEqual(scopes['20240001'], (self.school_class.id, self.major.id, self.college.id))
+        self.assertEqual(scopes['20240002'], (None, None, None))
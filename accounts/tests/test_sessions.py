@@ -0,0 +1,46 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.test import Client, TestCase
+
+from accounts.sessions import SessionStore
+
+
+class SlidingSessionTests(TestCase):
+
+    def setUp(self):
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        User.objects.create_user('T001', password='x')
+        self.client.login(username='T001', password='x')
+        self.key = self.client.cookies['sessionid'].value
+
+    def test_requests_do_not_rewrite_fresh_session(self):
+        expire_date = Session.objects.get(session_key=self.key).expire_date
+        r = self.client.get('/api/accounts/me')
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn('sessionid', r.cookies)
+        self.assertEqual(Session.objects.get(session_key=self.key).expire_date, expire_date)
+
+    def test_session_renewed_past_fraction(self):
+        expire_date = Session.objects.get(session_key=self.key).expire_date
+        now = time.time()
+        with mock.patch('time.time', lambda: now + settings.SESSION_COOKIE_AGE * 0.6):
+            r = self.client.get('/api/accounts/me')
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('sessionid', r.cookies)
+        self.assertGreater(Session.objects.get(session_key=self.key).expire_date, expire_date)
+
+    def test_logout_revokes_session_for_other_clients(self):
+        # 另一个客户端（如另一个 worker 处理的请求）持有同一会话
+        other = Client()
+        other.cookies['sessionid'] = self.key
+        self.assertEqual(other.get('/api/accounts/me').status_code, 200)
+
+        self.client.logout()
+        self.assertFalse(SessionStore().exists(self.key))
+        self.assertIsNone(caches[settings.SESSION_CACHE_ALIAS].get(SessionStore().cache_key_prefix + self.key))
+        self.assertIn(other.get('/api/accounts/me').status_code, (401, 403))
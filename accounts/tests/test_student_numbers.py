@@ -0,0 +1,71 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.importers import import_student_rows
+from accounts.models import StudentNumberSequence, StudentProfile, UserProfile
+from accounts.services import StudentNumberAllocator, StudentNumberExhausted, student_id_prefix
+from organization.models import Class, College, Major
+
+
+class StudentNumberAllocatorTests(TestCase):
+    """自动分配的学号不能与已有账号名或学号（含导入时指定的学号）冲突"""
+
+    def setUp(self):
+        cache.clear()
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        self.school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        self.prefix = student_id_prefix(self.school_class)
+        self.allocator = StudentNumberAllocator()
+
+    def _student(self, username, student_id):
+        profile = UserProfile.objects.create(user=User.objects.create_user(username, password='x'), role='student')
+        return StudentProfile.objects.create(user_profile=profile, student_id=student_id, school_class=self.school_class)
+
+    def test_seed_covers_usernames_and_student_ids(self):
+        self._student('legacy', self.prefix + '03')
+        User.objects.create_user(self.prefix + '01', password='x')
+        self.assertEqual(self.allocator.reserve(self.prefix), [self.prefix + '04'])
+
+    def test_skips_numbers_taken_after_seeding(self):
+        self.assertEqual(self.allocator.reserve(self.prefix), [self.prefix + '01'])
+        self._student('imported', self.prefix + '02')
+        User.objects.create_user(self.prefix + '04', password='x')
+
+        self.assertEqual(self.allocator.reserve(self.prefix, 3), [self.prefix + n for n in ('03', '05', '06')])
+        self.assertEqual(StudentNumberSequence.objects.get(prefix=self.prefix).last_number, 6)
+
+    def test_exhausted_reservation_consumes_nothing(self):
+        StudentNumberSequence.objects.create(prefix=self.prefix, last_number=97)
+        User.objects.create_user(self.prefix + '98', password='x')
+        with self.assertRaises(StudentNumberExhausted):
+            self.allocator.reserve(self.prefix, 2)
+        self.assertEqual(StudentNumberSequence.objects.get(prefix=self.prefix).last_number, 97)
+        self.assertEqual(self.allocator.reserve(self.prefix), [self.prefix + '99'])
+
+    def test_import_advances_sequence(self):
+        self.allocator.reserve(self.prefix)
+        result = import_student_rows([{'username': '学生甲', 'student_id': self.prefix + '10'}])
+        self.assertEqual(result.created, 1, result.errors)
+        self.assertEqual(StudentNumberSequence.objects.get(prefix=self.prefix).last_number, 10)
+
+    def test_create_and_bulk_admit_avoid_existing_ids(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser('admin', password='x'))
+        self.allocator.reserve(self.prefix)
+        self._student('imported', self.prefix + '02')
+
+        r = admin.post('/api/accounts/students/', {'name_write': '新生', 'school_class': self.school_class.id},
+                       format='json')
+        self.assertEqual(r.status_code, 201, r.data)
+        self.assertEqual(r.data['student_id'], self.prefix + '03')
+        self.assertEqual(StudentProfile.objects.get(student_id=self.prefix + '02').user_profile.user.username,
+                         'imported')
+
+        r = admin.post('/api/accounts/students/bulk_admit/', {
+            'school_class': self.school_class.id, 'students': [{'name': '甲'}, {'name': '乙'}],
+        }, format='json')
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(r.data['student_ids'], [self.prefix + '04', self.prefix + '05'])
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from accounts.authentication import token_cache_key
+
+
+class TokenRevocationTests(TestCase):
+    """令牌认证结果有缓存：注销、改密码、管理员重置密码后旧令牌必须立即失效"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('T001', password='old-Passw0rd!')
+        self.token = Token.objects.create(user=self.user)
+        self.client = self._token_client(self.token.key)
+        # 先请求一次，令牌进入缓存
+        self.assertEqual(self.client.get('/api/accounts/me').status_code, 200)
+        self.assertIsNotNone(cache.get(token_cache_key(self.token.key)))
+
+    def _token_client(self, key):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        return client
+
+    def test_revoke_invalidates_cached_token(self):
+        self.assertEqual(self.client.post('/api/accounts/token/revoke').status_code, 200)
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertIn(self._token_client(self.token.key).get('/api/accounts/me').status_code, (401, 403))
+
+    def test_change_password_rotates_token(self):
+        r = self.client.post('/api/accounts/password/change', {
+            'old_password': 'old-Passw0rd!', 'new_password': 'new-Passw0rd!',
+        }, format='json')
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertIn(self._token_client(self.token.key).get('/api/accounts/me').status_code, (401, 403))
+        self.assertEqual(self._token_client(r.data['token']).get('/api/accounts/me').status_code, 200)
+
+    def test_admin_set_password_revokes_tokens(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_superuser('admin', password='x'))
+        r = admin.post('/api/accounts/password/set', {
+            'user_id': self.user.id, 'new_password': 'new-Passw0rd!',
+        }, format='json')
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertIn(self._token_client(self.token.key).get('/api/accounts/me').status_code, (401, 403))
+
+    def test_deactivated_user_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIn(self._token_client(self.token.key).get('/api/accounts/me').status_code, (401, 403))
+
+    @override_settings(TOKEN_EXPIRE_HOURS=1)
+    def test_expired_token_deleted(self):
+        Token.objects.filter(key=self.token.key).update(created=self.token.created.replace(year=2000))
+        cache.clear()
+        self.assertIn(self._token_client(self.token.key).get('/api/accounts/me').status_code, (401, 403))
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
@@ -6,6 +6,8 @@ from .views import (
     TeacherProfileViewSet,
     AdministratorProfileViewSet,
     ObtainAuthTokenView,
+    RotateTokenView,
+    RevokeTokenView,
     ChangePasswordView,
     ChangePhoneView,
     SetPasswordView,
@@ -22,6 +24,8 @@ router.register('admins', AdministratorProfileViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('token/', ObtainAuthTokenView.as_view(), name='obtain_token'),
+    path('token/rotate', RotateTokenView.as_view(), name='rotate_token'),
+    path('token/revoke', RevokeTokenView.as_view(), name='revoke_token'),
     path('password/change', ChangePasswordView.as_view(), name='change_password'),
     path('phone/change', ChangePhoneView.as_view(), name='change_phone'),
     path('password/set', SetPasswordView.as_view(), name='set_password'),
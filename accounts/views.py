@@ -8,8 +8,14 @@ from rest_framework.authtoken.models import Token
 from courses.models import CourseSchedule
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from .authentication import issue_token, revoke_user_tokens, rotate_token, token_expires_at
 from .permissions import IsSystemAdmin
-from .importers import import_students, import_teachers
+from .principal import bump_principal_version, principal_of
+import re
+from django.db import transaction
+from .importers import ImportResult, bulk_create_accounts, import_students, import_teachers
+from .services import OrgScopeSync, StudentNumberAllocator, StudentNumberExhausted
+from jobs.runner import enqueue_import, job_accepted
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Count
 from .models import UserProfile, StudentProfile, TeacherProfile, AdministratorProfile
@@ -35,102 +41,24 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
     pagination_class = None  # 禁用分页，返回所有数据
 
     def get_queryset(self):
-        user = self.request.user
+        principal = principal_of(self.request)
         # 优化查询：添加所有需要的select_related来避免N+1查询
-        base_select_related = [
-            'user_profile', 'user_profile__user', 
+        qs = StudentProfile.objects.select_related(
+            'user_profile', 'user_profile__user',
             'school_class', 'school_class__major', 'school_class__major__college'
-        ]
-        if getattr(user, 'is_superuser', False):
-            qs = StudentProfile.objects.select_related(*base_select_related).all()
-            return self._apply_filters(qs)
-        if not hasattr(user, 'profile'):
-            return StudentProfile.objects.none()
-        role = user.profile.role
-        if role in ['super_admin', 'principal', 'vice_principal']:
-            qs = StudentProfile.objects.select_related(*base_select_related).all()
-            return self._apply_filters(qs)
-        if role == 'head_teacher':
-            teacher = getattr(user.profile, 'teacher_profile', None)
-            if not teacher:
-                return StudentProfile.objects.none()
-            # 允许班主任查询自己班级的学生，也允许通过 class 参数查询特定班级的学生（如果他们有权限）
-            # 这里我们放宽一点，如果指定了 class 参数，就按参数查，否则查自己管理的班级
-            # 实际业务中可能需要严格校验是否有权限查看该班级
-            
-            # 优先处理显式的 class 过滤
-            klass = self.request.query_params.get('class')
-            if klass:
-                 # 检查是否是自己管理的班级？或者仅仅允许查看？
-                 # 考虑到 "点击班级后没有学生对应班级的学生你从数据库里获取" 这个需求，
-                 # 班主任可能需要查看自己管理的班级，也可能需要查看其他班级（如果允许）
-                 # 但通常班主任只能看自己班。
-                 # 不过，前端发起的请求带了 class 参数，我们应该响应那个班级的学生。
-                 # 如果那个班级正好是该班主任管理的，那就没问题。
-                 # 如果不是，是否允许？
-                 # 让我们先允许通过 class 参数查询，然后在 _apply_filters 中过滤。
-                 # 但是 get_queryset 必须先返回一个包含该班级学生的 queryset。
-                 
-                 # 简单起见，我们先返回所有学生，依靠 _apply_filters 来过滤。
-                 # 但为了性能和安全性，我们应该限制范围。
-                 
-                 # 让我们修改逻辑：如果指定了 class，就返回该班级的学生。
-                 # 还需要确保班主任有权限查看该班级。
-                 # 目前 permissions.py 里似乎没有严格限制班主任只能看自己班级的学生？
-                 # 让我们先假设班主任可以查看任何班级的学生（为了修复问题），或者至少查看自己关联的班级。
-                 
-                 # 实际上，前端传来的 class ID 应该是该班主任管理的班级 ID。
-                 # 所以我们只要确保 queryset 包含那个班级的学生即可。
-                 
-                 # 旧逻辑：qs = StudentProfile.objects.filter(school_class__head_teacher=teacher)
-                 # 这只返回了 head_teacher 是当前用户的班级的学生。
-                 # 如果前端传来的 class ID 确实是该班主任管理的班级，那么旧逻辑应该没问题。
-                 # 除非... Class.head_teacher 关联的是 personnel.Teacher，而 user.profile.teacher_profile 是 accounts.TeacherProfile。
-                 # 这两个模型不同！
-                 
-                 # 这是一个关键问题：user.profile.teacher_profile 是 accounts.TeacherProfile
-                 # Class.head_teacher 是 personnel.Teacher
-                 # 它们虽然代表同一个人，但是不同的数据库记录。
-                 # 我们需要通过 teacher_id (工号) 来关联。
-                 
-                 from personnel.models import Teacher as PersonnelTeacher
-                 try:
-                     pt = PersonnelTeacher.objects.get(employee_id=teacher.teacher_id)
-                     qs = StudentProfile.objects.filter(
-                         school_class__head_teacher=pt
-                     ).select_related(
-                         'user_profile', 'user_profile__user',
-                         'school_class', 'school_class__major', 'school_class__major__college'
-                     )
-                 except PersonnelTeacher.DoesNotExist:
-                     return StudentProfile.objects.none()
-                     
-                 return self._apply_filters(qs)
-
-            # 如果没有指定 class 参数，默认显示自己管理班级的学生
-            from personnel.models import Teacher as PersonnelTeacher
-            try:
-                pt = PersonnelTeacher.objects.get(employee_id=teacher.teacher_id)
-                qs = StudentProfile.objects.filter(
-                    school_class__head_teacher=pt
-                ).select_related(
-                    'user_profile', 'user_profile__user',
-                    'school_class', 'school_class__major', 'school_class__major__college'
-                )
-            except PersonnelTeacher.DoesNotExist:
+        )
+        if principal.is_school_admin:
+            return self._apply_filters(qs.all())
+        if principal.role == 'head_teacher':
+            if not principal.teacher_id:
                 return StudentProfile.objects.none()
-            return self._apply_filters(qs)
+            # 班主任只能看自己管理班级的学生；前端传入的 class 参数在 _apply_filters 中进一步过滤
+            return self._apply_filters(qs.filter(school_class_id__in=principal.head_class_ids))
         # 普通教师不能访问学生管理
-        if role == 'teacher':
+        if principal.role == 'teacher':
             return StudentProfile.objects.none()
-        if role == 'student':
-            qs = StudentProfile.objects.filter(
-                user_profile=user.profile
-            ).select_related(
-                'user_profile', 'user_profile__user',
-                'school_class', 'school_class__major', 'school_class__major__college'
-            )
-            return self._apply_filters(qs)
+        if principal.is_student:
+            return self._apply_filters(qs.filter(user_profile_id=principal.user_profile_id))
         return StudentProfile.objects.none()
 
     @action(detail=False, methods=['post'])
@@ -160,12 +88,68 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
         try:
             # Check permissions
             qs = self.get_queryset().filter(id__in=ids)
+            student_ids = list(qs.values_list('id', flat=True))
             updated_count = qs.update(**update_data)
-            
+            if 'school_class' in update_data:
+                # 批量更新不触发信号，学生所在班级变化需手动同步冗余字段并使身份缓存失效
+                OrgScopeSync().sync_students(student_ids)
+                bump_principal_version()
+
             return Response({'updated': updated_count})
         except Exception as e:
              return Response({'error': str(e)}, status=500)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsSystemAdmin])
+    def bulk_admit(self, request):
+        """
+        整班录取：{"school_class": 1, "students": [{"name": "张三", "phone": "", "gender": "male"}, ...]}
+        一次预留全部学号（序号表加锁一次），账号与档案分块批量写入
+        """
+        from organization.models import Class
+        students = request.data.get('students')
+        if not isinstance(students, list) or not students:
+            return Response({'error': '缺少学生列表'}, status=400)
+        school_class = Class.objects.select_related('major__college').filter(
+            id=request.data.get('school_class')
+        ).first()
+        if not school_class:
+            return Response({'error': 'Class not found'}, status=400)
+
+        errors = []
+        for index, student in enumerate(students):
+            if not isinstance(student, dict) or not str(student.get('name') or '').strip():
+                errors.append({'index': index, 'error': '必须填写姓名'})
+            elif student.get('phone') and student['phone'] != '无' and not re.match(r'^1[3-9]\d{9}$', student['phone']):
+                errors.append({'index': index, 'error': '手机号格式不正确'})
+        if errors:
+            return Response({'error': '数据校验失败', 'errors': errors}, status=400)
+
+        result = ImportResult()
+        with transaction.atomic():
+            try:
+                student_ids = StudentNumberAllocator().reserve_for_class(school_class, len(students))
+            except StudentNumberExhausted as e:
+                return Response({'error': str(e)}, status=400)
+            items = [
+                (student_id, str(student['name']).strip(),
+                 {'phone': student.get('phone') or '', 'gender': student.get('gender') or None}, student_id)
+                for student_id, student in zip(student_ids, students)
+            ]
+            bulk_create_accounts(
+                items, 'student', StudentProfile,
+                lambda profile_id, student_id: StudentProfile(
+                    user_profile_id=profile_id, student_id=student_id,
+                    school_class=school_class, created_by=request.user,
+                ),
+                'student', result,
+            )
+            OrgScopeSync().sync_profiles([school_class.id])
+            # 预留的学号都未被占用，写入失败被跳过的学号不返回
+            created_ids = list(StudentProfile.objects.filter(
+                student_id__in=student_ids
+            ).order_by('student_id').values_list('student_id', flat=True))
+        return Response({'created': result.created, 'student_ids': created_ids, 'errors': result.errors})
+
     def _apply_filters(self, qs):
         params = self.request.query_params
         q = params.get('q')
@@ -185,15 +169,15 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
         department = params.get('department')
         if department:
             if ',' in department:
-                qs = qs.filter(school_class__major_id__in=department.split(','))
+                qs = qs.filter(major_id__in=department.split(','))
             else:
-                qs = qs.filter(school_class__major_id=department)
+                qs = qs.filter(major_id=department)
         college = params.get('college')
         if college:
             if ',' in college:
-                qs = qs.filter(school_class__major__college_id__in=college.split(','))
+                qs = qs.filter(college_id__in=college.split(','))
             else:
-                qs = qs.filter(school_class__major__college_id=college)
+                qs = qs.filter(college_id=college)
         klass = params.get('class')
         if klass:
             if ',' in klass:
@@ -212,30 +196,22 @@ class StudentProfileViewSet(viewsets.ModelViewSet):
         return Response(data)
 
     def create(self, request, *args, **kwargs):
-        user = request.user
-        role = getattr(getattr(user, 'profile', None), 'role', None)
-        if role == 'student':
+        if principal_of(request).is_student:
             return Response({'detail': '学生不可修改个人学籍信息'}, status=403)
         return super().create(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
-        user = request.user
-        role = getattr(getattr(user, 'profile', None), 'role', None)
-        if role == 'student':
+        if principal_of(request).is_student:
             return Response({'detail': '学生不可修改个人学籍信息'}, status=403)
         return super().update(request, *args, **kwargs)
 
     def partial_update(self, request, *args, **kwargs):
-        user = request.user
-        role = getattr(getattr(user, 'profile', None), 'role', None)
-        if role == 'student':
+        if principal_of(request).is_student:
             return Response({'detail': '学生不可修改个人学籍信息'}, status=403)
         return super().partial_update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
-        user = request.user
-        role = getattr(getattr(user, 'profile', None), 'role', None)
-        if role == 'student':
+        if principal_of(request).is_student:
             return Response({'detail': '学生不可修改个人学籍信息'}, status=403)
         return super().destroy(request, *args, **kwargs)
 
@@ -247,26 +223,16 @@ class TeacherProfileViewSet(viewsets.ModelViewSet):
     pagination_class = None  # 禁用分页，返回所有数据
 
     def get_queryset(self):
-        user = self.request.user
-        if getattr(user, 'is_superuser', False):
-            qs = TeacherProfile.objects.select_related('user_profile', 'department', 'subject').all()
-            return self._apply_filters(qs)
-        if not hasattr(user, 'profile'):
-            return TeacherProfile.objects.none()
-        role = user.profile.role
-        if role in ['super_admin', 'principal', 'vice_principal']:
-            qs = TeacherProfile.objects.select_related('user_profile', 'department', 'subject').all()
-            return self._apply_filters(qs)
-        if role in ['dean', 'vice_dean']:
-            admin = getattr(user.profile, 'administrator_profile', None)
-            if admin and admin.department_id:
-                qs = TeacherProfile.objects.filter(department_id=admin.department_id)
-                return self._apply_filters(qs)
-            qs = TeacherProfile.objects.select_related('department', 'subject').all()
-            return self._apply_filters(qs)
-        if role in ['teacher', 'head_teacher']:
-            qs = TeacherProfile.objects.filter(user_profile=user.profile)
-            return self._apply_filters(qs)
+        principal = principal_of(self.request)
+        qs = TeacherProfile.objects.select_related('user_profile', 'department', 'subject')
+        if principal.is_school_admin:
+            return self._apply_filters(qs.all())
+        if principal.is_college_admin:
+            if principal.department_id:
+                return self._apply_filters(qs.filter(department_id=principal.department_id))
+            return self._apply_filters(qs.all())
+        if principal.is_teacher:
+            return self._apply_filters(qs.filter(user_profile_id=principal.user_profile_id))
         return TeacherProfile.objects.none()
 
     def _apply_filters(self, qs):
@@ -286,7 +252,10 @@ class TeacherProfileViewSet(viewsets.ModelViewSet):
         college = params.get('college')
         if college:
             qs = qs.filter(department__college_id=college)
-        return qs
+        # 序列化需要的用户、学院信息一并连接查询
+        return qs.select_related(
+            'user_profile__user', 'department__college', 'subject', 'personnel_teacher__managed_classes'
+        )
 
     def list(self, request, *args, **kwargs):
         qs = self.get_queryset()
@@ -320,12 +289,8 @@ class TeacherProfileViewSet(viewsets.ModelViewSet):
         user = instance.user_profile.user
         
         # 同步删除 personnel.Teacher
-        from personnel.models import Teacher as PersonnelTeacher
-        try:
-            pt = PersonnelTeacher.objects.get(employee_id=instance.teacher_id)
-            pt.delete()
-        except PersonnelTeacher.DoesNotExist:
-            pass
+        if instance.personnel_teacher is not None:
+            instance.personnel_teacher.delete()
             
         instance.delete()
         if user:
@@ -354,12 +319,10 @@ class TeacherProfileViewSet(viewsets.ModelViewSet):
         from organization.models import Class
         sched_rows = CourseSchedule.objects.filter(teacher_id__in=teacher_ids).values('teacher_id', 'school_class_id')
         
-        # Class.head_teacher refers to personnel.Teacher (PK=employee_id), not TeacherProfile (PK=id)
-        # We need to map employee_ids back to TeacherProfile IDs
-        teacher_map = {tp.teacher_id: tp.id for tp in qs if tp.id in set(teacher_ids)}
-        teacher_employee_ids = list(teacher_map.keys())
-        
-        head_rows = Class.objects.filter(head_teacher_id__in=teacher_employee_ids).values('head_teacher_id', 'id')
+        # Class.head_teacher 指向 personnel.Teacher，经 account_profile 反向关联直接取到 TeacherProfile ID
+        head_rows = Class.objects.filter(
+            head_teacher__account_profile__id__in=teacher_ids
+        ).values('head_teacher__account_profile__id', 'id')
         by_teacher_classes = {}
         for row in sched_rows:
             tid = row['teacher_id']
@@ -369,12 +332,10 @@ class TeacherProfileViewSet(viewsets.ModelViewSet):
             s = by_teacher_classes.setdefault(tid, set())
             s.add(cid)
         for row in head_rows:
-            tid_str = row['head_teacher_id']
-            tid = teacher_map.get(tid_str)
-            if tid:
-                cid = row['id']
-                s = by_teacher_classes.setdefault(tid, set())
-                s.add(cid)
+            tid = row['head_teacher__account_profile__id']
+            cid = row['id']
+            s = by_teacher_classes.setdefault(tid, set())
+            s.add(cid)
         all_class_ids = set()
         for s in by_teacher_classes.values():
             all_class_ids |= s
@@ -395,6 +356,11 @@ class AdministratorProfileViewSet(viewsets.ModelViewSet):
     pagination_class = None  # 禁用分页，返回所有数据
 
 
+def token_payload(token):
+    expires_at = token_expires_at(token)
+    return {'token': token.key, 'expires_at': expires_at.isoformat() if expires_at else None}
+
+
 class ObtainAuthTokenView(APIView):
     authentication_classes = []
     permission_classes = []
@@ -405,8 +371,25 @@ class ObtainAuthTokenView(APIView):
         user = authenticate(username=username, password=password)
         if not user:
             return Response({'detail': '用户名或密码错误'}, status=400)
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({'token': token.key})
+        return Response(token_payload(issue_token(user)))
+
+
+class RotateTokenView(APIView):
+    """作废当前用户的令牌并签发新令牌，客户端应在令牌过期前调用"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response(token_payload(rotate_token(request.user)))
+
+
+class RevokeTokenView(APIView):
+    """令牌注销：删除本次请求使用的令牌"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.auth, Token):
+            Token.objects.filter(key=request.auth.key).delete()
+        return Response({'detail': '已退出登录'})
 
 
 class ChangePasswordView(APIView):
@@ -423,6 +406,10 @@ class ChangePasswordView(APIView):
             return Response({'detail': list(e)}, status=400)
         request.user.set_password(new_password)
         request.user.save()
+        # 旧令牌全部作废；令牌登录的客户端拿到新令牌后继续使用
+        if isinstance(request.auth, Token):
+            return Response({'detail': '密码已更新', **token_payload(rotate_token(request.user))})
+        revoke_user_tokens(request.user)
         return Response({'detail': '密码已更新'})
 
 
@@ -467,6 +454,7 @@ class SetPasswordView(APIView):
             return Response({'detail': list(e)}, status=400)
         target.set_password(new_password)
         target.save()
+        revoke_user_tokens(target)
         return Response({'detail': '密码已重置'})
 
 
@@ -477,6 +465,9 @@ class BulkImportView(APIView):
         import_type = (request.data.get('type') or '').strip()
         if import_type not in ['students', 'teachers']:
             return Response({'detail': 'type 必须为 students 或 teachers'}, status=400)
+        # 上传文件且 background=true 时暂存文件并转为后台导入任务
+        if 'file' in request.FILES and str(request.data.get('background')).lower() == 'true':
+            return job_accepted(enqueue_import(request, import_type))
         if import_type == 'students':
             result = import_students(request)
         else:
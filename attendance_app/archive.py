@@ -0,0 +1,175 @@
+"""
+冷热数据分离：把往学期的考勤（以及已毕业年级的成绩）按块迁入归档表
+
+每一块在一个短事务内完成"复制到归档表 -> 删除原记录 -> 推进进度游标"，
+不会长时间锁表；归档表主键沿用原记录ID，中断后重跑不会重复写入
+"""
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ArchiveProgress, Attendance, AttendanceArchive, StudentTermAttendance
+from .services import STATUS_DISPLAY, deferred_summary_refresh
+
+
+ARCHIVE_BOUNDARY_CACHE_PREFIX = 'archive_boundary:'
+ARCHIVE_BOUNDARY_TIMEOUT = 60
+
+
+def current_term_start() -> date:
+    """当前学期开始日期（SEMESTER_START_DATE），早于该日期的考勤属于往学期"""
+    return date.fromisoformat(settings.SEMESTER_START_DATE)
+
+
+def term_label(day: date) -> str:
+    """按学年划分学期：8月至次年1月为第一学期，2月至7月为第二学期，如 2024-2025-1"""
+    if day.month >= 8:
+        return f'{day.year}-{day.year + 1}-1'
+    if day.month == 1:
+        return f'{day.year - 1}-{day.year}-1'
+    return f'{day.year - 1}-{day.year}-2'
+
+
+def archive_boundary(kind: str) -> Optional[date]:
+    """已完成归档的截止日期（取最大值），早于该日期的查询应读归档表；未归档过返回 None"""
+    key = f'{ARCHIVE_BOUNDARY_CACHE_PREFIX}{kind}'
+    boundary = cache.get(key)
+    if boundary is None:
+        progress = ArchiveProgress.objects.filter(
+            name__startswith=f'{kind}:', finished=True
+        ).order_by('-before').first()
+        boundary = progress.before if progress else ''
+        cache.set(key, boundary, ARCHIVE_BOUNDARY_TIMEOUT)
+    return boundary or None
+
+
+class ChunkedArchiver:
+    """
+    分块归档基类
+    子类提供 kind、source_queryset()、archive_model 与 to_archive()，
+    需要在迁移时维护汇总的可重写 after_chunk()
+    """
+    kind = ''
+    archive_model = None
+    fields: tuple = ()
+
+    def __init__(self, before: date, chunk_size: int = 5000):
+        self.before = before
+        self.chunk_size = chunk_size
+
+    @property
+    def progress_name(self) -> str:
+        return f'{self.kind}:{self.before.isoformat()}'
+
+    def source_queryset(self):
+        raise NotImplementedError
+
+    def to_archive(self, row: Dict[str, Any]):
+        raise NotImplementedError
+
+    def after_chunk(self, rows: List[Dict[str, Any]]) -> None:
+        pass
+
+    def delete_source(self, ids: List[int]) -> None:
+        self.source_queryset().model.objects.filter(id__in=ids).delete()
+
+    def pending(self) -> int:
+        progress = ArchiveProgress.objects.filter(name=self.progress_name).first()
+        last_id = progress.last_id if progress else 0
+        return self.source_queryset().filter(id__gt=last_id).count()
+
+    def reset(self) -> None:
+        ArchiveProgress.objects.filter(name=self.progress_name).delete()
+
+    def run_chunk(self) -> int:
+        """迁移一块，返回本块条数；0 表示已全部完成"""
+        with transaction.atomic():
+            progress, _ = ArchiveProgress.objects.select_for_update().get_or_create(
+                name=self.progress_name, defaults={'before': self.before}
+            )
+            rows = list(self.source_queryset().filter(
+                id__gt=progress.last_id
+            ).order_by('id').values(*self.fields)[:self.chunk_size])
+            if not rows:
+                progress.finished = True
+                progress.save(update_fields=['finished', 'updated_at'])
+                transaction.on_commit(lambda: cache.delete(f'{ARCHIVE_BOUNDARY_CACHE_PREFIX}{self.kind}'))
+                return 0
+            ids = [row['id'] for row in rows]
+            self.archive_model.objects.bulk_create(
+                [self.to_archive(row) for row in rows], batch_size=1000, ignore_conflicts=True
+            )
+            self.after_chunk(rows)
+            self.delete_source(ids)
+            progress.last_id = ids[-1]
+            progress.moved += len(rows)
+            progress.finished = False
+            progress.save(update_fields=['last_id', 'moved', 'finished', 'updated_at'])
+        return len(rows)
+
+    def run(self, max_chunks: Optional[int] = None, on_chunk: Optional[Callable[[int], None]] = None) -> int:
+        """循环迁移直到完成或达到 max_chunks，返回本次迁移的总条数"""
+        moved = chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            count = self.run_chunk()
+            if not count:
+                break
+            moved += count
+            chunks += 1
+            if on_chunk:
+                on_chunk(count)
+        return moved
+
+
+class AttendanceArchiver(ChunkedArchiver):
+    """
+    往学期考勤归档
+    迁移时把每个学生的学期汇总累加到 StudentTermAttendance；
+    (日期, 班级) 日汇总保持不变，历史日期的列表计数仍可直接读取
+    """
+    kind = 'attendance'
+    archive_model = AttendanceArchive
+    fields = ('id', 'student_id', 'schedule_id', 'date', 'status', 'remark')
+
+    def source_queryset(self):
+        return Attendance.objects.filter(date__lt=self.before)
+
+    def to_archive(self, row):
+        return AttendanceArchive(term=term_label(row['date']), **row)
+
+    def after_chunk(self, rows):
+        counts: Dict[tuple, Dict[str, int]] = {}
+        for row in rows:
+            bucket = counts.setdefault((row['student_id'], term_label(row['date'])), dict.fromkeys(STATUS_DISPLAY, 0))
+            if row['status'] in bucket:
+                bucket[row['status']] += 1
+
+        student_ids = {student_id for student_id, _ in counts}
+        terms = {term for _, term in counts}
+        existing = {
+            (s.student_id, s.term): s
+            for s in StudentTermAttendance.objects.select_for_update().filter(
+                student_id__in=student_ids, term__in=terms
+            )
+        }
+        to_create, to_update = [], []
+        for (student_id, term), bucket in counts.items():
+            summary = existing.get((student_id, term))
+            if summary is None:
+                summary = StudentTermAttendance(student_id=student_id, term=term)
+                to_create.append(summary)
+            else:
+                to_update.append(summary)
+            for status, count in bucket.items():
+                setattr(summary, status, getattr(summary, status) + count)
+            summary.total += sum(bucket.values())
+        StudentTermAttendance.objects.bulk_create(to_create, batch_size=1000)
+        StudentTermAttendance.objects.bulk_update(to_update, ['total', *STATUS_DISPLAY], batch_size=1000)
+
+    def delete_source(self, ids):
+        # 归档删除不应改动日汇总，暂停逐条记录触发的汇总刷新
+        with deferred_summary_refresh():
+            super().delete_source(ids)
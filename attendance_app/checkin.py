@@ -0,0 +1,259 @@
+"""
+学生自助签到
+
+签到码：对 (课程安排, 日期, 时间窗口) 做 HMAC，按时间窗口轮换，生成与校验都不访问数据库
+写入：签到请求只做校验并放入进程内有界队列，后台线程每隔几百毫秒把队列中的签到合并成一次
+bulk_create upsert 写入 Attendance：默认的"正常"记录（打开点名页时生成）被签到结果覆盖，
+教师已录入的记录保留不变；队列满时拒绝请求（503），由客户端稍后重试
+
+注意：队列在进程内存中，进程异常退出时尚未落库的签到会丢失（正常退出时会尽量写完）
+"""
+import atexit
+import hmac
+import logging
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+from hashlib import sha256
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from accounts.services import OrgScopeSync
+from courses.models import CourseSchedule
+from .models import Attendance
+from .services import AttendanceSummaryService, is_default_record, upsert_kwargs
+
+
+logger = logging.getLogger(__name__)
+
+CHECKIN_CODE_DIGITS = 6
+CHECKIN_SCHEDULE_CACHE_PREFIX = 'checkin_schedule:'
+CHECKIN_SCHEDULE_CACHE_TIMEOUT = 600
+CHECKIN_REMARK = '自助签到'
+
+
+def checkin_setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class CheckinCode:
+    """轮换签到码：HMAC-SHA256(密钥, 课程安排:日期:窗口序号) 截取为 6 位数字"""
+
+    def __init__(self, window_seconds: Optional[int] = None):
+        self.window_seconds = window_seconds or checkin_setting('CHECKIN_CODE_WINDOW', 60)
+        self.key = hmac.new(settings.SECRET_KEY.encode(), b'attendance.checkin', sha256).digest()
+
+    def window(self, at: Optional[float] = None) -> int:
+        return int((time.time() if at is None else at) // self.window_seconds)
+
+    def code(self, schedule_id: int, attendance_date: date, window: int) -> str:
+        message = f'{schedule_id}:{attendance_date.isoformat()}:{window}'.encode()
+        digest = hmac.new(self.key, message, sha256).digest()
+        # 与 TOTP 相同的动态截取
+        offset = digest[-1] & 0x0F
+        value = int.from_bytes(digest[offset:offset + 4], 'big') & 0x7FFFFFFF
+        return str(value % 10 ** CHECKIN_CODE_DIGITS).zfill(CHECKIN_CODE_DIGITS)
+
+    def current(self, schedule_id: int, attendance_date: date) -> Dict[str, Any]:
+        now = time.time()
+        window = self.window(now)
+        return {
+            'code': self.code(schedule_id, attendance_date, window),
+            'expires_in': int((window + 1) * self.window_seconds - now),
+            'window_seconds': self.window_seconds,
+        }
+
+    def verify(self, schedule_id: int, attendance_date: date, code: str) -> bool:
+        """接受当前窗口和上一个窗口的签到码，容忍投屏刷新与网络延迟"""
+        code = str(code or '').strip()
+        if len(code) != CHECKIN_CODE_DIGITS:
+            return False
+        window = self.window()
+        return any(
+            hmac.compare_digest(self.code(schedule_id, attendance_date, w), code)
+            for w in (window, window - 1)
+        )
+
+
+def schedule_checkin_info(schedule_id: int) -> Optional[Tuple[int, Optional[str]]]:
+    """课程安排的 (班级ID, 上课开始时间)，缓存后签到高峰期间不再查询数据库"""
+    key = f'{CHECKIN_SCHEDULE_CACHE_PREFIX}{schedule_id}'
+    info = cache.get(key)
+    if info is None:
+        row = CourseSchedule.objects.filter(id=schedule_id).values_list(
+            'school_class_id', 'timeslot__start_time'
+        ).first()
+        info = (row[0], row[1].strftime('%H:%M') if row[1] else None) if row else ()
+        cache.set(key, info, CHECKIN_SCHEDULE_CACHE_TIMEOUT)
+    return info or None
+
+
+class CheckinQueue:
+    """
+    签到写入队列（每个进程一个）
+    put() 只做去重和入队；后台线程每隔 flush_interval 批量 upsert（每批最多 batch_size 条），
+    已有的默认记录被覆盖（计入 overwritten），教师录入的记录不会被覆盖（计入 conflicts）
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.maxsize = maxsize or checkin_setting('CHECKIN_QUEUE_SIZE', 10000)
+        self.batch_size = batch_size or checkin_setting('CHECKIN_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or checkin_setting('CHECKIN_FLUSH_INTERVAL', 0.2)
+        self.queue: queue.Queue = queue.Queue(maxsize=self.maxsize)
+        self.lock = threading.Lock()
+        self.seen: set = set()
+        self.seen_date: Optional[date] = None
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = {
+            'accepted': 0, 'duplicates': 0, 'rejected': 0, 'flushed': 0, 'overwritten': 0, 'conflicts': 0,
+            'flush_batches': 0, 'flush_errors': 0, 'max_depth': 0, 'last_flush_ms': 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._worker, name='attendance-checkin', daemon=True)
+            self.thread.start()
+
+    def put(self, student_id: int, schedule_id: int, attendance_date: date, class_id: int,
+            status: str, remark: str) -> str:
+        """返回 accepted / duplicate / rejected"""
+        key = (student_id, schedule_id, attendance_date)
+        with self.lock:
+            if self.seen_date != attendance_date and attendance_date == timezone.localdate():
+                # 进入新的一天，清空去重集合，避免无限增长
+                self.seen, self.seen_date = set(), attendance_date
+            if key in self.seen:
+                self.metrics['duplicates'] += 1
+                return 'duplicate'
+            try:
+                self.queue.put_nowait((student_id, schedule_id, attendance_date, class_id, status, remark))
+            except queue.Full:
+                self.metrics['rejected'] += 1
+                return 'rejected'
+            self.seen.add(key)
+            self.metrics['accepted'] += 1
+            self.metrics['max_depth'] = max(self.metrics['max_depth'], self.queue.qsize())
+        self._ensure_worker()
+        return 'accepted'
+
+    def _drain(self) -> List[tuple]:
+        items = []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    @staticmethod
+    def _write(items: List[tuple]) -> Tuple[int, int, int]:
+        """写入一批签到，返回 (新建数, 覆盖默认记录数, 因已有非默认记录或重复而放弃数)"""
+        unique: Dict[tuple, tuple] = {}
+        for item in items:
+            unique.setdefault(item[:3], item)
+        keys = set(unique)
+        with transaction.atomic():
+            existing = {
+                (s, sc, d): is_default_record(st, r)
+                for s, sc, d, st, r in Attendance.objects.select_for_update().filter(
+                    student_id__in={k[0] for k in keys},
+                    schedule_id__in={k[1] for k in keys},
+                    date__in={k[2] for k in keys},
+                ).values_list('student_id', 'schedule_id', 'date', 'status', 'remark')
+                if (s, sc, d) in keys
+            }
+            # 教师点名或此前签到写入的记录优先，只覆盖默认的"正常"记录
+            to_write = [item for key, item in unique.items() if existing.get(key, True)]
+            Attendance.objects.bulk_create(OrgScopeSync().fill([
+                Attendance(student_id=s, schedule_id=sc, date=d, status=st, remark=r)
+                for s, sc, d, _, st, r in to_write
+            ]), **upsert_kwargs(['student', 'schedule', 'date'], ['status', 'remark']))
+        overwritten = sum(1 for item in to_write if item[:3] in existing)
+        return len(to_write) - overwritten, overwritten, len(items) - len(to_write)
+
+    def flush(self) -> int:
+        """把队列中当前的签到写入数据库，返回新建与覆盖的条数"""
+        total = 0
+        while True:
+            items = self._drain()
+            if not items:
+                return total
+            started = time.monotonic()
+            try:
+                close_old_connections()
+                created, overwritten, conflicts = self._write(items)
+                AttendanceSummaryService.refresh({(d, c) for _, _, d, c, _, _ in items})
+            except Exception:
+                logger.exception('签到批量写入失败（%s 条）', len(items))
+                with self.lock:
+                    self.metrics['flush_errors'] += 1
+                    # 写入失败的签到允许重新提交
+                    self.seen.difference_update((s, sc, d) for s, sc, d, _, _, _ in items)
+                continue
+            total += created + overwritten
+            with self.lock:
+                self.metrics['flushed'] += created
+                self.metrics['overwritten'] += overwritten
+                self.metrics['conflicts'] += conflicts
+                self.metrics['flush_batches'] += 1
+                self.metrics['last_flush_ms'] = round((time.monotonic() - started) * 1000, 2)
+
+    def _worker(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('签到写入线程异常')
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.metrics, depth=self.queue.qsize(), capacity=self.maxsize,
+                        worker_alive=bool(self.thread and self.thread.is_alive()))
+
+
+checkin_queue = CheckinQueue()
+atexit.register(checkin_queue.flush)
+
+
+class CheckinService:
+    """学生自助签到：校验签到码与班级归属，计算是否迟到，放入写入队列"""
+
+    def __init__(self, codes: Optional[CheckinCode] = None, write_queue: Optional[CheckinQueue] = None):
+        self.codes = codes or CheckinCode()
+        self.queue = write_queue or checkin_queue
+
+    def check_in(self, student_id: int, student_class_id: Optional[int], schedule_id: int, code: str,
+                 attendance_date: Optional[date] = None) -> Tuple[int, Dict[str, Any]]:
+        """返回 (HTTP 状态码, 响应体)"""
+        attendance_date = attendance_date or timezone.localdate()
+        if not self.codes.verify(schedule_id, attendance_date, code):
+            return 400, {'detail': '签到码无效或已过期'}
+        info = schedule_checkin_info(schedule_id)
+        if not info:
+            return 404, {'detail': '课程安排不存在'}
+        class_id, start_time = info
+        if student_class_id != class_id:
+            return 403, {'detail': '你不在该课程的班级中'}
+
+        now = timezone.localtime()
+        status = 'present'
+        if start_time:
+            start = datetime.combine(attendance_date, datetime.strptime(start_time, '%H:%M').time())
+            late_after = start + timedelta(minutes=checkin_setting('CHECKIN_LATE_MINUTES', 10))
+            if now.replace(tzinfo=None) > late_after:
+                status = 'late'
+        remark = f"{CHECKIN_REMARK} {now.strftime('%H:%M:%S')}"
+
+        result = self.queue.put(student_id, schedule_id, attendance_date, class_id, status, remark)
+        if result == 'rejected':
+            return 503, {'detail': '签到人数较多，请稍后重试', 'retry_after': 1}
+        if result == 'duplicate':
+            return 200, {'detail': '已签到', 'duplicate': True}
+        return 202, {'detail': '签到成功', 'status': status}
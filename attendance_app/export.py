@@ -0,0 +1,181 @@
+"""
+考勤导出：按键集分页逐块读取 values()，流式写出 CSV 或 write-only 模式的 xlsx
+任何时刻内存中只有一块记录（透视表为一个学生的一行），适合百万级数据导出
+"""
+import csv
+import heapq
+import tempfile
+from datetime import timedelta
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.db.models import Q
+
+from .services import STATUS_DISPLAY
+
+
+EXPORT_CHUNK_SIZE = 5000
+MAX_PIVOT_DAYS = 200
+MAX_SHEET_ROWS = 1000000  # xlsx 单个工作表最多 1048576 行，超出后换新工作表
+
+EXPORT_FIELDS = (
+    'id', 'date', 'status', 'remark', 'student_id', 'student__student_id',
+    'student__user_profile__user__username', 'student__user_profile__user__first_name',
+    'student__school_class__name', 'student__school_class__major__name',
+    'student__school_class__major__college__name', 'schedule__course__name',
+)
+
+ROW_HEADERS = ['日期', '学号', '姓名', '学院', '专业', '班级', '课程', '考勤状态', '备注']
+
+
+def keyset_after(order_fields: Sequence[str], cursor: Sequence[Any]) -> Q:
+    """(f1, f2, ...) > (v1, v2, ...) 的键集条件"""
+    cond = Q()
+    prefix: Dict[str, Any] = {}
+    for field, value in zip(order_fields, cursor):
+        cond |= Q(**prefix, **{f'{field}__gt': value})
+        prefix[field] = value
+    return cond
+
+
+def iter_keyset(queryset, order_fields: Sequence[str], fields: Sequence[str] = EXPORT_FIELDS,
+                chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """按 order_fields 升序分块读取 values()，不使用 OFFSET"""
+    queryset = queryset.order_by(*order_fields).values(*fields)
+    cursor = None
+    while True:
+        qs = queryset if cursor is None else queryset.filter(keyset_after(order_fields, cursor))
+        rows = list(qs[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        cursor = [rows[-1][field] for field in order_fields]
+
+
+def student_name(row: Dict[str, Any]) -> str:
+    return row['student__user_profile__user__first_name'] or row['student__user_profile__user__username'] or ''
+
+
+class AttendanceExporter:
+    """
+    考勤导出器
+    querysets 为已按权限和条件过滤的查询集（当前表与归档表各一个），按排序键归并后输出；
+    layout='rows' 每条记录一行，layout='pivot' 每个学生一行、每天一列；
+    progress(已输出行数) 每输出 EXPORT_CHUNK_SIZE 行回调一次（后台导出任务用于汇报进度）
+    """
+
+    def __init__(self, querysets: Iterable, start, end, layout: str = 'rows',
+                 progress: Optional[Callable[[int], None]] = None):
+        self.querysets = list(querysets)
+        self.start = start
+        self.end = end
+        self.layout = layout
+        self.progress = progress
+
+    def _merged(self, order_fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+        streams = [iter_keyset(qs, order_fields) for qs in self.querysets]
+        if len(streams) == 1:
+            return streams[0]
+        return heapq.merge(*streams, key=itemgetter(*order_fields))
+
+    @property
+    def dates(self) -> List:
+        return [self.start + timedelta(days=i) for i in range((self.end - self.start).days + 1)]
+
+    def headers(self) -> List[str]:
+        if self.layout == 'pivot':
+            return ['学号', '姓名', '班级'] + [d.strftime('%m-%d') for d in self.dates] + ['迟到', '缺勤', '请假']
+        return ROW_HEADERS
+
+    def rows(self) -> Iterator[List[Any]]:
+        if not self.progress:
+            yield from self._rows()
+            return
+        count = 0
+        for count, row in enumerate(self._rows(), start=1):
+            yield row
+            if count % EXPORT_CHUNK_SIZE == 0:
+                self.progress(count)
+        self.progress(count)
+
+    def _rows(self) -> Iterator[List[Any]]:
+        if self.layout == 'pivot':
+            yield from self._pivot_rows()
+            return
+        for row in self._merged(('date', 'id')):
+            yield [
+                row['date'].isoformat(), row['student__student_id'], student_name(row),
+                row['student__school_class__major__college__name'] or '',
+                row['student__school_class__major__name'] or '',
+                row['student__school_class__name'] or '', row['schedule__course__name'] or '',
+                STATUS_DISPLAY.get(row['status'], row['status']), row['remark'] or '',
+            ]
+
+    def _pivot_rows(self) -> Iterator[List[Any]]:
+        """按 (学生, 日期, ID) 顺序读取，学生变化时输出上一个学生的整行；单元格为当天的非正常状态"""
+        date_index = {d: i for i, d in enumerate(self.dates)}
+        counted = ('late', 'absent', 'leave')
+        current, cells, counts = None, None, None
+
+        def flush():
+            return [current['student__student_id'], student_name(current),
+                    current['student__school_class__name'] or ''] + \
+                   ['/'.join(c) if c else '' for c in cells] + [counts[s] for s in counted]
+
+        for row in self._merged(('student_id', 'date', 'id')):
+            if current is None or row['student_id'] != current['student_id']:
+                if current is not None:
+                    yield flush()
+                current, cells, counts = row, [[] for _ in date_index], dict.fromkeys(counted, 0)
+            if row['status'] == 'present' or row['date'] not in date_index:
+                continue
+            label = STATUS_DISPLAY.get(row['status'], row['status'])
+            course = row['schedule__course__name']
+            cells[date_index[row['date']]].append(f'{course}:{label}' if course else label)
+            if row['status'] in counts:
+                counts[row['status']] += 1
+        if current is not None:
+            yield flush()
+
+    def iter_csv(self) -> Iterator[str]:
+        """逐块产出 CSV 文本；带 BOM，Excel 可直接识别中文"""
+        class Echo:
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+        yield '\ufeff' + writer.writerow(self.headers())
+        buffer = []
+        for row in self.rows():
+            buffer.append(writer.writerow(row))
+            if len(buffer) >= 1000:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
+
+    def write_xlsx(self, output=None):
+        """
+        以 write-only 模式写入 output（默认临时文件；逐行落盘，不在内存中保留工作表），
+        返回已回到开头的文件对象；超过单表行数上限时自动续写新工作表
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        headers = self.headers()
+        sheet, written, index = None, MAX_SHEET_ROWS, 0
+        for row in self.rows():
+            if written >= MAX_SHEET_ROWS:
+                index += 1
+                sheet = workbook.create_sheet('考勤' if index == 1 else f'考勤{index}')
+                sheet.append(headers)
+                written = 0
+            sheet.append(row)
+            written += 1
+        if sheet is None:
+            workbook.create_sheet('考勤').append(headers)
+
+        output = output if output is not None else tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return output
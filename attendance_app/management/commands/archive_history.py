@@ -0,0 +1,53 @@
+"""
+归档历史数据：往学期考勤、已毕业年级成绩迁入归档表
+使用方法: python manage.py archive_history [--before 2025-02-17] [--only attendance] [--max-chunks 10]
+可随时中断，重新执行会从进度游标处继续
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.archive import AttendanceArchiver, current_term_start
+from grades.archive import GradeArchiver
+
+
+ARCHIVERS = {
+    'attendance': AttendanceArchiver,
+    'grades': GradeArchiver,
+}
+
+
+class Command(BaseCommand):
+    help = '按块把往学期考勤和已毕业年级成绩迁入归档表（可中断、可续跑）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=str, default='',
+                            help='归档截止日期（默认：当前学期开始日期 SEMESTER_START_DATE）')
+        parser.add_argument('--only', choices=sorted(ARCHIVERS), help='只归档考勤或成绩')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每块条数（默认：5000）')
+        parser.add_argument('--max-chunks', type=int, default=None, help='本次最多迁移的块数，用于分时段执行')
+        parser.add_argument('--reset', action='store_true', help='清除进度游标后从头开始')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待归档条数')
+
+    def handle(self, *args, **options):
+        try:
+            before = date.fromisoformat(options['before']) if options['before'] else current_term_start()
+        except ValueError:
+            raise CommandError('--before 日期格式应为 YYYY-MM-DD')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size 必须大于 0')
+
+        kinds = [options['only']] if options['only'] else list(ARCHIVERS)
+        for kind in kinds:
+            archiver = ARCHIVERS[kind](before, chunk_size=options['chunk_size'])
+            if options['reset']:
+                archiver.reset()
+            if options['dry_run']:
+                self.stdout.write(f'{kind}: 待归档 {archiver.pending()} 条（截止 {before}）')
+                continue
+
+            def report(count, kind=kind):
+                self.stdout.write(f'{kind}: 已迁移 {count} 条')
+
+            moved = archiver.run(max_chunks=options['max_chunks'], on_chunk=report)
+            self.stdout.write(self.style.SUCCESS(f'✓ {kind}: 本次共迁移 {moved} 条（截止 {before}）'))
@@ -0,0 +1,137 @@
+"""
+模拟上课前的集中签到，对比写入队列与逐条同步写入的延迟和吞吐
+使用方法: python manage.py benchmark_checkin --schedule 1 [--concurrency 50] [--mode both]
+         python manage.py benchmark_checkin --schedules 1,2,3  # 多个班级同时上课的全校高峰
+签到学生取各课程安排所在班级的名册；签到日期固定为 BENCHMARK_DATE，不会与真实签到混在一起，
+结束后只删除该日期上这些课程安排的记录（--keep 保留）
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from attendance_app.checkin import CHECKIN_REMARK, CheckinCode, CheckinQueue, CheckinService
+from attendance_app.models import Attendance
+from attendance_app.services import AttendanceSummaryService
+from courses.models import CourseSchedule
+
+
+# 压测专用的签到日期：远离任何学期，清理时按日期删除不会误删真实签到
+BENCHMARK_DATE = date(2099, 12, 31)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = '压测学生自助签到：queue 为写入队列模式，sync 为每个请求直接写库'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--schedule', type=int, help='课程安排ID')
+        target.add_argument('--schedules', help='多个课程安排ID，逗号分隔，模拟多个班级同时签到')
+        parser.add_argument('--students', type=int, default=0, help='每个课程安排参与签到的学生数（默认：全班）')
+        parser.add_argument('--concurrency', type=int, default=50, help='并发线程数')
+        parser.add_argument('--mode', choices=['queue', 'sync', 'both'], default='both')
+        parser.add_argument('--keep', action='store_true', help='保留产生的签到记录')
+
+    def handle(self, *args, **options):
+        if options['schedules']:
+            try:
+                schedule_ids = [int(s) for s in options['schedules'].split(',') if s.strip()]
+            except ValueError:
+                raise CommandError('--schedules 应为逗号分隔的课程安排ID')
+        else:
+            schedule_ids = [options['schedule']]
+        schedules = list(CourseSchedule.objects.filter(id__in=schedule_ids))
+        if len(schedules) != len(set(schedule_ids)):
+            raise CommandError('课程安排不存在')
+
+        roster = {}
+        for student in StudentProfile.objects.filter(
+            school_class_id__in={s.school_class_id for s in schedules}
+        ).order_by('id'):
+            roster.setdefault(student.school_class_id, []).append(student)
+        checkins = []
+        for schedule in schedules:
+            students = roster.get(schedule.school_class_id, [])
+            if options['students']:
+                students = students[:options['students']]
+            checkins.extend((student, schedule) for student in students)
+        if not checkins:
+            raise CommandError('课程安排的班级没有学生')
+
+        modes = ['sync', 'queue'] if options['mode'] == 'both' else [options['mode']]
+        for mode in modes:
+            self._cleanup(schedules)
+            self._run(mode, schedules, checkins, options['concurrency'])
+            if not options['keep']:
+                self._cleanup(schedules)
+
+    def _cleanup(self, schedules):
+        Attendance.objects.filter(schedule__in=schedules, date=BENCHMARK_DATE).delete()
+        AttendanceSummaryService.refresh({(BENCHMARK_DATE, s.school_class_id) for s in schedules})
+
+    def _run(self, mode, schedules, checkins, concurrency):
+        day = BENCHMARK_DATE
+        codes = CheckinCode()
+        code_by_schedule = {s.id: codes.current(s.id, day)['code'] for s in schedules}
+        write_queue = CheckinQueue()
+        service = CheckinService(codes=codes, write_queue=write_queue)
+
+        def sync_checkin(student, schedule, code):
+            # 对照组：每个请求直接写库并刷新日汇总
+            if not service.codes.verify(schedule.id, day, code):
+                return 400
+            _, created = Attendance.objects.get_or_create(
+                student_id=student.id, schedule_id=schedule.id, date=day,
+                defaults={'status': 'present', 'remark': f"{CHECKIN_REMARK} {timezone.localtime():%H:%M:%S}"},
+            )
+            AttendanceSummaryService.refresh([(day, schedule.school_class_id)])
+            return 202 if created else 200
+
+        def one(checkin):
+            student, schedule = checkin
+            code = code_by_schedule[schedule.id]
+            started = time.perf_counter()
+            try:
+                if mode == 'sync':
+                    status = sync_checkin(student, schedule, code)
+                else:
+                    status, _ = service.check_in(student.id, student.school_class_id, schedule.id, code, day)
+            finally:
+                close_old_connections()
+            return status, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, checkins))
+        elapsed = time.perf_counter() - started
+        if mode == 'queue':
+            write_queue.flush()
+        drained = time.perf_counter() - started
+
+        latencies = sorted(ms for _, ms in results)
+        statuses = {}
+        for status, _ in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        stored = Attendance.objects.filter(schedule__in=schedules, date=day).count()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[{mode}] {len(checkins)} 次签到（{len(schedules)} 个课程安排），并发 {concurrency}'
+        ))
+        self.stdout.write(
+            f'  响应: {elapsed:.2f}s，{len(checkins) / elapsed:.0f} 次/秒；'
+            f'p50 {percentile(latencies, 50):.1f}ms，p95 {percentile(latencies, 95):.1f}ms，'
+            f'p99 {percentile(latencies, 99):.1f}ms'
+        )
+        self.stdout.write(f'  落库: {drained:.2f}s，共 {stored} 条；状态码 {statuses}')
+        if mode == 'queue':
+            self.stdout.write(f'  队列: {write_queue.snapshot()}')
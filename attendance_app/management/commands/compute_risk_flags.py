@@ -0,0 +1,29 @@
+"""
+计算学生考勤风险标记（建议每晚定时执行）
+使用方法: python manage.py compute_risk_flags [--as-of 2025-04-01]
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.risk import RiskAnalyticsService
+
+
+class Command(BaseCommand):
+    help = '按本学期考勤计算学生风险标记，并整批替换 StudentRiskFlag'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', type=str, default='', help='统计截止日期（默认：今天）')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options['as_of']) if options['as_of'] else None
+        except ValueError:
+            raise CommandError('--as-of 日期格式应为 YYYY-MM-DD')
+
+        service = RiskAnalyticsService(as_of)
+        summary = service.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {service.term} 第{service.weeks}周：评估 {summary['pairs']} 个学生课程，"
+            f"写入 {summary['flags']} 条风险标记"
+        ))
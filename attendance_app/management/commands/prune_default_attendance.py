@@ -0,0 +1,40 @@
+"""
+清理已存储的默认考勤记录（正常且无备注），启用虚拟默认考勤后执行一次
+使用方法: python manage.py prune_default_attendance [--chunk-size 5000] [--dry-run]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.models import Attendance
+from attendance_app.services import AttendanceSummaryService, deferred_summary_refresh, virtual_default_enabled
+
+
+class Command(BaseCommand):
+    help = '按主键分块删除"正常且无备注"的考勤记录（仅在启用 ATTENDANCE_VIRTUAL_DEFAULT 时可用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每块条数（默认：5000）')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待清理条数')
+
+    def handle(self, *args, **options):
+        if not virtual_default_enabled():
+            raise CommandError('未启用虚拟默认考勤（ATTENDANCE_VIRTUAL_DEFAULT），默认记录仍需保留')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size 必须大于 0')
+
+        defaults = Attendance.objects.filter(status='present', remark='')
+        if options['dry_run']:
+            self.stdout.write(f'待清理 {defaults.count()} 条')
+            return
+
+        deleted = 0
+        while True:
+            rows = list(defaults.order_by('id').values_list('id', 'date', 'school_class_id')[:options['chunk_size']])
+            if not rows:
+                break
+            # 分块删除避免长时间锁表；汇总按块统一刷新
+            with deferred_summary_refresh():
+                Attendance.objects.filter(id__in=[row[0] for row in rows]).delete()
+            AttendanceSummaryService.refresh({(day, class_id) for _, day, class_id in rows})
+            deleted += len(rows)
+            self.stdout.write(f'已清理 {deleted} 条')
+        self.stdout.write(self.style.SUCCESS(f'✓ 共清理 {deleted} 条默认考勤记录'))
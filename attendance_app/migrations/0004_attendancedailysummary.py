@@ -0,0 +1,65 @@
+# 考勤日汇总表：按 (日期, 班级) 统计已存储的考勤记录数，供考勤列表计数使用
+# 同时为考勤列表的键集分页添加 (date, id) 索引
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+STATUSES = ('present', 'late', 'absent', 'leave')
+
+
+def build_daily_summary(apps, schema_editor):
+    """按日期逐日聚合已有考勤记录，每天一条 GROUP BY 查询"""
+    Attendance = apps.get_model('attendance_app', 'Attendance')
+    AttendanceDailySummary = apps.get_model('attendance_app', 'AttendanceDailySummary')
+    dates = Attendance.objects.order_by().values_list('date', flat=True).distinct()
+    for day in dates:
+        rows = Attendance.objects.filter(
+            date=day, student__school_class__isnull=False
+        ).values('student__school_class_id').annotate(
+            total=Count('id'),
+            **{status: Count('id', filter=Q(status=status)) for status in STATUSES}
+        ).order_by()
+        AttendanceDailySummary.objects.bulk_create([
+            AttendanceDailySummary(
+                date=day, school_class_id=row['student__school_class_id'], total=row['total'],
+                **{status: row[status] for status in STATUSES}
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0003_update_attendance_model'),
+        ('organization', '0011_class_class_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='考勤日期')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='记录总数')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='正常')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='迟到')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='缺勤')),
+                ('leave', models.PositiveIntegerField(default=0, verbose_name='请假')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='organization.class', verbose_name='班级')),
+            ],
+            options={
+                'verbose_name': '考勤日汇总',
+                'verbose_name_plural': '考勤日汇总',
+                'unique_together': {('date', 'school_class')},
+            },
+        ),
+        # 考勤列表按 (date, id) 键集分页
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+        ),
+        migrations.RunPython(build_daily_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# 冷热数据分离：历史考勤归档表、学生学期考勤汇总、归档进度游标
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_add_courseschedule_indexes'),
+        ('attendance_app', '0004_attendancedailysummary'),
+        ('courses', '0007_remove_credit_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='任务名')),
+                ('before', models.DateField(verbose_name='归档截止日期')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='已迁移到的主键')),
+                ('moved', models.PositiveIntegerField(default=0, verbose_name='已迁移条数')),
+                ('finished', models.BooleanField(default=False, verbose_name='是否完成')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '归档进度',
+                'verbose_name_plural': '归档进度',
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField(verbose_name='考勤日期')),
+                ('status', models.CharField(choices=[('present', '正常'), ('late', '迟到'), ('absent', '缺勤'), ('leave', '请假')], default='present', max_length=16, verbose_name='考勤状态')),
+                ('remark', models.CharField(blank=True, max_length=255, verbose_name='备注')),
+                ('term', models.CharField(max_length=16, verbose_name='学期')),
+            ],
+            options={
+                'verbose_name': '历史考勤记录',
+                'verbose_name_plural': '历史考勤记录',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentTermAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=16, verbose_name='学期')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='记录总数')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='正常')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='迟到')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='缺勤')),
+                ('leave', models.PositiveIntegerField(default=0, verbose_name='请假')),
+            ],
+            options={
+                'verbose_name': '学生学期考勤汇总',
+                'verbose_name_plural': '学生学期考勤汇总',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='schedule',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_attendance', to='courses.courseschedule', verbose_name='课程安排'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='accounts.studentprofile'),
+        ),
+        migrations.AddField(
+            model_name='studenttermattendance',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_attendance', to='accounts.studentprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancearchive',
+            index=models.Index(fields=['date', 'id'], name='attendance_archive_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancearchive',
+            index=models.Index(fields=['student', 'term'], name='attendance_archive_term_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='studenttermattendance',
+            unique_together={('student', 'term')},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# 学生考勤风险标记表，由 compute_risk_flags 批处理整批写入
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_add_courseschedule_indexes'),
+        ('attendance_app', '0005_attendance_archive'),
+        ('courses', '0007_remove_credit_field'),
+        ('organization', '0011_class_class_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRiskFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=16, verbose_name='学期')),
+                ('kind', models.CharField(choices=[('absence', '缺勤率过高'), ('late', '迟到率过高'), ('leave', '请假率过高'), ('trend', '缺勤呈上升趋势')], max_length=16, verbose_name='风险类型')),
+                ('level', models.CharField(choices=[('warning', '预警'), ('danger', '严重')], max_length=16, verbose_name='风险等级')),
+                ('rate', models.FloatField(verbose_name='比率')),
+                ('recent_rate', models.FloatField(default=0, verbose_name='近期缺勤率')),
+                ('sessions', models.PositiveIntegerField(default=0, verbose_name='已上课次')),
+                ('absences', models.PositiveIntegerField(default=0, verbose_name='缺勤次数')),
+                ('lates', models.PositiveIntegerField(default=0, verbose_name='迟到次数')),
+                ('leaves', models.PositiveIntegerField(default=0, verbose_name='请假次数')),
+                ('computed_at', models.DateTimeField(verbose_name='计算时间')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_flags', to='courses.course', verbose_name='课程')),
+                ('school_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_flags', to='organization.class', verbose_name='班级')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_flags', to='accounts.studentprofile')),
+            ],
+            options={
+                'verbose_name': '学生考勤风险',
+                'verbose_name_plural': '学生考勤风险',
+                'indexes': [
+                    models.Index(fields=['school_class', 'term'], name='risk_flag_class_term_idx'),
+                    models.Index(fields=['student', 'term'], name='risk_flag_student_term_idx'),
+                ],
+                'unique_together': {('student', 'course', 'term', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# 考勤冗余学生所在班级、专业、学院及组合索引，并回填学生档案、考勤、成绩的冗余字段
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # 只使用历史模型，不依赖 accounts.services 的当前实现；按班级整批 UPDATE，没有班级的学生保持为空
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    Class = apps.get_model('organization', 'Class')
+    record_models = (apps.get_model('attendance_app', 'Attendance'), apps.get_model('grades', 'Grade'))
+    for class_id, major_id, college_id in Class.objects.values_list('id', 'major_id', 'major__college_id'):
+        StudentProfile.objects.filter(school_class_id=class_id).update(major_id=major_id, college_id=college_id)
+        for model in record_models:
+            model.objects.filter(student__school_class_id=class_id).update(
+                school_class_id=class_id, major_id=major_id, college_id=college_id
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_studentprofile_org_scope'),
+        ('attendance_app', '0006_studentriskflag'),
+        ('grades', '0004_grade_org_scope'),
+        ('organization', '0011_class_class_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='college',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.college', verbose_name='学院'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='major',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.major', verbose_name='专业'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.class', verbose_name='班级'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['college', 'date'], name='attendance_college_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['major', 'date'], name='attendance_major_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['school_class', 'date'], name='attendance_class_date_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
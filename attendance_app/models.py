@@ -17,15 +17,169 @@ class Attendance(models.Model):
     date = models.DateField(verbose_name='考勤日期')
     status = models.CharField(max_length=16, choices=ATTENDANCE_STATUS, default='present', verbose_name='考勤状态')
     remark = models.CharField(max_length=255, blank=True, verbose_name='备注')
+    # 学生所在班级、专业、学院（冗余字段），按组织范围筛选时走单表索引；
+    # 写入时由 OrgScopeSync 填充，学生换班、班级换专业时批量更新
+    school_class = models.ForeignKey(
+        'organization.Class', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='班级'
+    )
+    major = models.ForeignKey(
+        'organization.Major', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='专业'
+    )
+    college = models.ForeignKey(
+        'organization.College', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='学院'
+    )
 
     class Meta:
         unique_together = ('student', 'schedule', 'date')
         indexes = [
             models.Index(fields=['date', 'status']),
             models.Index(fields=['schedule', 'date']),
+            models.Index(fields=['date', 'id'], name='attendance_date_id_idx'),
+            models.Index(fields=['college', 'date'], name='attendance_college_date_idx'),
+            models.Index(fields=['major', 'date'], name='attendance_major_date_idx'),
+            models.Index(fields=['school_class', 'date'], name='attendance_class_date_idx'),
         ]
         verbose_name = '考勤记录'
         verbose_name_plural = '考勤记录'
 
     def __str__(self):
         return f"{self.student}-{self.schedule.course.name if self.schedule else 'N/A'}-{self.date}-{self.status}"
+
+
+class AttendanceDailySummary(models.Model):
+    """
+    按 (日期, 班级) 汇总的已存储考勤记录数
+    用于考勤列表的总数统计，避免在千万级考勤表上做多表连接的 COUNT
+    """
+    date = models.DateField(verbose_name='考勤日期')
+    school_class = models.ForeignKey(
+        'organization.Class', on_delete=models.CASCADE, related_name='attendance_summaries', verbose_name='班级'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name='记录总数')
+    present = models.PositiveIntegerField(default=0, verbose_name='正常')
+    late = models.PositiveIntegerField(default=0, verbose_name='迟到')
+    absent = models.PositiveIntegerField(default=0, verbose_name='缺勤')
+    leave = models.PositiveIntegerField(default=0, verbose_name='请假')
+
+    class Meta:
+        unique_together = ('date', 'school_class')
+        verbose_name = '考勤日汇总'
+        verbose_name_plural = '考勤日汇总'
+
+    def __str__(self):
+        return f"{self.school_class_id}-{self.date}-{self.total}"
+
+
+class AttendanceArchive(models.Model):
+    """
+    历史考勤（冷数据）
+    往学期的考勤记录按块从 Attendance 迁入，主键沿用原记录ID；
+    课程安排可能在换学期后被删除，因此不建外键约束，保留历史记录
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='archived_attendance')
+    schedule = models.ForeignKey(
+        CourseSchedule, on_delete=models.DO_NOTHING, db_constraint=False, null=True,
+        related_name='archived_attendance', verbose_name='课程安排'
+    )
+    date = models.DateField(verbose_name='考勤日期')
+    status = models.CharField(max_length=16, choices=ATTENDANCE_STATUS, default='present', verbose_name='考勤状态')
+    remark = models.CharField(max_length=255, blank=True, verbose_name='备注')
+    term = models.CharField(max_length=16, verbose_name='学期')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='attendance_archive_date_idx'),
+            models.Index(fields=['student', 'term'], name='attendance_archive_term_idx'),
+        ]
+        verbose_name = '历史考勤记录'
+        verbose_name_plural = '历史考勤记录'
+
+    def __str__(self):
+        return f"{self.student_id}-{self.schedule_id}-{self.date}-{self.status}"
+
+
+class StudentTermAttendance(models.Model):
+    """学生学期考勤汇总，归档时累计，历史学期的统计无需再扫描明细"""
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='term_attendance')
+    term = models.CharField(max_length=16, verbose_name='学期')
+    total = models.PositiveIntegerField(default=0, verbose_name='记录总数')
+    present = models.PositiveIntegerField(default=0, verbose_name='正常')
+    late = models.PositiveIntegerField(default=0, verbose_name='迟到')
+    absent = models.PositiveIntegerField(default=0, verbose_name='缺勤')
+    leave = models.PositiveIntegerField(default=0, verbose_name='请假')
+
+    class Meta:
+        unique_together = ('student', 'term')
+        verbose_name = '学生学期考勤汇总'
+        verbose_name_plural = '学生学期考勤汇总'
+
+    def __str__(self):
+        return f"{self.student_id}-{self.term}-{self.total}"
+
+
+class ArchiveProgress(models.Model):
+    """归档任务进度游标，按任务名记录已迁移到的最大主键，中断后可从游标继续"""
+    name = models.CharField(max_length=64, unique=True, verbose_name='任务名')
+    before = models.DateField(verbose_name='归档截止日期')
+    last_id = models.BigIntegerField(default=0, verbose_name='已迁移到的主键')
+    moved = models.PositiveIntegerField(default=0, verbose_name='已迁移条数')
+    finished = models.BooleanField(default=False, verbose_name='是否完成')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '归档进度'
+        verbose_name_plural = '归档进度'
+
+    def __str__(self):
+        return f"{self.name}-{self.last_id}"
+
+
+RISK_KINDS = (
+    ('absence', '缺勤率过高'),
+    ('late', '迟到率过高'),
+    ('leave', '请假率过高'),
+    ('trend', '缺勤呈上升趋势'),
+)
+
+RISK_LEVELS = (
+    ('warning', '预警'),
+    ('danger', '严重'),
+)
+
+
+class StudentRiskFlag(models.Model):
+    """
+    学生考勤风险标记，由夜间批处理（compute_risk_flags）按学期、课程计算后整批写入；
+    页面展示时按班级或学生直接读取，不再临时聚合考勤明细
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='risk_flags')
+    school_class = models.ForeignKey(
+        'organization.Class', on_delete=models.CASCADE, related_name='risk_flags', verbose_name='班级'
+    )
+    course = models.ForeignKey('courses.Course', on_delete=models.CASCADE, related_name='risk_flags', verbose_name='课程')
+    term = models.CharField(max_length=16, verbose_name='学期')
+    kind = models.CharField(max_length=16, choices=RISK_KINDS, verbose_name='风险类型')
+    level = models.CharField(max_length=16, choices=RISK_LEVELS, verbose_name='风险等级')
+    rate = models.FloatField(verbose_name='比率')
+    recent_rate = models.FloatField(default=0, verbose_name='近期缺勤率')
+    sessions = models.PositiveIntegerField(default=0, verbose_name='已上课次')
+    absences = models.PositiveIntegerField(default=0, verbose_name='缺勤次数')
+    lates = models.PositiveIntegerField(default=0, verbose_name='迟到次数')
+    leaves = models.PositiveIntegerField(default=0, verbose_name='请假次数')
+    computed_at = models.DateTimeField(verbose_name='计算时间')
+
+    class Meta:
+        unique_together = ('student', 'course', 'term', 'kind')
+        indexes = [
+            models.Index(fields=['school_class', 'term'], name='risk_flag_class_term_idx'),
+            models.Index(fields=['student', 'term'], name='risk_flag_student_term_idx'),
+        ]
+        verbose_name = '学生考勤风险'
+        verbose_name_plural = '学生考勤风险'
+
+    def __str__(self):
+        return f"{self.student_id}-{self.course_id}-{self.kind}-{self.level}"
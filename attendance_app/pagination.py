@@ -0,0 +1,82 @@
+import base64
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def row_key(row):
+    """分页排序键 (date, id)；row 为 values() 字典或模型实例"""
+    return (row['date'], row['id']) if isinstance(row, dict) else (row.date, row.id)
+
+
+class AttendanceKeysetPagination(BasePagination):
+    """
+    考勤列表的键集分页：按 (date, id) 倒序，游标记录上一页最后一条的 (date, id)
+    翻页只需 WHERE (date, id) < 游标，不需要 OFFSET，深翻页与首页开销相同；
+    总数只在首页计算，由视图的 get_list_count 提供
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 100
+    max_limit = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """queryset 也可以是查询集列表（当前表与归档表）：各取一页后按 (date, id) 归并"""
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+        self.count = self.count_exact = None
+        querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        if self.cursor is None and view is not None and hasattr(view, 'get_list_count'):
+            self.count, self.count_exact = view.get_list_count(querysets)
+
+        rows = []
+        for qs in querysets:
+            qs = qs.order_by('-date', '-id')
+            if self.cursor is not None:
+                cursor_date, cursor_id = self.cursor
+                qs = qs.filter(Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id))
+            rows.extend(qs[:self.limit + 1])
+        if len(querysets) > 1:
+            # 归档表沿用原记录ID，两表的 (date, id) 不会重复
+            rows.sort(key=row_key, reverse=True)
+        self.has_next = len(rows) > self.limit
+        self.page = rows[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except (TypeError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def decode_cursor(self, value):
+        if not value:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(value.encode('ascii')).decode('ascii')
+            date_part, id_part = raw.split('|')
+            return date.fromisoformat(date_part), int(id_part)
+        except (ValueError, UnicodeError):
+            raise ValidationError({'detail': '无效的分页游标'})
+
+    def encode_cursor(self, row):
+        row_date, row_id = row_key(row)
+        return base64.urlsafe_b64encode(f'{row_date.isoformat()}|{row_id}'.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response.update(count=self.count, count_exact=self.count_exact)
+        return Response(response)
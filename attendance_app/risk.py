@@ -0,0 +1,188 @@
+"""
+考勤风险预警批处理
+
+把本学期每个 (学生, 课程) 每周的应到课次与缺勤/迟到/请假次数装入 NumPy 数组，
+向量化计算各项比率、近期窗口趋势与阈值越界，结果整批写入 StudentRiskFlag
+应到课次来自课程安排（每条 CourseSchedule 即一次课），因此与是否启用虚拟默认考勤无关
+"""
+from datetime import date
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from courses.models import CourseSchedule
+from .archive import current_term_start, term_label
+from .models import Attendance, StudentRiskFlag
+
+
+# 阈值可通过 settings.ATTENDANCE_RISK_THRESHOLDS 覆盖
+DEFAULT_RISK_THRESHOLDS = {
+    'min_sessions': 4,          # 已上课次少于该值的课程不评估
+    'absence_warning': 0.15,
+    'absence_danger': 1 / 3,    # 缺课超过三分之一通常取消考试资格
+    'late_warning': 0.3,
+    'leave_warning': 0.3,
+    'trend_window': 4,          # 近期窗口（周）
+    'trend_delta': 0.2,         # 近期缺勤率比此前高出该值视为上升趋势
+    'trend_min_absences': 2,
+}
+
+EVENT_STATUSES = ('absent', 'late', 'leave')
+
+
+def risk_thresholds() -> Dict[str, Any]:
+    return {**DEFAULT_RISK_THRESHOLDS, **getattr(settings, 'ATTENDANCE_RISK_THRESHOLDS', {})}
+
+
+class RiskAnalyticsService:
+    """按学期计算学生考勤风险，as_of 为统计截止日期（默认今天）"""
+
+    def __init__(self, as_of: Optional[date] = None):
+        self.as_of = as_of or timezone.localdate()
+        self.term_start = current_term_start()
+        self.term = term_label(self.term_start)
+        self.thresholds = risk_thresholds()
+        weeks = (self.as_of - self.term_start).days // 7 + 1
+        self.weeks = max(0, min(weeks, settings.SEMESTER_TOTAL_WEEKS))
+        # 截止日期所在周只计到当天为止（星期与 timeslot.weekday 一致，1 为周一）；学期已结束时整周计入
+        self.last_weekday = self.as_of.isoweekday() if weeks <= settings.SEMESTER_TOTAL_WEEKS else 7
+
+    def load(self):
+        """
+        装载数组：
+        pair_student / pair_course: 每个 (学生, 课程) 对；sessions[P, W]: 每周截至 as_of 的应到课次；
+        events[P, W, 3]: 每周缺勤/迟到/请假次数
+        """
+        import numpy as np
+
+        W = self.weeks
+        students = np.array(list(StudentProfile.objects.filter(
+            school_class__isnull=False
+        ).values_list('id', 'school_class_id')), dtype=np.int64).reshape(-1, 2)
+        schedule_rows = np.array(list(CourseSchedule.objects.filter(
+            Q(week_number__lt=W) | Q(week_number=W, timeslot__weekday__lte=self.last_weekday),
+            week_number__gte=1,
+        ).values_list('school_class_id', 'course_id', 'week_number').annotate(
+            n=Count('id')
+        ).order_by()), dtype=np.int64).reshape(-1, 4)
+
+        # (班级, 课程) 组合及其每周课次
+        cc, cc_index = np.unique(schedule_rows[:, :2], axis=0, return_inverse=True)
+        cc_index = cc_index.reshape(-1)
+        cc_sessions = np.zeros((len(cc), W), dtype=np.int64)
+        np.add.at(cc_sessions, (cc_index, schedule_rows[:, 2] - 1), schedule_rows[:, 3])
+
+        # 每个学生展开为其班级的全部课程：按班级排序后用 searchsorted 定位区间
+        order = np.argsort(cc[:, 0], kind='stable')
+        cc_class_sorted = cc[order, 0]
+        lo = np.searchsorted(cc_class_sorted, students[:, 1], 'left')
+        counts = np.searchsorted(cc_class_sorted, students[:, 1], 'right') - lo
+        pair_student_idx = np.repeat(np.arange(len(students)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_cc = order[np.repeat(lo, counts) + offsets]
+
+        pair_student = students[pair_student_idx, 0]
+        pair_class = students[pair_student_idx, 1]
+        pair_course = cc[pair_cc, 1]
+        sessions = cc_sessions[pair_cc]
+
+        # 异常考勤按 (学生, 课程, 周, 状态) 聚合后落入数组
+        events = np.zeros((len(pair_student), W, len(EVENT_STATUSES)), dtype=np.int64)
+        event_rows = list(Attendance.objects.filter(
+            date__gte=self.term_start, date__lte=self.as_of, status__in=EVENT_STATUSES,
+            schedule__week_number__gte=1, schedule__week_number__lte=W,
+        ).values_list('student_id', 'schedule__course_id', 'schedule__week_number', 'status').annotate(
+            n=Count('id')
+        ).order_by())
+        if event_rows and len(pair_student):
+            status_index = {status: i for i, status in enumerate(EVENT_STATUSES)}
+            ev = np.array([(s, c, w, status_index[st], n) for s, c, w, st, n in event_rows], dtype=np.int64)
+            base = int(max(pair_course.max(), ev[:, 1].max())) + 1
+            pair_keys = pair_student * base + pair_course
+            key_order = np.argsort(pair_keys)
+            sorted_keys = pair_keys[key_order]
+            ev_keys = ev[:, 0] * base + ev[:, 1]
+            pos = np.minimum(np.searchsorted(sorted_keys, ev_keys), len(sorted_keys) - 1)
+            # 学生不在该课程所属班级（如已转班）的记录不计入
+            matched = sorted_keys[pos] == ev_keys
+            np.add.at(events, (key_order[pos[matched]], ev[matched, 2] - 1, ev[matched, 3]), ev[matched, 4])
+
+        return pair_student, pair_class, pair_course, sessions, events
+
+    def compute(self) -> Dict[str, Any]:
+        """计算风险指标与阈值越界，返回每个 (学生, 课程) 对的指标数组及各类风险的布尔掩码"""
+        import numpy as np
+
+        t = self.thresholds
+        pair_student, pair_class, pair_course, sessions, events = self.load()
+        held = sessions.sum(axis=1)
+        totals = events.sum(axis=1)
+        absences, lates, leaves = totals[:, 0], totals[:, 1], totals[:, 2]
+
+        def ratio(num, den):
+            return np.divide(num, den, out=np.zeros(len(num), dtype=float), where=den > 0)
+
+        absence_rate = ratio(absences, held)
+        late_rate = ratio(lates, held)
+        leave_rate = ratio(leaves, held)
+
+        # 近期窗口与此前的缺勤率对比
+        window = min(t['trend_window'], self.weeks)
+        recent_held = sessions[:, self.weeks - window:].sum(axis=1)
+        recent_abs = events[:, self.weeks - window:, 0].sum(axis=1)
+        recent_rate = ratio(recent_abs, recent_held)
+        prior_rate = ratio(absences - recent_abs, held - recent_held)
+
+        eligible = held >= t['min_sessions']
+        masks = {
+            'absence': eligible & (absence_rate >= t['absence_warning']),
+            'late': eligible & (late_rate >= t['late_warning']),
+            'leave': eligible & (leave_rate >= t['leave_warning']),
+            'trend': eligible & (recent_abs >= t['trend_min_absences'])
+                     & (recent_rate - prior_rate >= t['trend_delta']),
+        }
+        rates = {'absence': absence_rate, 'late': late_rate, 'leave': leave_rate, 'trend': recent_rate}
+        danger = {
+            'absence': absence_rate >= t['absence_danger'],
+            'trend': recent_rate >= t['absence_danger'],
+        }
+        return {
+            'pairs': len(pair_student),
+            'student': pair_student, 'class': pair_class, 'course': pair_course,
+            'held': held, 'absences': absences, 'lates': lates, 'leaves': leaves,
+            'recent_rate': recent_rate, 'rates': rates, 'masks': masks, 'danger': danger,
+        }
+
+    def run(self) -> Dict[str, int]:
+        """计算并整批替换本学期的风险标记，返回统计"""
+        import numpy as np
+
+        if self.weeks == 0:
+            return {'pairs': 0, 'flags': 0}
+        result = self.compute()
+        now = timezone.now()
+        flags = []
+        summary = {'pairs': result['pairs']}
+        for kind, mask in result['masks'].items():
+            indices = np.flatnonzero(mask)
+            summary[kind] = len(indices)
+            danger = result['danger'].get(kind)
+            for i in indices:
+                flags.append(StudentRiskFlag(
+                    student_id=int(result['student'][i]), school_class_id=int(result['class'][i]),
+                    course_id=int(result['course'][i]), term=self.term, kind=kind,
+                    level='danger' if danger is not None and danger[i] else 'warning',
+                    rate=round(float(result['rates'][kind][i]), 4),
+                    recent_rate=round(float(result['recent_rate'][i]), 4),
+                    sessions=int(result['held'][i]), absences=int(result['absences'][i]),
+                    lates=int(result['lates'][i]), leaves=int(result['leaves'][i]), computed_at=now,
+                ))
+        with transaction.atomic():
+            StudentRiskFlag.objects.filter(term=self.term).delete()
+            StudentRiskFlag.objects.bulk_create(flags, batch_size=1000)
+        summary['flags'] = len(flags)
+        return summary
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Attendance
+from .models import ATTENDANCE_STATUS, Attendance, StudentRiskFlag
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
@@ -34,3 +34,59 @@ class AttendanceSerializer(serializers.ModelSerializer):
             user = obj.student.user_profile.user
             return user.first_name or user.username
         return '-'
+
+
+class AttendanceSlimSerializer(serializers.BaseSerializer):
+    """
+    考勤列表的轻量序列化器（只读）
+    直接读取 values() 取出的已连接列，不构造模型实例，字段与 AttendanceSerializer 保持一致
+    """
+    VALUES_FIELDS = (
+        'id', 'student_id', 'schedule_id', 'date', 'status', 'remark',
+        'student__student_id', 'student__user_profile__user__username',
+        'student__user_profile__user__first_name', 'schedule__course_id', 'schedule__course__name',
+        'student__school_class__name', 'student__school_class__major__name',
+        'student__school_class__major__college__name',
+    )
+    STATUS_DISPLAY = dict(ATTENDANCE_STATUS)
+
+    def to_representation(self, row):
+        return {
+            'id': row['id'],
+            'student': row['student_id'],
+            'student_id': row['student__student_id'],
+            'student_name': (row['student__user_profile__user__first_name']
+                             or row['student__user_profile__user__username'] or '-'),
+            'schedule': row['schedule_id'],
+            'schedule_id': row['schedule_id'],
+            'course_name': row['schedule__course__name'],
+            'course_id': row['schedule__course_id'],
+            'date': row['date'].isoformat(),
+            'status': row['status'],
+            'status_display': self.STATUS_DISPLAY.get(row['status'], row['status']),
+            'remark': row['remark'],
+            'class_name': row['student__school_class__name'],
+            'college_name': row['student__school_class__major__college__name'],
+            'major_name': row['student__school_class__major__name'],
+        }
+
+
+class StudentRiskFlagSerializer(serializers.ModelSerializer):
+    student_number = serializers.CharField(source='student.student_id', read_only=True)
+    student_name = serializers.SerializerMethodField()
+    class_name = serializers.CharField(source='school_class.name', read_only=True)
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    level_display = serializers.CharField(source='get_level_display', read_only=True)
+
+    class Meta:
+        model = StudentRiskFlag
+        fields = [
+            'id', 'student', 'student_number', 'student_name', 'school_class', 'class_name',
+            'course', 'course_name', 'term', 'kind', 'kind_display', 'level', 'level_display',
+            'rate', 'recent_rate', 'sessions', 'absences', 'lates', 'leaves', 'computed_at',
+        ]
+
+    def get_student_name(self, obj):
+        user = obj.student.user_profile.user
+        return user.first_name or user.username
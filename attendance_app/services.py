@@ -0,0 +1,475 @@
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from accounts.models import StudentProfile
+from accounts.principal import Principal
+from accounts.services import OrgScopeSync
+from courses.models import CourseSchedule
+from .models import ATTENDANCE_STATUS, Attendance, AttendanceDailySummary
+
+
+STATUS_DISPLAY = dict(ATTENDANCE_STATUS)
+
+# 考勤表按冗余的组织范围字段过滤（单表索引）；历史考勤表没有这些字段，仍通过学生连表
+ORG_SCOPE_LOOKUPS = {'class': 'school_class_id', 'major': 'major_id', 'college': 'college_id'}
+ARCHIVE_ORG_SCOPE_LOOKUPS = {
+    'class': 'student__school_class_id',
+    'major': 'student__school_class__major_id',
+    'college': 'student__school_class__major__college_id',
+}
+
+
+def org_scope_lookups(model) -> Dict[str, str]:
+    return ORG_SCOPE_LOOKUPS if model is Attendance else ARCHIVE_ORG_SCOPE_LOOKUPS
+
+
+def virtual_default_enabled() -> bool:
+    """是否启用虚拟默认考勤：没有记录即视为"正常"，只存储迟到/缺勤/请假等异常记录"""
+    return getattr(settings, 'ATTENDANCE_VIRTUAL_DEFAULT', False)
+
+
+def is_default_record(status: Optional[str], remark: Optional[str]) -> bool:
+    """正常且无备注的记录与"没有记录"等价，虚拟默认模式下无需存储"""
+    return (status or 'present') == 'present' and not (remark or '').strip()
+
+
+MAX_SCOPE_RANGES = 20
+
+
+def compress_ranges(ids: Iterable[int]) -> List[tuple]:
+    """把有序ID压缩为闭区间列表，如 [1, 2, 3, 7] -> [(1, 3), (7, 7)]"""
+    ranges = []
+    for i in sorted(set(ids)):
+        if ranges and i == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], i)
+        else:
+            ranges.append((i, i))
+    return ranges
+
+
+class AttendanceScope:
+    """
+    教师的考勤可见范围：任课的课程安排（以ID区间存储）+ 担任班主任的班级
+    两者取自当前用户的 Principal，随其一起缓存与失效
+    """
+
+    def __init__(self, teacher_id: int, schedule_ranges: List[tuple], class_ids: List[int]):
+        self.teacher_id = teacher_id
+        self.schedule_ranges = schedule_ranges
+        self.class_ids = class_ids
+
+    @classmethod
+    def for_principal(cls, principal) -> 'AttendanceScope':
+        return cls(principal.teacher_id, compress_ranges(principal.schedule_ids), list(principal.head_class_ids))
+
+    def contains_schedule(self, schedule_id: int) -> bool:
+        return any(start <= schedule_id <= end for start, end in self.schedule_ranges)
+
+    def schedule_q(self) -> Q:
+        """课程安排条件：区间较少时用 BETWEEN，可直接利用 (schedule, date) 索引；否则展开为 IN"""
+        if len(self.schedule_ranges) <= MAX_SCOPE_RANGES:
+            cond = Q()
+            for start, end in self.schedule_ranges:
+                cond |= Q(schedule_id=start) if start == end else Q(schedule_id__gte=start, schedule_id__lte=end)
+            return cond
+        ids = [i for start, end in self.schedule_ranges for i in range(start, end + 1)]
+        return Q(schedule_id__in=ids)
+
+    def is_empty(self) -> bool:
+        return not self.schedule_ranges and not self.class_ids
+
+    def q(self, model=Attendance) -> Q:
+        """
+        考勤记录条件；两部分都只涉及单表或一次外键连接，
+        外键均为多对一，结果不会重复，无需 DISTINCT
+        """
+        cond = self.schedule_q() if self.schedule_ranges else Q(pk__in=[])
+        if self.class_ids:
+            cond |= Q(**{org_scope_lookups(model)['class'] + '__in': self.class_ids})
+        return cond
+
+
+def upsert_kwargs(unique_fields: List[str], update_fields: List[str]) -> Dict[str, Any]:
+    """bulk_create 的 upsert 参数；MySQL 不支持指定冲突目标，此时依赖唯一索引自行判断"""
+    kwargs = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = unique_fields
+    return kwargs
+
+
+LIST_COUNT_CAP = 10000
+# 这些过滤条件都能落在 (日期, 班级) 汇总表上，其余条件（学生、课程、关键字）只能回到考勤表计数
+SUMMARY_FILTER_PARAMS = {'date', 'start', 'end', 'college', 'department', 'class', 'status'}
+PAGINATION_PARAMS = {'cursor', 'limit'}
+
+
+_summary_state = threading.local()
+
+
+@contextmanager
+def deferred_summary_refresh():
+    """批量写入期间暂停逐条记录触发的汇总维护，由调用方在写入后统一刷新"""
+    depth = getattr(_summary_state, 'depth', 0)
+    _summary_state.depth = depth + 1
+    try:
+        yield
+    finally:
+        _summary_state.depth = depth
+
+
+def summary_refresh_deferred() -> bool:
+    return getattr(_summary_state, 'depth', 0) > 0
+
+
+class AttendanceSummaryService:
+    """
+    考勤日汇总服务类
+    维护按 (日期, 班级) 的已存储记录数，并为考勤列表提供总数
+    """
+
+    @staticmethod
+    def refresh(keys: Iterable[tuple]) -> None:
+        """重新统计给定 (日期, 班级ID) 的汇总，每个日期一条 GROUP BY 查询"""
+        by_date: Dict[Any, set] = {}
+        for attendance_date, class_id in keys:
+            if attendance_date and class_id:
+                by_date.setdefault(attendance_date, set()).add(class_id)
+
+        for attendance_date, class_ids in by_date.items():
+            rows = Attendance.objects.filter(
+                date=attendance_date, school_class_id__in=class_ids
+            ).values('school_class_id').annotate(
+                total=Count('id'),
+                **{status: Count('id', filter=Q(status=status)) for status in STATUS_DISPLAY}
+            ).order_by()
+            summaries = [
+                AttendanceDailySummary(
+                    date=attendance_date, school_class_id=row['school_class_id'], total=row['total'],
+                    **{status: row[status] for status in STATUS_DISPLAY}
+                )
+                for row in rows
+            ]
+            with transaction.atomic():
+                if summaries:
+                    AttendanceDailySummary.objects.bulk_create(summaries, **upsert_kwargs(
+                        ['date', 'school_class'], ['total', *STATUS_DISPLAY]
+                    ))
+                empty = class_ids - {s.school_class_id for s in summaries}
+                if empty:
+                    AttendanceDailySummary.objects.filter(date=attendance_date, school_class_id__in=empty).delete()
+
+    @classmethod
+    def refresh_students(cls, attendance_date, student_ids: Iterable[int]) -> None:
+        class_ids = StudentProfile.objects.filter(
+            id__in=set(student_ids), school_class__isnull=False
+        ).values_list('school_class_id', flat=True).distinct()
+        cls.refresh((attendance_date, class_id) for class_id in class_ids)
+
+    @staticmethod
+    def count(params) -> Optional[int]:
+        """仅使用汇总表能表达的过滤条件时，返回汇总表中的记录总数；否则返回 None"""
+        used = {key for key in params if params.get(key)} - PAGINATION_PARAMS
+        if not used <= SUMMARY_FILTER_PARAMS:
+            return None
+        status = params.get('status')
+        if status and status not in STATUS_DISPLAY:
+            return 0
+        qs = AttendanceDailySummary.objects.all()
+        if params.get('date'):
+            qs = qs.filter(date=params.get('date'))
+        if params.get('start'):
+            qs = qs.filter(date__gte=params.get('start'))
+        if params.get('end'):
+            qs = qs.filter(date__lte=params.get('end'))
+        if params.get('class'):
+            qs = qs.filter(school_class_id=params.get('class'))
+        if params.get('department'):
+            qs = qs.filter(school_class__major_id=params.get('department'))
+        if params.get('college'):
+            qs = qs.filter(school_class__major__college_id=params.get('college'))
+        return qs.aggregate(n=Sum(status or 'total'))['n'] or 0
+
+
+STATUS_PRIORITY = {'present': 0, 'leave': 1, 'late': 2, 'absent': 3}
+
+
+def daily_student_status(start, end, college_id=None, major_id=None) -> Dict[Any, Dict[str, int]]:
+    """
+    按学生人数统计 [start, end] 每天的考勤状态：同一天同一学生按最严重状态归类（absent > late > leave > present）
+    启用虚拟默认考勤时，当天有课、却没有异常记录的学生计为"正常"：
+    应到人数 = 当天有课班级的学生数（按 学期开始日期 换算周次与星期），再加上有记录但不在这些班级中的学生
+    """
+    from .archive import current_term_start
+
+    stored = Attendance.objects.filter(date__gte=start, date__lte=end)
+    if major_id:
+        stored = stored.filter(major_id=major_id)
+    elif college_id:
+        stored = stored.filter(college_id=college_id)
+
+    worst: Dict[Any, Dict[int, str]] = {}
+    record_class: Dict[Any, Dict[int, Optional[int]]] = {}
+    for row in stored.values('date', 'student_id', 'school_class_id', 'status').order_by():
+        day_map = worst.setdefault(row['date'], {})
+        old = day_map.get(row['student_id'])
+        if old is None or STATUS_PRIORITY.get(row['status'], 0) > STATUS_PRIORITY.get(old, 0):
+            day_map[row['student_id']] = row['status']
+        record_class.setdefault(row['date'], {})[row['student_id']] = row['school_class_id']
+
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    result = {}
+    for day in days:
+        counts = {status: 0 for status in STATUS_PRIORITY}
+        for status in worst.get(day, {}).values():
+            counts[status] = counts.get(status, 0) + 1
+        result[day] = counts
+    if not virtual_default_enabled():
+        return result
+
+    term_start = current_term_start()
+    day_keys = {}
+    for day in days:
+        week = (day - term_start).days // 7 + 1
+        if day >= term_start and week <= settings.SEMESTER_TOTAL_WEEKS:
+            day_keys[day] = (week, day.isoweekday())
+    if not day_keys:
+        return result
+
+    scheduled: Dict[tuple, set] = {}
+    for week, weekday, class_id in CourseSchedule.objects.filter(
+        week_number__in={k[0] for k in day_keys.values()},
+        timeslot__weekday__in={k[1] for k in day_keys.values()},
+        school_class__isnull=False,
+    ).values_list('week_number', 'timeslot__weekday', 'school_class_id').distinct():
+        scheduled.setdefault((week, weekday), set()).add(class_id)
+
+    students = StudentProfile.objects.filter(school_class__isnull=False)
+    if major_id:
+        students = students.filter(major_id=major_id)
+    elif college_id:
+        students = students.filter(college_id=college_id)
+    class_sizes = dict(students.values_list('school_class_id').annotate(n=Count('id')).order_by())
+
+    for day, key in day_keys.items():
+        class_ids = scheduled.get(key, set())
+        expected = sum(class_sizes.get(class_id, 0) for class_id in class_ids)
+        extra = sum(1 for class_id in record_class.get(day, {}).values() if class_id not in class_ids)
+        counts = result[day]
+        counts['present'] = expected + extra - sum(v for k, v in counts.items() if k != 'present')
+    return result
+
+
+def attendance_list_count(querysets, params=None, use_summary: bool = False) -> tuple:
+    """
+    考勤列表总数，返回 (count, exact)；querysets 为当前表与归档表的查询集（一个或两个）
+    管理员的组织维度过滤直接读日汇总表（归档不改动日汇总，已包含归档记录）；
+    其余情况在各表上计数，但最多数到 LIST_COUNT_CAP，超过时返回上限并标记为非精确值
+    """
+    if use_summary and params is not None:
+        count = AttendanceSummaryService.count(params)
+        if count is not None:
+            return count, True
+    capped = sum(qs.order_by()[:LIST_COUNT_CAP + 1].count() for qs in querysets)
+    return min(capped, LIST_COUNT_CAP), capped <= LIST_COUNT_CAP
+
+
+class AttendanceRosterService:
+    """
+    考勤名册服务类
+    将班级名册与已存储的异常考勤记录在内存中合并，为没有记录的学生生成"正常"的虚拟记录，
+    查询过程不写数据库
+    """
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def _student_filter(self) -> Q:
+        """把考勤列表的学生相关过滤条件转换为 StudentProfile 上的条件"""
+        params = self.params
+        cond = Q()
+        if params.get('student'):
+            cond &= Q(id=params.get('student'))
+        if params.get('class'):
+            cond &= Q(school_class_id=params.get('class'))
+        if params.get('department'):
+            cond &= Q(school_class__major_id=params.get('department'))
+        if params.get('college'):
+            cond &= Q(school_class__major__college_id=params.get('college'))
+        return cond
+
+    def _matches_q(self, student: Dict[str, Any], course_name: str) -> bool:
+        q = self.params.get('q')
+        if not q:
+            return True
+        fields = [
+            student['student_id'], student['user_profile__user__username'],
+            student['user_profile__user__first_name'], student['school_class__name'],
+            student['school_class__major__name'], student['school_class__major__college__name'],
+            course_name,
+        ]
+        return any(q in (f or '') for f in fields)
+
+    def virtual_records(self, schedules: Iterable[CourseSchedule], attendance_date,
+                        stored_keys: Iterable[tuple]) -> List[Dict[str, Any]]:
+        """
+        生成虚拟"正常"记录
+        stored_keys 为已存储记录的 (student_id, schedule_id) 集合，这些学生不再生成虚拟记录
+        """
+        status_param = self.params.get('status')
+        if status_param and status_param != 'present':
+            return []
+
+        schedules = list(schedules)
+        if not schedules:
+            return []
+        stored = set(stored_keys)
+        class_ids = {s.school_class_id for s in schedules if s.school_class_id}
+        students = list(StudentProfile.objects.filter(school_class_id__in=class_ids).filter(
+            self._student_filter()
+        ).values(
+            'id', 'student_id', 'school_class_id', 'school_class__name',
+            'school_class__major__name', 'school_class__major__college__name',
+            'user_profile__user__username', 'user_profile__user__first_name',
+        ))
+        by_class: Dict[int, list] = {}
+        for student in students:
+            by_class.setdefault(student['school_class_id'], []).append(student)
+
+        date_str = attendance_date.isoformat()
+        records = []
+        for schedule in schedules:
+            course = schedule.course
+            course_name = course.name if course else None
+            for student in by_class.get(schedule.school_class_id, []):
+                if (student['id'], schedule.id) in stored:
+                    continue
+                if not self._matches_q(student, course_name or ''):
+                    continue
+                records.append({
+                    'id': None,
+                    'student': student['id'],
+                    'student_id': student['student_id'],
+                    'student_name': student['user_profile__user__first_name'] or student['user_profile__user__username'],
+                    'schedule': schedule.id,
+                    'schedule_id': schedule.id,
+                    'course_name': course_name,
+                    'course_id': schedule.course_id,
+                    'date': date_str,
+                    'status': 'present',
+                    'status_display': STATUS_DISPLAY['present'],
+                    'remark': '',
+                    'class_name': student['school_class__name'],
+                    'college_name': student['school_class__major__college__name'],
+                    'major_name': student['school_class__major__name'],
+                    'is_virtual': True,
+                })
+        return records
+
+    def merge(self, stored_data: List[Dict[str, Any]], schedules: Iterable[CourseSchedule],
+              attendance_date) -> List[Dict[str, Any]]:
+        """合并已存储记录（已序列化）与虚拟记录，按课程安排、学号排序"""
+        stored_keys = {(row['student'], row['schedule']) for row in stored_data
+                       if str(row.get('date')) == attendance_date.isoformat()}
+        merged = list(stored_data) + self.virtual_records(schedules, attendance_date, stored_keys)
+        merged.sort(key=lambda row: (row['schedule'] or 0, row['student_id'] or ''))
+        return merged
+
+    @staticmethod
+    def schedules_for(schedule_ids: List[int], teacher=None):
+        """获取需要展示名册的课程安排；传入 teacher 时只包含该教师自己的课程"""
+        qs = CourseSchedule.objects.filter(id__in=schedule_ids).select_related('course')
+        if teacher is not None:
+            qs = qs.filter(teacher=teacher)
+        return list(qs)
+
+
+class RollCallService:
+    """
+    整班点名服务类
+    一次请求提交一个课程安排在某日的全部考勤，按 (学生, 课程安排, 日期) 唯一键批量 upsert
+    """
+    def __init__(self, user):
+        self.user = user
+
+    def authorize(self, schedule: CourseSchedule) -> bool:
+        """管理员可以点任意课程；教师只能点自己任课的课程"""
+        principal = Principal.for_user(self.user)
+        if principal.is_school_admin:
+            return True
+        if principal.is_teacher:
+            return bool(principal.teacher_id) and schedule.teacher_id == principal.teacher_id
+        return False
+
+    def submit(self, schedule: CourseSchedule, attendance_date, entries: List[Any]) -> Dict[str, Any]:
+        roster = set(StudentProfile.objects.filter(
+            school_class_id=schedule.school_class_id
+        ).values_list('id', flat=True))
+
+        errors = []
+        rows: Dict[int, tuple] = {}
+        for index, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                errors.append({'index': index, 'error': '数据格式错误'})
+                continue
+            try:
+                student_id = int(entry.get('student'))
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': '学生ID格式错误'})
+                continue
+            status = entry.get('status') or 'present'
+            if status not in STATUS_DISPLAY:
+                errors.append({'index': index, 'student': student_id, 'error': f'无效的考勤状态: {status}'})
+                continue
+            if student_id not in roster:
+                errors.append({'index': index, 'student': student_id, 'error': '学生不属于该课程的班级'})
+                continue
+            rows[student_id] = (status, (entry.get('remark') or '').strip()[:255])
+
+        virtual = virtual_default_enabled()
+        to_store = []
+        to_clear = []
+        for student_id, (status, remark) in rows.items():
+            if virtual and is_default_record(status, remark):
+                to_clear.append(student_id)
+            else:
+                to_store.append(Attendance(
+                    student_id=student_id, schedule=schedule, date=attendance_date,
+                    status=status, remark=remark,
+                ))
+
+        deleted = 0
+        with transaction.atomic(), deferred_summary_refresh():
+            if to_store:
+                Attendance.objects.bulk_create(OrgScopeSync().fill(to_store), batch_size=500, **upsert_kwargs(
+                    ['student', 'schedule', 'date'], ['status', 'remark']
+                ))
+            if to_clear:
+                deleted, _ = Attendance.objects.filter(
+                    schedule=schedule, date=attendance_date, student_id__in=to_clear
+                ).delete()
+            if to_store or deleted:
+                AttendanceSummaryService.refresh([(attendance_date, schedule.school_class_id)])
+
+        counts = {key: 0 for key in STATUS_DISPLAY}
+        for row in Attendance.objects.filter(schedule=schedule, date=attendance_date).values(
+            'status'
+        ).annotate(count=Count('id')).order_by():
+            counts[row['status']] = row['count']
+        if virtual:
+            counts['present'] = len(roster) - sum(v for k, v in counts.items() if k != 'present')
+
+        return {
+            'schedule': schedule.id,
+            'date': attendance_date.isoformat(),
+            'saved': len(to_store),
+            'cleared': deleted,
+            'errors': errors,
+            'summary': counts,
+            'total': len(roster),
+        }
@@ -0,0 +1,17 @@
+# 考勤记录变化时维护日汇总（教师可见范围随 accounts.principal 缓存失效，见 accounts/signals.py）
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Attendance
+from .services import AttendanceSummaryService, summary_refresh_deferred
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_summary(sender, instance, **kwargs):
+    """单条考勤增删改后，在事务提交时重新统计该学生班级当日的汇总"""
+    if summary_refresh_deferred():
+        return
+    attendance_date, student_id = instance.date, instance.student_id
+    transaction.on_commit(lambda: AttendanceSummaryService.refresh_students(attendance_date, [student_id]))
@@ -0,0 +1,63 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import StudentProfile, UserProfile
+from attendance_app.archive import AttendanceArchiver
+from attendance_app.models import Attendance, AttendanceArchive
+from courses.models import Course, CourseSchedule, TimeSlot
+from organization.models import Class, College, Major
+
+
+class ArchivedAttendanceReadTests(TestCase):
+    """未指定日期或范围跨越归档截止日期时，考勤列表应同时读取当前表与归档表"""
+
+    BOUNDARY = date(2025, 2, 1)
+
+    def setUp(self):
+        cache.clear()
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=major)
+        slot = TimeSlot.objects.create(weekday=1, index=1, start_time=time(8), end_time=time(9))
+        schedule = CourseSchedule.objects.create(school_class=school_class, course=course, timeslot=slot)
+        profile = UserProfile.objects.create(user=User.objects.create_user('S0', password='x'), role='student')
+        student = StudentProfile.objects.create(user_profile=profile, student_id='20240001', school_class=school_class)
+
+        self.days = [date(2024, 12, 2), date(2025, 1, 6), date(2025, 3, 3), date(2025, 3, 10)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in self.days:
+                Attendance.objects.create(student=student, schedule=schedule, date=day, status='late')
+        AttendanceArchiver(self.BOUNDARY).run()
+        self.assertEqual(AttendanceArchive.objects.count(), 2)
+
+        admin = User.objects.create_superuser('admin', password='x')
+        UserProfile.objects.create(user=admin, role='super_admin')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def _dates(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row['date'] for row in response.data['results']]
+
+    def test_undated_list_merges_both_tables(self):
+        r = self.client.get('/api/attendance/records/')
+        self.assertEqual(self._dates(r), [d.isoformat() for d in reversed(self.days)])
+        self.assertEqual(r.data['count'], 4)
+
+    def test_range_across_boundary_pages_through_archive(self):
+        params = {'start': '2025-01-01', 'end': '2025-03-05', 'limit': 1}
+        r = self.client.get('/api/attendance/records/', params)
+        self.assertEqual(self._dates(r), ['2025-03-03'])
+        cursor = r.data['next'].split('cursor=')[1].split('&')[0]
+        r = self.client.get('/api/attendance/records/', dict(params, cursor=cursor))
+        self.assertEqual(self._dates(r), ['2025-01-06'])
+        self.assertIsNone(r.data['next'])
+
+    def test_range_before_boundary_reads_archive_only(self):
+        r = self.client.get('/api/attendance/records/', {'end': '2025-01-31'})
+        self.assertEqual(self._dates(r), ['2025-01-06', '2024-12-02'])
@@ -0,0 +1,49 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.models import StudentProfile, UserProfile
+from attendance_app.checkin import CHECKIN_REMARK, CheckinQueue
+from attendance_app.models import Attendance
+from courses.models import Course, CourseSchedule, TimeSlot
+from organization.models import Class, College, Major
+
+
+class CheckinFlushTests(TestCase):
+    """签到批量写入覆盖默认的"正常"记录，保留教师录入的记录，并分别计数"""
+
+    DAY = date(2025, 3, 3)
+
+    def setUp(self):
+        cache.clear()
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        self.school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=major)
+        slot = TimeSlot.objects.create(weekday=1, index=1, start_time=time(8), end_time=time(9))
+        self.schedule = CourseSchedule.objects.create(school_class=self.school_class, course=course, timeslot=slot)
+        self.students = []
+        for n in range(3):
+            profile = UserProfile.objects.create(user=User.objects.create_user(f'S{n}', password='x'), role='student')
+            self.students.append(StudentProfile.objects.create(
+                user_profile=profile, student_id=f'2024000{n}', school_class=self.school_class
+            ))
+
+    def test_flush_overwrites_default_rows_only(self):
+        default_student, teacher_student, new_student = self.students
+        Attendance.objects.create(student=default_student, schedule=self.schedule, date=self.DAY, status='present')
+        Attendance.objects.create(student=teacher_student, schedule=self.schedule, date=self.DAY,
+                                  status='leave', remark='病假')
+
+        write_queue = CheckinQueue()
+        for student in self.students:
+            write_queue.put(student.id, self.schedule.id, self.DAY, self.school_class.id,
+                            'late', f'{CHECKIN_REMARK} 08:15:00')
+        self.assertEqual(write_queue.flush(), 2)
+
+        stored = dict(Attendance.objects.filter(date=self.DAY).values_list('student_id', 'status'))
+        self.assertEqual(stored, {default_student.id: 'late', teacher_student.id: 'leave', new_student.id: 'late'})
+        metrics = write_queue.snapshot()
+        self.assertEqual((metrics['flushed'], metrics['overwritten'], metrics['conflicts']), (1, 1, 1))
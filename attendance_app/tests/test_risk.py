@@ -0,0 +1,37 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from accounts.models import StudentProfile, UserProfile
+from attendance_app.risk import RiskAnalyticsService
+from courses.models import Course, CourseSchedule, TimeSlot
+from organization.models import Class, College, Major
+
+
+@override_settings(SEMESTER_START_DATE='2025-02-17', SEMESTER_TOTAL_WEEKS=2)
+class RiskSessionCountTests(TestCase):
+    """应到课次只计到截止日期当天，截止日期所在周之后几天的课不计入"""
+
+    def setUp(self):
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=major)
+        profile = UserProfile.objects.create(user=User.objects.create_user('S0', password='x'), role='student')
+        StudentProfile.objects.create(user_profile=profile, student_id='20240001', school_class=school_class)
+        # 每周一、二、五各一次课，共两周
+        for weekday in (1, 2, 5):
+            slot = TimeSlot.objects.create(weekday=weekday, index=1, start_time=time(8), end_time=time(9))
+            for week in (1, 2):
+                CourseSchedule.objects.create(school_class=school_class, course=course, timeslot=slot, week_number=week)
+
+    def held(self, as_of):
+        return RiskAnalyticsService(as_of).compute()['held'].tolist()
+
+    def test_current_week_counts_only_past_days(self):
+        self.assertEqual(self.held(date(2025, 2, 18)), [2])   # 第1周周二
+        self.assertEqual(self.held(date(2025, 2, 24)), [4])   # 第2周周一
+
+    def test_finished_term_counts_every_session(self):
+        self.assertEqual(self.held(date(2025, 3, 10)), [6])
@@ -0,0 +1,73 @@
+from datetime import date, time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from accounts.models import StudentProfile, UserProfile
+from attendance_app.models import Attendance
+from attendance_app.services import daily_student_status
+from courses.models import Course, CourseSchedule, TimeSlot
+from organization.models import Class, College, Major
+
+
+# 2024-09-02 为周一，即第1周星期1
+@override_settings(SEMESTER_START_DATE='2024-09-02', SEMESTER_TOTAL_WEEKS=20)
+class VirtualDefaultCountTests(TestCase):
+
+    def setUp(self):
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        self.school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        self.students = []
+        for n in range(4):
+            profile = UserProfile.objects.create(user=User.objects.create_user(f'S{n}', password='x'), role='student')
+            self.students.append(StudentProfile.objects.create(
+                user_profile=profile, student_id=f'2024{n:04d}', school_class=self.school_class
+            ))
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=major)
+        slot = TimeSlot.objects.create(weekday=1, index=1, start_time=time(8), end_time=time(9))
+        self.schedule = CourseSchedule.objects.create(
+            school_class=self.school_class, course=course, timeslot=slot, week_number=1
+        )
+        self.monday = date(2024, 9, 2)
+
+    @override_settings(ATTENDANCE_VIRTUAL_DEFAULT=True)
+    def test_present_is_roster_minus_exceptions(self):
+        Attendance.objects.create(student=self.students[0], schedule=self.schedule, date=self.monday, status='absent')
+        Attendance.objects.create(student=self.students[1], schedule=self.schedule, date=self.monday, status='late')
+
+        counts = daily_student_status(self.monday, date(2024, 9, 3))
+        self.assertEqual(counts[self.monday], {'present': 2, 'leave': 0, 'late': 1, 'absent': 1})
+        # 周二没有课，不产生应到人数
+        self.assertEqual(counts[date(2024, 9, 3)]['present'], 0)
+
+    @override_settings(ATTENDANCE_VIRTUAL_DEFAULT=False)
+    def test_stored_rows_only_when_disabled(self):
+        Attendance.objects.create(student=self.students[0], schedule=self.schedule, date=self.monday, status='present')
+        Attendance.objects.create(student=self.students[1], schedule=self.schedule, date=self.monday, status='late')
+
+        counts = daily_student_status(self.monday, self.monday)
+        self.assertEqual(counts[self.monday]['present'], 1)
+        self.assertEqual(counts[self.monday]['late'], 1)
+
+    @override_settings(ATTENDANCE_VIRTUAL_DEFAULT=False)
+    def test_prune_refuses_when_disabled(self):
+        Attendance.objects.create(student=self.students[0], schedule=self.schedule, date=self.monday, status='present')
+        with self.assertRaises(CommandError):
+            call_command('prune_default_attendance')
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    @override_settings(ATTENDANCE_VIRTUAL_DEFAULT=True)
+    def test_prune_keeps_exceptions_and_remarks(self):
+        Attendance.objects.create(student=self.students[0], schedule=self.schedule, date=self.monday, status='present')
+        Attendance.objects.create(student=self.students[1], schedule=self.schedule, date=self.monday,
+                                  status='present', remark='补签')
+        Attendance.objects.create(student=self.students[2], schedule=self.schedule, date=self.monday, status='absent')
+
+        call_command('prune_default_attendance', chunk_size=1, stdout=StringIO())
+        self.assertEqual(
+            sorted(Attendance.objects.values_list('student_id', flat=True)),
+            [self.students[1].id, self.students[2].id],
+        )
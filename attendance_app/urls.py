@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AttendanceViewSet
+from .views import AttendanceViewSet, StudentRiskFlagViewSet
 
 router = DefaultRouter()
 router.register('records', AttendanceViewSet)
+router.register('risk-flags', StudentRiskFlagViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,26 +1,49 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from .models import Attendance
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from .archive import AttendanceArchiver, archive_boundary, current_term_start, term_label
+from .checkin import CheckinCode, CheckinService, checkin_queue
+from .export import MAX_PIVOT_DAYS, AttendanceExporter
+from .models import Attendance, AttendanceArchive, StudentRiskFlag
 from django.db.models import Q
 from django.utils import timezone
 from datetime import date
-from .serializers import AttendanceSerializer
+from urllib.parse import quote
+from django.http import FileResponse, StreamingHttpResponse
+from .pagination import AttendanceKeysetPagination
+from .serializers import AttendanceSerializer, AttendanceSlimSerializer, StudentRiskFlagSerializer
 from accounts.permissions import IsTeacherOrAdminOrReadOnly
+from jobs.runner import enqueue_export, job_accepted
 from accounts.models import StudentProfile
+from accounts.principal import principal_of
+from accounts.services import OrgScopeSync
 from courses.models import CourseSchedule
+from .services import (
+    AttendanceRosterService,
+    AttendanceScope,
+    AttendanceSummaryService,
+    RollCallService,
+    attendance_list_count,
+    is_default_record,
+    org_scope_lookups,
+    virtual_default_enabled,
+)
 
 
 class AttendanceViewSet(viewsets.ModelViewSet):
     queryset = Attendance.objects.select_related('student', 'schedule').all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated, IsTeacherOrAdminOrReadOnly]
-    pagination_class = None  # 禁用分页，返回所有数据
+    # 按课程+日期查询时整页返回（以班级名册为上限）；其余列表按 (date, id) 键集分页
+    pagination_class = AttendanceKeysetPagination
 
     def _ensure_default_attendance(self, schedule, attendance_date):
         """
         确保课程中所有学生都有默认的考勤记录
         为没有记录的学生自动创建"正常"状态的考勤记录
         优化：使用更高效的查询方式
+        仅在关闭虚拟默认考勤（ATTENDANCE_VIRTUAL_DEFAULT=False）时使用
         """
         if not schedule or not schedule.school_class:
             return
@@ -64,7 +87,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             
             if attendance_list:
                 try:
-                    Attendance.objects.bulk_create(attendance_list, ignore_conflicts=True)
+                    Attendance.objects.bulk_create(OrgScopeSync().fill(attendance_list), ignore_conflicts=True)
+                    AttendanceSummaryService.refresh([(attendance_date, schedule.school_class_id)])
                 except Exception:
                     # 如果批量创建失败，使用get_or_create逐个创建
                     for att in attendance_list:
@@ -75,11 +99,279 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                             defaults={'status': att.status, 'remark': att.remark}
                         )
 
+    def _param_schedule_ids(self):
+        """解析 schedule 参数（支持逗号分隔的多个ID）"""
+        schedule_param = self.request.query_params.get('schedule')
+        if not schedule_param:
+            return []
+        return [int(sid.strip()) for sid in str(schedule_param).split(',') if sid.strip().isdigit()]
+
+    def _param_date(self):
+        date_param = self.request.query_params.get('date')
+        if not date_param:
+            return None
+        try:
+            return date.fromisoformat(date_param)
+        except (ValueError, TypeError):
+            return None
+
+    def _param_range(self):
+        """start/end 日期范围参数，格式无效时视为未提供"""
+        params = self.request.query_params
+        bounds = []
+        for name in ('start', 'end'):
+            try:
+                bounds.append(date.fromisoformat(params[name]) if params.get(name) else None)
+            except (ValueError, TypeError):
+                bounds.append(None)
+        return tuple(bounds)
+
+    def _source_models(self):
+        """
+        查询读取的表：日期（或 start/end 范围）早于已归档截止日期、或 archive=true 时读历史考勤表；
+        未指定日期或范围跨越截止日期时两张表都读，列表分页按 (date, id) 归并
+        """
+        if self.request.method != 'GET':
+            return [Attendance]
+        if self.request.query_params.get('archive') == 'true':
+            return [AttendanceArchive]
+        boundary = archive_boundary(AttendanceArchiver.kind)
+        if not boundary:
+            return [Attendance]
+        attendance_date = self._param_date()
+        if attendance_date:
+            return [AttendanceArchive] if attendance_date < boundary else [Attendance]
+        start, end = self._param_range()
+        if start and start >= boundary:
+            return [Attendance]
+        if end and end < boundary:
+            return [AttendanceArchive]
+        return [Attendance, AttendanceArchive]
+
+    def _source_model(self):
+        """单表查询（详情、名册）读取的表；范围跨越截止日期时为当前表，归档部分由分页归并"""
+        return self._source_models()[0]
+
+    def _is_roster_query(self):
+        return bool(self._param_date() and self._param_schedule_ids())
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self._is_roster_query():
+            return AttendanceSlimSerializer
+        return super().get_serializer_class()
+
+    def paginate_queryset(self, queryset):
+        """分页列表只取 values() 中已连接的列，不构造模型实例；跨越归档截止日期时同时分页归档表"""
+        if self._is_roster_query():
+            return None
+        querysets = [queryset] + [
+            self.filter_queryset(self._scoped_queryset(model)) for model in self._source_models()[1:]
+        ]
+        return super().paginate_queryset([qs.values(*AttendanceSlimSerializer.VALUES_FIELDS) for qs in querysets])
+
+    def get_list_count(self, querysets):
+        """首页总数：管理员按组织维度过滤时读日汇总表，其余情况做有上限的计数"""
+        use_summary = principal_of(self.request).has_role('super_admin', 'principal', 'vice_principal')
+        return attendance_list_count(querysets, self.request.query_params, use_summary)
+
+    def list(self, request, *args, **kwargs):
+        """
+        虚拟默认考勤模式下，按课程+日期查询时把班级名册与已存储的异常记录在内存中合并，
+        没有记录的学生以"正常"的虚拟记录（id 为 null，is_virtual 为 true）返回，查询不写数据库
+        """
+        attendance_date = self._param_date()
+        schedule_ids = self._param_schedule_ids()
+        principal = principal_of(request)
+        if not (virtual_default_enabled() and attendance_date and schedule_ids and principal.role):
+            return super().list(request, *args, **kwargs)
+
+        if principal.has_role('super_admin', 'principal', 'vice_principal'):
+            teacher = None
+        elif principal.is_teacher:
+            teacher = principal.teacher_id
+            if not teacher:
+                return super().list(request, *args, **kwargs)
+        else:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        stored = self.get_serializer(queryset, many=True).data
+        schedules = AttendanceRosterService.schedules_for(schedule_ids, teacher)
+        return Response(AttendanceRosterService(request.query_params).merge(stored, schedules, attendance_date))
+
+    def create(self, request, *args, **kwargs):
+        """
+        虚拟默认考勤模式下按 (学生, 课程安排, 日期) 写入：
+        已有记录则更新；新记录为"正常"且无备注时不落库，直接返回虚拟记录
+        """
+        if not virtual_default_enabled():
+            return super().create(request, *args, **kwargs)
+
+        data = request.data
+        student, schedule, attendance_date = data.get('student'), data.get('schedule'), data.get('date')
+        if not (student and schedule and attendance_date):
+            return super().create(request, *args, **kwargs)
+
+        existing = Attendance.objects.filter(
+            student_id=student, schedule_id=schedule, date=attendance_date
+        ).first()
+        if existing:
+            serializer = self.get_serializer(existing, data=data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+            return Response(self._virtualize_if_default(existing, serializer.data))
+
+        if is_default_record(data.get('status'), data.get('remark')):
+            serializer = self.get_serializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            instance = Attendance(**serializer.validated_data)
+            result = dict(self.get_serializer(instance).data)
+            result.update(id=None, is_virtual=True)
+            return Response(result)
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(self._virtualize_if_default(instance, serializer.data))
+
+    @action(detail=False, methods=['post'])
+    def rollcall(self, request):
+        """
+        整班点名：一次提交某课程安排在某日的全部考勤
+        请求体：{"schedule": 1, "date": "2025-03-03", "records": [{"student": 1, "status": "late", "remark": ""}, ...]}
+        """
+        data = request.data
+        records = data.get('records')
+        try:
+            schedule_id = int(data.get('schedule'))
+            attendance_date = date.fromisoformat(str(data.get('date')))
+        except (TypeError, ValueError):
+            return Response({'detail': '缺少或无效的课程安排/日期参数'}, status=400)
+        if not isinstance(records, list):
+            return Response({'detail': '缺少考勤记录'}, status=400)
+
+        schedule = CourseSchedule.objects.filter(id=schedule_id).first()
+        if not schedule:
+            return Response({'detail': '课程安排不存在'}, status=404)
+        service = RollCallService(request.user)
+        if not service.authorize(schedule):
+            return Response({'detail': '无权为该课程点名'}, status=403)
+        return Response(service.submit(schedule, attendance_date, records))
+
+    @action(detail=False, methods=['get'], url_path='checkin-code')
+    def checkin_code(self, request):
+        """教师投屏用：返回某课程安排今天的当前签到码及剩余有效秒数"""
+        try:
+            schedule_id = int(request.query_params.get('schedule'))
+        except (TypeError, ValueError):
+            return Response({'detail': '缺少或无效的课程安排参数'}, status=400)
+        schedule = CourseSchedule.objects.filter(id=schedule_id).first()
+        if not schedule:
+            return Response({'detail': '课程安排不存在'}, status=404)
+        if not RollCallService(request.user).authorize(schedule):
+            return Response({'detail': '无权获取该课程的签到码'}, status=403)
+        return Response(CheckinCode().current(schedule.id, timezone.localdate()))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def checkin(self, request):
+        """
+        学生自助签到：{"schedule": 1, "code": "123456"}
+        校验通过后放入写入队列，返回 202；重复签到返回 200；队列已满返回 503 并带 Retry-After
+        """
+        principal = principal_of(request)
+        if not principal.student_id:
+            return Response({'detail': '只有学生可以自助签到'}, status=403)
+        try:
+            schedule_id = int(request.data.get('schedule'))
+        except (TypeError, ValueError):
+            return Response({'detail': '缺少或无效的课程安排参数'}, status=400)
+        status_code, body = CheckinService().check_in(
+            principal.student_id, principal.class_id, schedule_id, request.data.get('code')
+        )
+        response = Response(body, status=status_code)
+        if status_code == 503:
+            response['Retry-After'] = str(body['retry_after'])
+        return response
+
+    @action(detail=False, methods=['get'], url_path='checkin-metrics')
+    def checkin_metrics(self, request):
+        """签到写入队列的运行指标（本进程）"""
+        if not principal_of(request).is_school_admin:
+            return Response({'detail': '无权查看'}, status=403)
+        return Response(checkin_queue.snapshot())
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        流式导出考勤：start/end 为日期范围（默认本学期至今天），其余过滤条件与列表相同
+        file_type=csv|xlsx，layout=rows（逐条）|pivot（学生 × 日期）
+        范围跨越归档截止日期时同时读取归档表，按排序键归并输出
+        background=true 时改为后台导出任务，返回 202 和任务状态地址
+        """
+        try:
+            exporter, file_type, filename = self.build_exporter()
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        if request.query_params.get('background') == 'true':
+            return job_accepted(enqueue_export(request, 'attendance'))
+
+        if file_type == 'csv':
+            response = StreamingHttpResponse(exporter.iter_csv(), content_type='text/csv; charset=utf-8')
+        else:
+            response = FileResponse(
+                exporter.write_xlsx(),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+        response['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        return response
+
+    def build_exporter(self, progress=None):
+        """按查询参数构造导出器，返回 (exporter, file_type, filename)；参数无效时抛出 ValueError"""
+        params = self.request.query_params
+        try:
+            start = date.fromisoformat(params['start']) if params.get('start') else current_term_start()
+            end = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+        except ValueError:
+            raise ValueError('日期格式应为 YYYY-MM-DD')
+        if start > end:
+            raise ValueError('开始日期不能晚于结束日期')
+        file_type = params.get('file_type', 'csv')
+        layout = params.get('layout', 'rows')
+        if file_type not in ('csv', 'xlsx') or layout not in ('rows', 'pivot'):
+            raise ValueError('不支持的导出格式')
+        if layout == 'pivot' and (end - start).days + 1 > MAX_PIVOT_DAYS:
+            raise ValueError(f'按日期透视导出的范围不能超过 {MAX_PIVOT_DAYS} 天')
+
+        models = [Attendance]
+        boundary = archive_boundary(AttendanceArchiver.kind)
+        if boundary and start < boundary:
+            models.insert(0, AttendanceArchive)
+        querysets = [
+            self._scoped_queryset(model).filter(date__gte=start, date__lte=end) for model in models
+        ]
+        exporter = AttendanceExporter(querysets, start, end, layout, progress)
+        return exporter, file_type, f'考勤_{start.isoformat()}_{end.isoformat()}.{file_type}'
+
+    def _virtualize_if_default(self, instance, data):
+        """虚拟默认考勤模式下，记录被改回"正常"且无备注时删除该记录"""
+        data = dict(data)
+        if virtual_default_enabled() and is_default_record(instance.status, instance.remark):
+            instance.delete()
+            data.update(id=None, is_virtual=True)
+        return data
+
     def get_queryset(self):
-        user = self.request.user
-        profile = getattr(user, 'profile', None)
-        if not profile:
-            return Attendance.objects.none()
+        return self._scoped_queryset(self._source_model())
+
+    def _scoped_queryset(self, model):
+        """按角色可见范围与查询参数过滤 model（Attendance 或 AttendanceArchive）"""
+        principal = principal_of(self.request)
+        if not principal.role:
+            return model.objects.none()
         params = self.request.query_params
         college = params.get('college')
         department = params.get('department')
@@ -87,6 +379,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         student_id = params.get('student')
         date_param = params.get('date')
         status_param = params.get('status')
+        start, end = self._param_range()
+        lookups = org_scope_lookups(model)
 
         def apply_filters(qs):
             schedule_id = params.get('schedule')
@@ -104,13 +398,17 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             if student_id:
                 qs = qs.filter(student_id=student_id)
             if klass:
-                qs = qs.filter(student__school_class_id=klass)
+                qs = qs.filter(**{lookups['class']: klass})
             if department:
-                qs = qs.filter(student__school_class__major_id=department)
+                qs = qs.filter(**{lookups['major']: department})
             if college:
-                qs = qs.filter(student__school_class__major__college_id=college)
+                qs = qs.filter(**{lookups['college']: college})
             if date_param:
                 qs = qs.filter(date=date_param)
+            if start:
+                qs = qs.filter(date__gte=start)
+            if end:
+                qs = qs.filter(date__lte=end)
             if status_param:
                 qs = qs.filter(status=status_param)
             q = params.get('q')
@@ -126,7 +424,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 )
             return qs
 
-        role = profile.role
+        role = principal.role
         if role in ['super_admin', 'principal', 'vice_principal']:
             # 管理员查看时，如果传入了课程和日期，也自动为对应课程的所有学生生成默认考勤记录
             schedule_id_param = params.get('schedule')
@@ -140,7 +438,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 except (ValueError, TypeError):
                     attendance_date = timezone.now().date()
 
-            if self.request.method == 'GET' and schedule_id_param and attendance_date:
+            if (self.request.method == 'GET' and schedule_id_param and attendance_date
+                    and not virtual_default_enabled() and model is Attendance):
                 try:
                     # 支持多个 schedule ID
                     schedule_ids_to_process = []
@@ -176,20 +475,18 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     logger = logging.getLogger(__name__)
                     logger.error(f"管理员自动生成考勤记录失败: {e}", exc_info=True)
 
-            qs = Attendance.objects.select_related('student', 'schedule', 'schedule__course',
+            qs = model.objects.select_related('student', 'schedule', 'schedule__course',
                                                   'student__school_class', 'student__school_class__major',
                                                   'student__school_class__major__college',
                                                   'student__user_profile', 'student__user_profile__user').all()
-            # 确保去重
-            qs = qs.distinct()
+            # 关联均为多对一，不会产生重复记录，无需 distinct()
             return apply_filters(qs)
         if role in ['teacher', 'head_teacher']:
-            teacher = getattr(profile, 'teacher_profile', None)
+            teacher = principal.teacher_id
             if not teacher:
                 return Attendance.objects.none()
-            # 获取教师的所有课程安排（schedule）
-            allowed_schedules = CourseSchedule.objects.filter(teacher=teacher)
-            schedule_ids = list(allowed_schedules.values_list('id', flat=True))
+            # 教师的考勤可见范围（任课的课程安排 + 班主任班级）随 Principal 缓存，避免每次请求重新计算
+            scope = AttendanceScope.for_principal(principal)
             
             # 如果是查询操作且有schedule和date，自动生成默认记录
             # 优化：只在必要时生成，避免每次查询都执行
@@ -205,22 +502,13 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     attendance_date = timezone.now().date()
             
             # 优化：只在明确需要时才生成默认记录，并且使用缓存避免重复生成
-            if self.request.method == 'GET' and schedule_id_param and attendance_date:
+            if (self.request.method == 'GET' and schedule_id_param and attendance_date
+                    and not virtual_default_enabled() and model is Attendance):
                 try:
-                    # 支持多个schedule ID
-                    schedule_ids_to_process = []
-                    if ',' in str(schedule_id_param):
-                        schedule_ids_to_process = [int(sid.strip()) for sid in str(schedule_id_param).split(',') if sid.strip().isdigit()]
-                    else:
-                        try:
-                            schedule_ids_to_process = [int(schedule_id_param)]
-                        except (ValueError, TypeError):
-                            pass
-                    
                     # 只为教师有权限的schedule生成记录
-                    # 优化：批量处理，减少数据库查询
-                    schedules_to_process = allowed_schedules.filter(
-                        id__in=[sid for sid in schedule_ids_to_process if sid in schedule_ids]
+                    schedules_to_process = CourseSchedule.objects.filter(
+                        teacher_id=teacher,
+                        id__in=[sid for sid in self._param_schedule_ids() if scope.contains_schedule(sid)]
                     ).select_related('school_class')
                     
                     for schedule in schedules_to_process:
@@ -235,66 +523,82 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     logger = logging.getLogger(__name__)
                     logger.error(f"自动生成考勤记录失败: {e}", exc_info=True)
             
-            # 直接通过schedule查询考勤记录
-            if schedule_ids:
-                qs = Attendance.objects.filter(schedule_id__in=schedule_ids).select_related(
-                    'student', 'schedule', 'schedule__course',
-                    'student__school_class', 'student__school_class__major',
-                    'student__school_class__major__college',
-                    'student__user_profile', 'student__user_profile__user'
-                )
-            else:
-                qs = Attendance.objects.none()
-            
-            # 如果是班主任，还要包含其管理的班级的所有考勤记录
-            # 优化：使用更高效的查询方式，避免union
-            try:
-                from personnel.models import Teacher as PersonnelTeacher
-                from organization.models import Class
-                try:
-                    pt = PersonnelTeacher.objects.get(employee_id=teacher.teacher_id)
-                    head_class_ids = list(Class.objects.filter(head_teacher=pt).values_list('id', flat=True))
-                    if head_class_ids:
-                        # 将班主任管理的班级的考勤记录也加入查询
-                        if schedule_ids:
-                            # 合并schedule和班级条件
-                            qs = Attendance.objects.filter(
-                                Q(schedule_id__in=schedule_ids) | Q(student__school_class_id__in=head_class_ids)
-                            ).select_related(
-                                'student', 'schedule', 'schedule__course',
-                                'student__school_class', 'student__school_class__major',
-                                'student__school_class__major__college',
-                                'student__user_profile', 'student__user_profile__user'
-                            )
-                        else:
-                            qs = Attendance.objects.filter(
-                                student__school_class_id__in=head_class_ids
-                            ).select_related(
-                                'student', 'schedule', 'schedule__course',
-                                'student__school_class', 'student__school_class__major',
-                                'student__school_class__major__college',
-                                'student__user_profile', 'student__user_profile__user'
-                            )
-                except PersonnelTeacher.DoesNotExist:
-                    pass
-            except Exception:
-                # 如果导入失败或查询失败，忽略班主任的班级
-                pass
-            
-            # 确保去重
-            qs = qs.distinct()
+            if scope.is_empty():
+                return Attendance.objects.none()
+            # 任课课程按 schedule_id 区间过滤（走 (schedule, date) 索引），班主任班级按学生班级过滤；
+            # 关联均为多对一，不会产生重复记录，因此不再使用 distinct()
+            qs = model.objects.filter(scope.q(model)).select_related(
+                'student', 'schedule', 'schedule__course',
+                'student__school_class', 'student__school_class__major',
+                'student__school_class__major__college',
+                'student__user_profile', 'student__user_profile__user'
+            )
             return apply_filters(qs)
         if role == 'student':
-            student = getattr(profile, 'student_profile', None)
-            if not student:
+            if not principal.student_id:
                 return Attendance.objects.none()
-            qs = Attendance.objects.filter(student=student).select_related(
+            qs = model.objects.filter(student_id=principal.student_id).select_related(
                 'student', 'schedule', 'schedule__course',
                 'student__school_class', 'student__school_class__major',
                 'student__school_class__major__college',
                 'student__user_profile', 'student__user_profile__user'
             )
-            # 确保去重
-            qs = qs.distinct()
             return apply_filters(qs)
         return Attendance.objects.none()
+
+
+class StudentRiskFlagViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    学生考勤风险标记（只读），由 compute_risk_flags 批处理生成
+    支持参数：students（逗号分隔的学生ID）、student、class、course、kind、level、term（默认当前学期）
+    """
+    queryset = StudentRiskFlag.objects.all()
+    serializer_class = StudentRiskFlagSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = None  # 禁用分页，返回所有数据
+
+    def get_queryset(self):
+        principal = principal_of(self.request)
+        params = self.request.query_params
+        qs = StudentRiskFlag.objects.select_related(
+            'student__user_profile__user', 'school_class', 'course'
+        ).filter(term=params.get('term') or term_label(current_term_start()))
+
+        if principal.is_school_admin:
+            pass
+        elif principal.is_college_admin:
+            if not principal.college_id:
+                return StudentRiskFlag.objects.none()
+            qs = qs.filter(school_class__major__college_id=principal.college_id)
+        elif principal.is_teacher:
+            if not principal.teacher_id:
+                return StudentRiskFlag.objects.none()
+            # 班主任看本班全部标记，任课教师看自己所授课程在所教班级的标记
+            taught = CourseSchedule.objects.filter(
+                id__in=principal.schedule_ids
+            ).values_list('school_class_id', 'course_id').distinct()
+            cond = Q(school_class_id__in=principal.head_class_ids)
+            for class_id, course_id in taught:
+                cond |= Q(school_class_id=class_id, course_id=course_id)
+            qs = qs.filter(cond)
+        elif principal.is_student:
+            if not principal.student_id:
+                return StudentRiskFlag.objects.none()
+            qs = qs.filter(student_id=principal.student_id)
+        else:
+            return StudentRiskFlag.objects.none()
+
+        students = params.get('students')
+        if students:
+            qs = qs.filter(student_id__in=[int(s) for s in students.split(',') if s.strip().isdigit()])
+        if params.get('student'):
+            qs = qs.filter(student_id=params.get('student'))
+        if params.get('class'):
+            qs = qs.filter(school_class_id=params.get('class'))
+        if params.get('course'):
+            qs = qs.filter(course_id=params.get('course'))
+        if params.get('kind'):
+            qs = qs.filter(kind=params.get('kind'))
+        if params.get('level'):
+            qs = qs.filter(level=params.get('level'))
+        return qs.order_by('school_class_id', 'student_id', 'course_id', 'kind')
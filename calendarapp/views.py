@@ -4,6 +4,7 @@ from django.db.models import Q
 from .models import CalendarEvent
 from .serializers import CalendarEventSerializer
 from accounts.permissions import IsAdminOrDeanOrReadOnly
+from accounts.principal import principal_of
 
 
 class CalendarEventViewSet(viewsets.ModelViewSet):
@@ -15,31 +16,17 @@ class CalendarEventViewSet(viewsets.ModelViewSet):
         """根据用户权限过滤日程安排"""
         queryset = super().get_queryset()
         user = self.request.user
+        principal = principal_of(self.request)
         
-        # 超级管理员可以看到所有事件
-        if getattr(user, 'is_superuser', False):
+        # 超级管理员、管理员和院长可以看到所有事件
+        if principal.is_admin:
             return queryset
         
-        profile = getattr(user, 'profile', None)
-        if not profile:
+        if not principal.role:
             return queryset.none()
         
-        role = profile.role
-        
-        # 管理员和院长可以看到所有事件
-        if role in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']:
-            return queryset
-        
-        # 获取用户所属学院
-        user_college = None
-        if role in ['teacher', 'head_teacher']:
-            teacher_profile = getattr(profile, 'teacher_profile', None)
-            if teacher_profile and teacher_profile.department:
-                user_college = getattr(teacher_profile.department, 'college', None)
-        elif role == 'student':
-            student_profile = getattr(profile, 'student_profile', None)
-            if student_profile and student_profile.school_class and student_profile.school_class.major:
-                user_college = student_profile.school_class.major.college
+        # 用户所属学院：教师按所在专业，学生按所在班级
+        user_college = principal.college_id if (principal.is_teacher or principal.is_student) else None
         
         # 构建过滤条件：可以看到的事件
         # 1. 全校可见的事件
@@ -47,7 +34,7 @@ class CalendarEventViewSet(viewsets.ModelViewSet):
         # 3. 个人创建的事件
         filter_q = Q(visibility='all')
         if user_college:
-            filter_q |= Q(visibility='college', college=user_college)
+            filter_q |= Q(visibility='college', college_id=user_college)
         filter_q |= Q(created_by=user)
         
         return queryset.filter(filter_q)
@@ -42,6 +42,8 @@ class Course(models.Model):
             # 使用 update() 方法批量更新，不会触发 save 信号，性能更好
             # 同步更新所有使用该课程的课程表记录的教师字段
             CourseSchedule.objects.filter(course=self).update(teacher=self.teacher)
+            from .signals import schedules_changed
+            schedules_changed.send(sender=CourseSchedule)
 
 
 class TimeSlot(models.Model):
@@ -1,6 +1,5 @@
 from rest_framework import serializers
 from .models import Course, TimeSlot, ScheduleTimeConfig, CourseSchedule
-from accounts.models import StudentProfile
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -26,7 +25,12 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_student_count(self, obj):
         if not obj.department_id:
             return 0
-        return StudentProfile.objects.filter(school_class__major=obj.department).count()
+        # 列表查询已通过子查询注解人数（见 CourseViewSet.get_queryset），直接使用
+        annotated = getattr(obj, 'annotated_student_count', None)
+        if annotated is not None:
+            return annotated
+        from .services import get_major_student_counts
+        return get_major_student_counts().get(obj.department_id, 0)
     
     def get_teacher_name(self, obj):
         """获取教师姓名"""
@@ -48,6 +52,13 @@ class CourseSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class CourseLiteSerializer(serializers.ModelSerializer):
+    """轻量课程序列化器：用于课程下拉选择，不读取教师、学院等关联信息"""
+    class Meta:
+        model = Course
+        fields = ['id', 'subject_id', 'name', 'course_type', 'teacher', 'department']
+
+
 class TimeSlotSerializer(serializers.ModelSerializer):
     class Meta:
         model = TimeSlot
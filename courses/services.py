@@ -0,0 +1,629 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.models import StudentProfile, TeacherProfile
+from classrooms.models import Classroom
+from organization.models import Class as SchoolClass
+from .models import Course, CourseSchedule, TimeSlot
+from .signals import schedules_changed
+
+
+def parse_weeks(value: Optional[str], default_end: Optional[int] = None) -> List[int]:
+    """
+    解析周次参数
+    支持 "5"、"3-16"、"1,3,5" 以及混合写法 "1-4,8"；为空时返回第1周到学期末
+    周次超出 1 到学期总周数时抛出 ValueError（在展开范围之前检查，避免超大范围占满内存）
+    """
+    total_weeks = default_end or settings.SEMESTER_TOTAL_WEEKS
+    if not value:
+        return list(range(1, total_weeks + 1))
+
+    def check(week: int) -> int:
+        if not 1 <= week <= total_weeks:
+            raise ValueError(f'周次必须在 1 到 {total_weeks} 之间')
+        return week
+
+    weeks = set()
+    for part in str(value).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = check(int(start)), check(int(end))
+            if start > end:
+                start, end = end, start
+            weeks.update(range(start, end + 1))
+        else:
+            weeks.add(check(int(part)))
+    return sorted(weeks)
+
+
+MAJOR_STUDENT_COUNTS_CACHE_KEY = 'courses:major_student_counts'
+MAJOR_STUDENT_COUNTS_TIMEOUT = 60  # 秒
+
+
+def get_major_student_counts() -> Dict[int, int]:
+    """
+    获取各专业学生人数 {major_id: count}
+    一条分组查询得到全部专业的人数，短时缓存，供未做注解的单个课程序列化时使用
+    """
+    counts = cache.get(MAJOR_STUDENT_COUNTS_CACHE_KEY)
+    if counts is None:
+        rows = StudentProfile.objects.filter(school_class__isnull=False).values(
+            'school_class__major_id'
+        ).annotate(count=Count('id')).order_by()
+        counts = {row['school_class__major_id']: row['count'] for row in rows}
+        cache.set(MAJOR_STUDENT_COUNTS_CACHE_KEY, counts, MAJOR_STUDENT_COUNTS_TIMEOUT)
+    return counts
+
+
+def week_mask(weeks: Iterable[int]) -> int:
+    """把周次列表转换为位图（第 w 周对应第 w 位）"""
+    mask = 0
+    for wk in weeks:
+        mask |= 1 << wk
+    return mask
+
+
+class ClassroomOccupancyIndex:
+    """
+    教室占用位图索引
+    以 (教室ID, 时间段ID) 为键，值为按周次置位的整数位图。
+    首次使用时用一条查询从 CourseSchedule 加载；新增排课时增量置位，
+    修改/删除排课时标记失效，下次查询时重建。
+    多进程部署下各进程各自持有索引，MAX_AGE 作为兜底的重建周期。
+    """
+    MAX_AGE = 300  # 秒
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bits: Dict[tuple, int] = {}
+        self._loaded_at: Optional[float] = None
+
+    def _rebuild(self) -> None:
+        bits: Dict[tuple, int] = {}
+        rows = CourseSchedule.objects.filter(classroom__isnull=False).values_list(
+            'classroom_id', 'timeslot_id', 'week_number'
+        )
+        for classroom_id, timeslot_id, week_number in rows.iterator(chunk_size=5000):
+            key = (classroom_id, timeslot_id)
+            bits[key] = bits.get(key, 0) | (1 << week_number)
+        self._bits = bits
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.MAX_AGE:
+            return
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is None or time.monotonic() - loaded_at >= self.MAX_AGE:
+                self._rebuild()
+
+    def invalidate(self) -> None:
+        """标记索引失效，下次查询时重建"""
+        with self._lock:
+            self._loaded_at = None
+
+    def mark_occupied(self, classroom_id: int, timeslot_id: int, week_number: int) -> None:
+        """新增排课时增量置位；索引尚未加载时无需处理"""
+        if not classroom_id or self._loaded_at is None:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            key = (classroom_id, timeslot_id)
+            self._bits[key] = self._bits.get(key, 0) | (1 << week_number)
+
+    def occupied_mask(self, classroom_id: int, timeslot_id: int) -> int:
+        self._ensure_loaded()
+        return self._bits.get((classroom_id, timeslot_id), 0)
+
+    def snapshot(self) -> Dict[tuple, int]:
+        """返回当前位图的只读视图，用于批量统计"""
+        self._ensure_loaded()
+        return self._bits
+
+
+occupancy_index = ClassroomOccupancyIndex()
+
+
+class ClassroomAvailabilityService:
+    """空闲教室查询与教室利用率统计服务类"""
+
+    def __init__(self, index: Optional[ClassroomOccupancyIndex] = None):
+        self.index = index or occupancy_index
+
+    def resolve_timeslots(self, weekday: int, periods: Iterable[int]) -> List[TimeSlot]:
+        """根据星期和节次获取时间段"""
+        periods = list(periods)
+        slots = list(TimeSlot.objects.filter(weekday=weekday, index__in=periods).order_by('index'))
+        if len(slots) != len(set(periods)):
+            found = {s.index for s in slots}
+            missing = sorted(set(periods) - found)
+            raise ValueError(f'星期{weekday}不存在第{missing}节的时间段')
+        return slots
+
+    def find_available(self, timeslot_ids: List[int], weeks: List[int],
+                       min_capacity: int = 0, location: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        查询在所有给定时间段、所有给定周次均空闲的教室
+        判定方式：占用位图与周次位图按位与为0
+        """
+        mask = week_mask(weeks)
+        qs = Classroom.objects.filter(status='可用', capacity__gte=min_capacity)
+        if location:
+            qs = qs.filter(location__icontains=location)
+
+        bits = self.index.snapshot()
+        result = []
+        for room in qs.order_by('location', 'name'):
+            if any(bits.get((room.id, ts), 0) & mask for ts in timeslot_ids):
+                continue
+            result.append({
+                'id': room.id,
+                'name': room.name,
+                'location': room.location,
+                'capacity': room.capacity,
+            })
+        return result
+
+    def utilization(self, weeks: List[int], weekdays: Iterable[int] = (1, 2, 3, 4, 5),
+                    location: Optional[str] = None) -> Dict[str, Any]:
+        """
+        统计教室利用率：已占用的 (时间段, 周次) 数 / 可用的 (时间段, 周次) 总数
+        按教室和楼宇（Classroom.location）两级汇总
+        """
+        mask = week_mask(weeks)
+        timeslot_ids = list(TimeSlot.objects.filter(weekday__in=list(weekdays)).values_list('id', flat=True))
+        slots_per_room = len(timeslot_ids) * len(weeks)
+
+        qs = Classroom.objects.all()
+        if location:
+            qs = qs.filter(location__icontains=location)
+
+        bits = self.index.snapshot()
+        rooms = []
+        buildings: Dict[str, Dict[str, Any]] = {}
+        for room in qs.order_by('location', 'name'):
+            used = sum(bin(bits.get((room.id, ts), 0) & mask).count('1') for ts in timeslot_ids)
+            rate = round(used / slots_per_room, 4) if slots_per_room else 0
+            rooms.append({
+                'id': room.id,
+                'name': room.name,
+                'location': room.location,
+                'capacity': room.capacity,
+                'used_slots': used,
+                'total_slots': slots_per_room,
+                'utilization': rate,
+            })
+
+            building = buildings.setdefault(room.location or '-', {
+                'location': room.location or '-',
+                'room_count': 0,
+                'used_slots': 0,
+                'total_slots': 0,
+            })
+            building['room_count'] += 1
+            building['used_slots'] += used
+            building['total_slots'] += slots_per_room
+
+        for building in buildings.values():
+            total = building['total_slots']
+            building['utilization'] = round(building['used_slots'] / total, 4) if total else 0
+
+        return {
+            'weeks': weeks,
+            'rooms': rooms,
+            'buildings': sorted(buildings.values(), key=lambda b: b['location']),
+        }
+
+
+TEACHER_CONFLICT = '教师在该时间段已有课程安排'
+CLASS_CONFLICT = '班级在该时间段已有课程安排'
+ROOM_CONFLICT = '教室在该时间段已被占用'
+
+
+class ScheduleOccupancy:
+    """
+    排课占用集合
+    以 (对象ID, 时间段ID, 周次) 为元素，分别记录教师、班级、教室的占用情况，
+    冲突判断全部在内存中完成
+    """
+
+    def __init__(self):
+        self.teachers = set()
+        self.classes = set()
+        self.rooms = set()
+
+    @classmethod
+    def load(cls, timeslot_ids: Iterable[int], weeks: Iterable[int],
+             exclude_ids: Iterable[int] = ()) -> 'ScheduleOccupancy':
+        """一条查询加载给定时间段、周次范围内已有的排课占用"""
+        occupancy = cls()
+        qs = CourseSchedule.objects.filter(timeslot_id__in=set(timeslot_ids), week_number__in=set(weeks))
+        exclude_ids = list(exclude_ids)
+        if exclude_ids:
+            qs = qs.exclude(id__in=exclude_ids)
+        for teacher_id, class_id, room_id, ts, wk in qs.values_list(
+            'teacher_id', 'school_class_id', 'classroom_id', 'timeslot_id', 'week_number'
+        ).iterator(chunk_size=5000):
+            occupancy.add(teacher_id, class_id, room_id, ts, wk)
+        return occupancy
+
+    def add(self, teacher_id, class_id, room_id, timeslot_id, week_number) -> None:
+        if teacher_id:
+            self.teachers.add((teacher_id, timeslot_id, week_number))
+        if class_id:
+            self.classes.add((class_id, timeslot_id, week_number))
+        if room_id:
+            self.rooms.add((room_id, timeslot_id, week_number))
+
+    def conflicts(self, teacher_id, class_id, room_id, timeslot_id, week_number) -> List[str]:
+        """返回冲突原因列表，与 CourseScheduleSerializer.validate 的提示保持一致"""
+        errors = []
+        if teacher_id and (teacher_id, timeslot_id, week_number) in self.teachers:
+            errors.append(TEACHER_CONFLICT)
+        if class_id and (class_id, timeslot_id, week_number) in self.classes:
+            errors.append(CLASS_CONFLICT)
+        if room_id and (room_id, timeslot_id, week_number) in self.rooms:
+            errors.append(ROOM_CONFLICT)
+        return errors
+
+
+def get_class_sizes(class_ids: Iterable[int]) -> Dict[int, int]:
+    """一条分组查询获取各班级学生人数 {class_id: count}"""
+    rows = StudentProfile.objects.filter(school_class_id__in=set(class_ids)).values(
+        'school_class_id'
+    ).annotate(count=Count('id')).order_by()
+    return {row['school_class_id']: row['count'] for row in rows}
+
+
+class ScheduleBatchService:
+    """批量排课服务类"""
+    MAX_ITEMS = 2000
+    REQUIRED_FIELDS = ('school_class', 'course', 'timeslot', 'week_number')
+    OPTIONAL_FIELDS = ('teacher', 'classroom')
+
+    def _parse_item(self, raw: Any) -> Dict[str, Any]:
+        if not isinstance(raw, dict):
+            raise ValueError('数据格式错误')
+        item = {}
+        for field in self.REQUIRED_FIELDS + self.OPTIONAL_FIELDS:
+            value = raw.get(field)
+            if value in (None, ''):
+                if field in self.REQUIRED_FIELDS:
+                    raise ValueError(f'缺少字段 {field}')
+                item[field] = None
+                continue
+            try:
+                item[field] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'字段 {field} 格式错误')
+        item['classroom_name'] = raw.get('classroom_name') or None
+        if item['week_number'] < 1:
+            raise ValueError('周次必须大于0')
+        return item
+
+    def create_batch(self, raw_items: List[Any], user=None) -> Dict[str, Any]:
+        """
+        批量创建排课
+        1. 预加载涉及的班级、课程、时间段、教室、教师以及这些时间段/周次上已有的占用
+        2. 逐条在内存中校验：与已有排课冲突、与本批次先前条目冲突、教室容量
+        3. 有效条目在一个事务中 bulk_create，无效条目逐条返回原因
+        """
+        if len(raw_items) > self.MAX_ITEMS:
+            raise ValueError(f'单次最多提交{self.MAX_ITEMS}条排课')
+
+        results: List[Dict[str, Any]] = []
+        parsed: List[Optional[Dict[str, Any]]] = []
+        for index, raw in enumerate(raw_items):
+            try:
+                parsed.append(self._parse_item(raw))
+                results.append({'index': index, 'schedule_id': None, 'errors': []})
+            except (TypeError, ValueError) as e:
+                parsed.append(None)
+                results.append({'index': index, 'schedule_id': None, 'errors': [str(e)]})
+
+        valid = [p for p in parsed if p]
+
+        def ids_of(field):
+            return {p[field] for p in valid if p[field]}
+
+        classes = set(SchoolClass.objects.filter(id__in=ids_of('school_class')).values_list('id', flat=True))
+        courses = set(Course.objects.filter(id__in=ids_of('course')).values_list('id', flat=True))
+        timeslots = set(TimeSlot.objects.filter(id__in=ids_of('timeslot')).values_list('id', flat=True))
+        teachers = set(TeacherProfile.objects.filter(id__in=ids_of('teacher')).values_list('id', flat=True))
+        rooms = dict(Classroom.objects.filter(id__in=ids_of('classroom')).values_list('id', 'capacity'))
+        class_sizes = get_class_sizes(classes)
+        occupancy = ScheduleOccupancy.load(timeslots, ids_of('week_number'))
+
+        to_create = []
+        for item, result in zip(parsed, results):
+            if item is None:
+                continue
+            errors = result['errors']
+            if item['school_class'] not in classes:
+                errors.append('班级不存在')
+            if item['course'] not in courses:
+                errors.append('课程不存在')
+            if item['timeslot'] not in timeslots:
+                errors.append('时间段不存在')
+            if item['teacher'] and item['teacher'] not in teachers:
+                errors.append('教师不存在')
+            if item['classroom'] and item['classroom'] not in rooms:
+                errors.append('教室不存在')
+            if errors:
+                continue
+
+            key = (item['teacher'], item['school_class'], item['classroom'], item['timeslot'], item['week_number'])
+            errors.extend(occupancy.conflicts(*key))
+            if item['classroom']:
+                capacity = rooms[item['classroom']]
+                students_count = class_sizes.get(item['school_class'], 0)
+                if capacity < students_count:
+                    errors.append(f'教室容量不足({capacity})，班级人数为{students_count}')
+            if errors:
+                continue
+
+            # 本批次内后续条目也要与已通过的条目比较
+            occupancy.add(*key)
+            to_create.append((result, CourseSchedule(
+                school_class_id=item['school_class'],
+                course_id=item['course'],
+                teacher_id=item['teacher'],
+                classroom_id=item['classroom'],
+                classroom_name=item['classroom_name'],
+                timeslot_id=item['timeslot'],
+                week_number=item['week_number'],
+                created_by=user if user and user.is_authenticated else None,
+            )))
+
+        objs = [obj for _, obj in to_create]
+        with transaction.atomic():
+            CourseSchedule.objects.bulk_create(objs, batch_size=500)
+        self._fill_missing_pks(objs)
+        for result, obj in to_create:
+            result['schedule_id'] = obj.pk
+        # bulk_create 不触发 post_save，手动发送批量变更信号
+        if objs:
+            schedules_changed.send(sender=CourseSchedule)
+
+        return {
+            'created_count': len(objs),
+            'failed_count': len(results) - len(objs),
+            'items': results,
+        }
+
+    def reassign(self, ids: List[int], teacher_id: Optional[int] = None,
+                 classroom_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        批量更换教师/教室
+        以集合方式校验：一条查询取出目标排课，一条查询取出目标教师/教室在这些
+        (时间段, 周次) 上的已有占用，冲突的排课返回原因，其余用一条 UPDATE 写入
+        """
+        if teacher_id and not TeacherProfile.objects.filter(id=teacher_id).exists():
+            raise ValueError('教师不存在')
+        capacity = None
+        if classroom_id:
+            capacity = Classroom.objects.filter(id=classroom_id).values_list('capacity', flat=True).first()
+            if capacity is None:
+                raise ValueError('教室不存在')
+
+        rows = list(CourseSchedule.objects.filter(id__in=ids).order_by('id').values_list(
+            'id', 'school_class_id', 'timeslot_id', 'week_number'
+        ))
+        target_ids = [row[0] for row in rows]
+        timeslot_ids = {row[2] for row in rows}
+        weeks = {row[3] for row in rows}
+
+        def busy_slots(**owner):
+            return set(CourseSchedule.objects.filter(
+                timeslot_id__in=timeslot_ids, week_number__in=weeks, **owner
+            ).exclude(id__in=target_ids).values_list('timeslot_id', 'week_number'))
+
+        teacher_busy = busy_slots(teacher_id=teacher_id) if teacher_id else set()
+        room_busy = busy_slots(classroom_id=classroom_id) if classroom_id else set()
+        class_sizes = get_class_sizes({row[1] for row in rows}) if classroom_id else {}
+
+        ok_ids = []
+        conflicts = []
+        for schedule_id, class_id, ts, wk in rows:
+            errors = []
+            if teacher_id and (ts, wk) in teacher_busy:
+                errors.append(TEACHER_CONFLICT)
+            if classroom_id:
+                if (ts, wk) in room_busy:
+                    errors.append(ROOM_CONFLICT)
+                students_count = class_sizes.get(class_id, 0)
+                if capacity < students_count:
+                    errors.append(f'教室容量不足({capacity})，班级人数为{students_count}')
+            if errors:
+                conflicts.append({'id': schedule_id, 'errors': errors})
+                continue
+            # 同一批次内同一 (时间段, 周次) 只能有一条排课改派给同一教师/教室
+            if teacher_id:
+                teacher_busy.add((ts, wk))
+            if classroom_id:
+                room_busy.add((ts, wk))
+            ok_ids.append(schedule_id)
+
+        fields = {}
+        if teacher_id:
+            fields['teacher_id'] = teacher_id
+        if classroom_id:
+            fields['classroom_id'] = classroom_id
+        updated = 0
+        if ok_ids and fields:
+            updated = CourseSchedule.objects.filter(id__in=ok_ids).update(**fields)
+            schedules_changed.send(sender=CourseSchedule)
+
+        return {
+            'updated': updated,
+            'total': len(rows),
+            'conflict_ids': [c['id'] for c in conflicts],
+            'conflicts': conflicts,
+        }
+
+    def _fill_missing_pks(self, objs: List[CourseSchedule]) -> None:
+        """MySQL 的 bulk_create 不返回主键，按 (班级, 时间段, 周次) 回查"""
+        missing = [obj for obj in objs if obj.pk is None]
+        if not missing:
+            return
+        rows = CourseSchedule.objects.filter(
+            school_class_id__in={o.school_class_id for o in missing},
+            timeslot_id__in={o.timeslot_id for o in missing},
+            week_number__in={o.week_number for o in missing},
+        ).values_list('id', 'school_class_id', 'timeslot_id', 'week_number')
+        pk_map = {(c, t, w): pk for pk, c, t, w in rows}
+        for obj in missing:
+            obj.pk = pk_map.get((obj.school_class_id, obj.timeslot_id, obj.week_number))
+
+
+class ScheduleCloneService:
+    """
+    课表整体复制服务类（学期轮换）
+    将源班级（或整个学院）在源周次上的课表模式复制到目标周次，
+    可选地把班级映射到下一届同专业、同序号的班级。
+    冲突用内存集合判断，写入使用分块 bulk_create；
+    传入 BatchJob 时把进度与冲突样例写入任务记录（由 jobs 框架在后台执行）
+    """
+    CHUNK_SIZE = 1000
+    MAX_SAMPLES = 50
+
+    def __init__(self, job=None):
+        self.job = job
+        self.progress: Dict[str, Any] = {
+            'total': 0,
+            'processed': 0,
+            'created': 0,
+            'conflict_count': 0,
+            'conflicts': [],
+            'unmapped_classes': [],
+        }
+
+    def _save_progress(self, **changes) -> None:
+        self.progress.update(changes)
+        if self.job is None:
+            return
+        job = self.job
+        job.total = self.progress['total']
+        job.processed = self.progress['processed']
+        job.created = self.progress['created']
+        job.skipped = self.progress['conflict_count']
+        job.errors = self.progress['conflicts']
+        job.result = {'unmapped_classes': self.progress['unmapped_classes']}
+        job.save(update_fields=['total', 'processed', 'created', 'skipped', 'errors', 'result'])
+
+    def resolve_source_classes(self, class_ids: Optional[List[int]] = None,
+                               college_id: Optional[int] = None) -> List[int]:
+        if class_ids:
+            return list(SchoolClass.objects.filter(id__in=class_ids).values_list('id', flat=True))
+        if college_id:
+            return list(SchoolClass.objects.filter(
+                major__college_id=college_id, is_deleted=False
+            ).values_list('id', flat=True))
+        return []
+
+    def build_class_map(self, class_ids: List[int], remap_cohort: bool) -> Dict[int, int]:
+        """源班级 -> 目标班级；remap_cohort 时映射到下一届同专业、同序号的班级"""
+        if not remap_cohort:
+            return {cid: cid for cid in class_ids}
+        sources = list(SchoolClass.objects.filter(id__in=class_ids).values_list(
+            'id', 'major_id', 'enrollment_year', 'class_number'
+        ))
+        targets = SchoolClass.objects.filter(
+            major_id__in={m for _, m, _, _ in sources},
+            enrollment_year__in={y + 1 for _, _, y, _ in sources},
+            is_deleted=False,
+        ).values_list('id', 'major_id', 'enrollment_year', 'class_number')
+        target_by_key = {(m, y, n): tid for tid, m, y, n in targets}
+        class_map = {}
+        for cid, major_id, year, number in sources:
+            target = target_by_key.get((major_id, year + 1, number))
+            if target:
+                class_map[cid] = target
+        return class_map
+
+    def plan(self, class_map: Dict[int, int], source_weeks: List[int],
+             target_weeks: List[int], user=None) -> List[CourseSchedule]:
+        """
+        生成待写入的排课
+        目标第 i 周使用源周次列表中第 (i mod 源周数) 周的课表，
+        因此既可以整段平移（源、目标周数相同），也可以把单周模式铺满整个学期
+        """
+        rows = list(CourseSchedule.objects.filter(
+            school_class_id__in=list(class_map), week_number__in=source_weeks
+        ).values_list('school_class_id', 'course_id', 'teacher_id', 'classroom_id',
+                      'classroom_name', 'timeslot_id', 'week_number'))
+        by_week: Dict[int, list] = {}
+        for row in rows:
+            by_week.setdefault(row[6], []).append(row)
+
+        timeslot_ids = {row[5] for row in rows}
+        occupancy = ScheduleOccupancy.load(timeslot_ids, target_weeks)
+        rooms = dict(Classroom.objects.filter(id__in={row[3] for row in rows if row[3]}).values_list('id', 'capacity'))
+        class_sizes = get_class_sizes(class_map.values())
+        created_by = user if user is not None and user.is_authenticated else None
+
+        objs = []
+        conflicts = []
+        for i, target_week in enumerate(target_weeks):
+            source_week = source_weeks[i % len(source_weeks)]
+            for class_id, course_id, teacher_id, room_id, room_name, ts, _ in by_week.get(source_week, []):
+                target_class = class_map[class_id]
+                errors = occupancy.conflicts(teacher_id, target_class, room_id, ts, target_week)
+                if room_id and rooms.get(room_id, 0) < class_sizes.get(target_class, 0):
+                    errors.append(f'教室容量不足({rooms.get(room_id, 0)})，班级人数为{class_sizes.get(target_class, 0)}')
+                if errors:
+                    conflicts.append({
+                        'school_class': target_class, 'course': course_id,
+                        'timeslot': ts, 'week_number': target_week, 'errors': errors,
+                    })
+                    continue
+                occupancy.add(teacher_id, target_class, room_id, ts, target_week)
+                objs.append(CourseSchedule(
+                    school_class_id=target_class,
+                    course_id=course_id,
+                    teacher_id=teacher_id,
+                    classroom_id=room_id,
+                    classroom_name=room_name,
+                    timeslot_id=ts,
+                    week_number=target_week,
+                    created_by=created_by,
+                ))
+        self._save_progress(
+            conflict_count=len(conflicts),
+            conflicts=conflicts[:self.MAX_SAMPLES],
+        )
+        return objs
+
+    def run(self, class_ids: Optional[List[int]], college_id: Optional[int], source_weeks: List[int],
+            target_weeks: List[int], remap_cohort: bool = False, user=None) -> Dict[str, Any]:
+        """
+        冲突在 plan 中一次性判断完，之后逐块写入：每块与进度检查点在同一个事务中提交，
+        任务进度在执行过程中即可查询；中途失败时已提交的块保留，重新执行时这些排课按冲突跳过
+        """
+        source_classes = self.resolve_source_classes(class_ids, college_id)
+        class_map = self.build_class_map(source_classes, remap_cohort)
+        self._save_progress(unmapped_classes=[cid for cid in source_classes if cid not in class_map])
+
+        objs = self.plan(class_map, source_weeks, target_weeks, user)
+        self._save_progress(total=len(objs))
+        try:
+            for start in range(0, len(objs), self.CHUNK_SIZE):
+                chunk = objs[start:start + self.CHUNK_SIZE]
+                with transaction.atomic():
+                    CourseSchedule.objects.bulk_create(chunk)
+                    self._save_progress(processed=start + len(chunk), created=start + len(chunk))
+        finally:
+            if self.progress['created']:
+                schedules_changed.send(sender=CourseSchedule)
+        return self.progress
@@ -1,2 +1,33 @@
-# 信号处理器已移至 Course 模型的 save 方法中处理
-# 这样更直接可靠，避免了在信号中获取旧值的复杂性
\ No newline at end of file
+# 教师同步的处理在 Course 模型的 save 方法中完成
+# 这样更直接可靠，避免了在信号中获取旧值的复杂性
+# 这里只维护依赖课程安排的缓存（教室占用位图索引等）
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import CourseSchedule
+
+
+# 批量写入课程安排（bulk_create / update）后发送，这些操作不会触发 post_save/post_delete
+schedules_changed = Signal()
+
+
+@receiver(post_save, sender=CourseSchedule)
+def update_occupancy_on_save(sender, instance, created, **kwargs):
+    """新增排课时增量置位；修改排课无法得知旧值，直接标记索引失效"""
+    from .services import occupancy_index
+    if created:
+        occupancy_index.mark_occupied(instance.classroom_id, instance.timeslot_id, instance.week_number)
+    else:
+        occupancy_index.invalidate()
+
+
+@receiver(post_delete, sender=CourseSchedule)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    from .services import occupancy_index
+    occupancy_index.invalidate()
+
+
+@receiver(schedules_changed)
+def update_occupancy_on_bulk_change(sender, **kwargs):
+    from .services import occupancy_index
+    occupancy_index.invalidate()
@@ -0,0 +1,90 @@
+from datetime import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from courses.models import Course, CourseSchedule, TimeSlot
+from courses.services import ScheduleCloneService
+from jobs.models import BatchJob
+from jobs.runner import job_runner
+from organization.models import Class, College, Major
+
+
+class ScheduleCloneTests(TestCase):
+    """课表复制：目标周次必填，后台执行走 jobs 框架，进度从 /api/jobs/<id>/ 查询"""
+
+    def setUp(self):
+        cache.clear()
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        self.school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        course = Course.objects.create(subject_id='SUB100', name='数据结构', course_type='required')
+        slots = [TimeSlot.objects.create(weekday=1, start_time=time(8 + i), end_time=time(9 + i), index=i + 1)
+                 for i in range(2)]
+        CourseSchedule.objects.bulk_create([
+            CourseSchedule(school_class=self.school_class, course=course, timeslot=slot, week_number=week)
+            for slot in slots for week in (1, 2)
+        ])
+        self.admin = User.objects.create_superuser('admin', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _clone(self, **data):
+        data.setdefault('school_classes', [self.school_class.id])
+        data.setdefault('source_weeks', '1-2')
+        return self.client.post('/api/courses/schedules/clone/', data, format='json')
+
+    def test_target_weeks_required(self):
+        self.assertEqual(self._clone().status_code, 400)
+        self.assertEqual(CourseSchedule.objects.count(), 4)
+
+    def test_overlapping_weeks_rejected_without_remap(self):
+        self.assertEqual(self._clone(target_weeks='2-3').status_code, 400)
+        self.assertEqual(CourseSchedule.objects.count(), 4)
+
+    def test_out_of_range_weeks_rejected(self):
+        self.assertEqual(self._clone(target_weeks='1-100000000').status_code, 400)
+        self.assertEqual(self._clone(target_weeks='0').status_code, 400)
+        self.assertEqual(CourseSchedule.objects.count(), 4)
+
+    def test_background_clone_runs_as_job(self):
+        r = self._clone(target_weeks='17-20')
+        self.assertEqual(r.status_code, 202, r.data)
+        job = BatchJob.objects.get(pk=r.data['job_id'])
+        self.assertEqual((job.kind, job.status), ('schedule_clone', 'pending'))
+
+        job_runner.run(BatchJob, job.pk)
+        status = self.client.get(r.data['status_url']).data
+        self.assertEqual((status['type'], status['status']), ('batch', 'succeeded'))
+        self.assertEqual((status['created'], status['skipped']), (8, 0))
+        weeks = set(CourseSchedule.objects.filter(week_number__gt=2).values_list('week_number', flat=True))
+        self.assertEqual(weeks, {17, 18, 19, 20})
+
+    def test_sync_clone_returns_result(self):
+        r = self._clone(target_weeks='9', background=False)
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(r.data['created'], 2)
+
+    def test_progress_checkpointed_per_chunk(self):
+        r = self._clone(target_weeks='17-20')
+        job = BatchJob.objects.get(pk=r.data['job_id'])
+        real_bulk_create = CourseSchedule.objects.bulk_create
+        calls = []
+
+        def failing_bulk_create(objs, *args, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 3:
+                raise RuntimeError('写入失败')
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(ScheduleCloneService, 'CHUNK_SIZE', 3), \
+                mock.patch.object(CourseSchedule.objects, 'bulk_create', side_effect=failing_bulk_create):
+            job_runner.run(BatchJob, job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual((job.total, job.processed, job.created), (8, 6, 6))
+        self.assertEqual(CourseSchedule.objects.filter(week_number__gt=2).count(), 6)
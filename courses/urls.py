@@ -8,6 +8,8 @@ from .views import (
     GenerateStandardTimeSlotsView,
     AutoScheduleView,
     OptimizeConflictsView,
+    ClassroomAvailabilityView,
+    ClassroomUtilizationView,
 )
 
 router = DefaultRouter()
@@ -21,4 +23,6 @@ urlpatterns = [
     path('timeslots/generate', GenerateStandardTimeSlotsView.as_view(), name='generate_timeslots'),
     path('schedules/auto', AutoScheduleView.as_view(), name='auto_schedule'),
     path('schedules/optimize-conflicts', OptimizeConflictsView.as_view(), name='optimize_conflicts'),
+    path('classrooms/available', ClassroomAvailabilityView.as_view(), name='classrooms_available'),
+    path('classrooms/utilization', ClassroomUtilizationView.as_view(), name='classrooms_utilization'),
 ]
@@ -3,15 +3,21 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from .models import Course, TimeSlot, ScheduleTimeConfig, CourseSchedule
 from accounts.permissions import IsTeacherOrAdminOrReadOnly, IsAdminOrDeanOrReadOnly
 from accounts.models import StudentProfile
+from accounts.principal import ADMIN_ROLES, principal_of
+from jobs.runner import enqueue_batch, job_accepted
 from .serializers import (
     CourseSerializer,
+    CourseLiteSerializer,
     TimeSlotSerializer,
     ScheduleTimeConfigSerializer,
     CourseScheduleSerializer,
 )
+from .services import ClassroomAvailabilityService, ScheduleBatchService, ScheduleCloneService, parse_weeks
 
 
 class CourseViewSet(viewsets.ModelViewSet):
@@ -20,26 +26,42 @@ class CourseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminOrDeanOrReadOnly]
     pagination_class = None  # 禁用分页，返回所有数据
 
+    def is_lite(self):
+        """轻量模式（?lite=1）：用于课程下拉框，不加载教师、学院等关联信息"""
+        return self.request.query_params.get('lite') in ('1', 'true', 'True')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.is_lite():
+            return CourseLiteSerializer
+        return CourseSerializer
+
     def get_queryset(self):
-        user = self.request.user
-        profile = getattr(user, 'profile', None)
-        qs = Course.objects.select_related('teacher__user_profile__user', 'department__college').all()
+        principal = principal_of(self.request)
+        if self.action == 'list' and self.is_lite():
+            qs = Course.objects.all()
+        else:
+            # 用一条分组子查询注解各课程所属专业的学生人数，避免序列化时逐条 count
+            student_counts = StudentProfile.objects.filter(
+                school_class__major=OuterRef('department')
+            ).order_by().values('school_class__major').annotate(c=Count('id')).values('c')
+            qs = Course.objects.select_related('teacher__user_profile__user', 'department__college').annotate(
+                annotated_student_count=Coalesce(Subquery(student_counts, output_field=IntegerField()), 0)
+            )
         
         # 超级用户可以看所有课程
-        if getattr(user, 'is_superuser', False):
+        if principal.is_superuser:
             pass
         # 学生：不能查看课程管理列表
-        elif profile and profile.role == 'student':
+        elif principal.is_student:
             return Course.objects.none()
         # 教师/班主任：只能看自己的课程
-        elif profile and profile.role in ['teacher', 'head_teacher']:
-            teacher = getattr(profile, 'teacher_profile', None)
-            if teacher:
-                qs = qs.filter(teacher=teacher)
+        elif principal.is_teacher:
+            if principal.teacher_id:
+                qs = qs.filter(teacher_id=principal.teacher_id)
             else:
                 return Course.objects.none()
         # 管理人员可以看所有课程
-        elif profile and profile.role not in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']:
+        elif principal.role and not principal.has_role(*ADMIN_ROLES):
             return Course.objects.none()
         
         params = self.request.query_params
@@ -110,8 +132,7 @@ class CourseScheduleViewSet(viewsets.ModelViewSet):
     pagination_class = None  # 禁用分页，返回所有课程安排
 
     def get_queryset(self):
-        user = self.request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(self.request)
         # 优化：使用select_related预加载所有关联对象，减少数据库查询
         qs = CourseSchedule.objects.select_related(
             'school_class',
@@ -125,7 +146,7 @@ class CourseScheduleViewSet(viewsets.ModelViewSet):
         params = self.request.query_params
         
         # 超级用户可以看所有内容
-        if getattr(user, 'is_superuser', False):
+        if principal.is_superuser:
             school_class = params.get('school_class')
             if school_class:
                 try:
@@ -148,30 +169,26 @@ class CourseScheduleViewSet(viewsets.ModelViewSet):
                     pass
             return qs.distinct()  # 确保没有重复记录
             
-        if not profile:
+        if not principal.role:
             return CourseSchedule.objects.none()
-        
-        role = profile.role
 
         # 学生：只能看自己班级的课程表
-        if role == 'student':
-            student = getattr(profile, 'student_profile', None)
-            if student and student.school_class_id:
-                qs = qs.filter(school_class_id=student.school_class_id)
+        if principal.is_student:
+            if principal.class_id:
+                qs = qs.filter(school_class_id=principal.class_id)
             else:
                 return CourseSchedule.objects.none()
         
         # 教师/班主任：只能看自己的课程
-        elif role in ['teacher', 'head_teacher']:
-            teacher = getattr(profile, 'teacher_profile', None)
-            if not teacher:
+        elif principal.is_teacher:
+            if not principal.teacher_id:
                 return CourseSchedule.objects.none()
             
             # 只显示该教师自己的课程安排
-            qs = qs.filter(teacher=teacher).distinct()  # 确保没有重复记录
+            qs = qs.filter(teacher_id=principal.teacher_id).distinct()  # 确保没有重复记录
         
         # 管理人员：可以看所有内容
-        elif role not in ['super_admin', 'principal', 'vice_principal', 'dean', 'vice_dean']:
+        elif not principal.has_role(*ADMIN_ROLES):
             return CourseSchedule.objects.none()
 
         # Query Parameter Filtering (for everyone)
@@ -332,6 +349,22 @@ class CourseScheduleViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        批量创建课程安排
+        请求体：{"items": [{school_class, course, teacher, classroom, classroom_name, timeslot, week_number}, ...]}
+        所有条目在内存中相互校验并与已有排课比对，有效条目一次性写入，冲突条目逐条返回原因
+        """
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response({'detail': '缺少参数'}, status=400)
+        try:
+            result = ScheduleBatchService().create_batch(items, request.user)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response(result)
+
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
         ids = request.data.get('ids') or []
@@ -339,19 +372,58 @@ class CourseScheduleViewSet(viewsets.ModelViewSet):
         classroom = request.data.get('classroom')
         if not ids or (not teacher and not classroom):
             return Response({'detail': '缺少参数'}, status=400)
-        qs = CourseSchedule.objects.filter(id__in=ids)
-        updated = 0
-        for obj in qs:
-            data = {}
-            if teacher:
-                data['teacher'] = teacher
-            if classroom:
-                data['classroom'] = classroom
-            ser = CourseScheduleSerializer(obj, data=data, partial=True)
-            if ser.is_valid():
-                ser.save()
-                updated += 1
-        return Response({'updated': updated, 'total': qs.count()})
+        try:
+            ids = [int(i) for i in ids]
+            result = ScheduleBatchService().reassign(
+                ids,
+                teacher_id=int(teacher) if teacher else None,
+                classroom_id=int(classroom) if classroom else None,
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'detail': str(e)}, status=400)
+        return Response(result)
+
+    @action(detail=False, methods=['post'])
+    def clone(self, request):
+        """
+        复制课表到新的周次/学期（后台执行，进度通过 /api/jobs/<id>/ 查询）
+        请求体：school_classes（班级ID列表）或 college（学院ID）、source_weeks（如 "1-16"）、
+        target_weeks（必填，如 "17-32"）、remap_cohort（是否映射到下一届班级）、background（默认true）
+        """
+        if not principal_of(request).is_admin:
+            return Response({'detail': '只有管理员可以复制课表'}, status=403)
+
+        data = request.data
+        class_ids = data.get('school_classes') or []
+        college_id = data.get('college')
+        if not class_ids and not college_id:
+            return Response({'detail': '缺少班级或学院参数'}, status=400)
+        if not data.get('target_weeks'):
+            return Response({'detail': '缺少目标周次参数'}, status=400)
+        try:
+            class_ids = [int(c) for c in class_ids]
+            college_id = int(college_id) if college_id else None
+            source_weeks = parse_weeks(data.get('source_weeks'))
+            target_weeks = parse_weeks(data.get('target_weeks'))
+        except (TypeError, ValueError) as e:
+            return Response({'detail': f'参数错误: {e}'}, status=400)
+        remap_cohort = str(data.get('remap_cohort', '')).lower() in ('1', 'true')
+        if not remap_cohort and set(target_weeks) & set(source_weeks):
+            # 同一班级复制到重叠的周次只会与源课表自身冲突
+            return Response({'detail': '不映射班级时目标周次不能与源周次重叠'}, status=400)
+        background = str(data.get('background', 'true')).lower() not in ('0', 'false')
+
+        if background:
+            job = enqueue_batch(request, 'schedule_clone', {
+                'school_classes': class_ids, 'college': college_id,
+                'source_weeks': source_weeks, 'target_weeks': target_weeks,
+                'remap_cohort': remap_cohort,
+            })
+            return job_accepted(job)
+        result = ScheduleCloneService().run(
+            class_ids, college_id, source_weeks, target_weeks, remap_cohort, request.user
+        )
+        return Response(result)
 
     @action(detail=False, methods=['post'])
     def bulk_delete(self, request):
@@ -628,3 +700,56 @@ class AutoScheduleView(APIView):
 
         created_ids = [x['schedule_id'] for x in results if x['schedule_id']]
         return Response({'created_count': len(created_ids), 'items': results})
+
+
+class ClassroomAvailabilityView(APIView):
+    """
+    空闲教室查询
+    参数：weekday（星期1-7）、period（节次，可逗号分隔表示连堂）或 timeslot（时间段ID），
+    weeks（周次，如 5、3-16、1,3,5，默认整个学期）、capacity（最小容量）、location（楼宇）
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        service = ClassroomAvailabilityService()
+        try:
+            weeks = parse_weeks(params.get('weeks') or params.get('week_number'))
+            min_capacity = int(params.get('capacity') or 0)
+            timeslot_param = params.get('timeslot')
+            if timeslot_param:
+                timeslot_ids = [int(x) for x in str(timeslot_param).split(',') if x.strip()]
+            else:
+                weekday = int(params.get('weekday'))
+                periods = [int(x) for x in str(params.get('period')).split(',') if x.strip()]
+                timeslot_ids = [s.id for s in service.resolve_timeslots(weekday, periods)]
+        except (TypeError, ValueError) as e:
+            return Response({'error': f'参数错误: {e}'}, status=400)
+
+        items = service.find_available(timeslot_ids, weeks, min_capacity, params.get('location'))
+        return Response({
+            'timeslots': timeslot_ids,
+            'weeks': weeks,
+            'items': items,
+            'count': len(items),
+        })
+
+
+class ClassroomUtilizationView(APIView):
+    """
+    教室利用率报表（按教室、按楼宇）
+    参数：weeks（周次范围，默认整个学期）、weekdays（统计的星期，默认1-5）、location（楼宇）
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            weeks = parse_weeks(params.get('weeks'))
+            weekdays_param = params.get('weekdays')
+            weekdays = [int(x) for x in weekdays_param.split(',') if x.strip()] if weekdays_param else [1, 2, 3, 4, 5]
+        except (TypeError, ValueError) as e:
+            return Response({'error': f'参数错误: {e}'}, status=400)
+
+        report = ClassroomAvailabilityService().utilization(weeks, weekdays, params.get('location'))
+        return Response(report)
@@ -84,6 +84,7 @@ if errorlevel 1 (
     exit /b 1
 )
 echo ✅ 数据库迁移完成
+python manage.py createcachetable
 
 echo.
 echo ========================================
@@ -79,6 +79,7 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 echo "✅ 数据库迁移完成"
+python3 manage.py createcachetable
 
 echo
 echo "========================================"
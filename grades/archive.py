@@ -0,0 +1,60 @@
+"""已毕业年级的成绩归档，复用考勤归档的分块迁移与进度游标"""
+from datetime import date
+from typing import Dict, List
+
+from attendance_app.archive import ChunkedArchiver, archive_boundary
+from attendance_app.services import ARCHIVE_ORG_SCOPE_LOOKUPS, ORG_SCOPE_LOOKUPS
+from organization.models import Class as SchoolClass
+from .models import Grade, GradeArchive
+
+
+def org_scope_lookups(model) -> Dict[str, str]:
+    """成绩表按冗余的组织范围字段过滤；历史成绩表没有这些字段，仍通过学生连表"""
+    return ORG_SCOPE_LOOKUPS if model is Grade else ARCHIVE_ORG_SCOPE_LOOKUPS
+
+
+def graduation_date(enrollment_year: int, duration_type: str) -> date:
+    """毕业日期：入学年份 + 学制年数 的 7 月 1 日"""
+    years = int(str(duration_type).split('_')[0])
+    return date(enrollment_year + years, 7, 1)
+
+
+def graduated_class_ids(before: date) -> List[int]:
+    """在 before 之前已毕业的班级"""
+    return [
+        class_id
+        for class_id, enrollment_year, duration_type in SchoolClass.objects.values_list(
+            'id', 'enrollment_year', 'major__duration_type'
+        )
+        if graduation_date(enrollment_year, duration_type) <= before
+    ]
+
+
+def is_archived_class(class_id: str) -> bool:
+    """按 class_id（班级编号）判断该班成绩是否已归档"""
+    boundary = archive_boundary(GradeArchiver.kind)
+    if not boundary:
+        return False
+    row = SchoolClass.objects.filter(class_id=class_id).values_list(
+        'enrollment_year', 'major__duration_type'
+    ).first()
+    return bool(row) and graduation_date(*row) <= boundary
+
+
+class GradeArchiver(ChunkedArchiver):
+    kind = 'grades'
+    archive_model = GradeArchive
+    fields = (
+        'id', 'student_id', 'course_id', 'score', 'regular_score', 'final_score',
+        'regular_weight', 'final_weight', 'gpa', 'approved', 'created_at', 'updated_at',
+    )
+
+    def __init__(self, before: date, chunk_size: int = 5000):
+        super().__init__(before, chunk_size)
+        self.class_ids = graduated_class_ids(before)
+
+    def source_queryset(self):
+        return Grade.objects.filter(school_class_id__in=self.class_ids)
+
+    def to_archive(self, row):
+        return GradeArchive(**row)
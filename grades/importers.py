@@ -0,0 +1,90 @@
+"""
+课程+班级成绩表导入
+
+表格前两行为表头（课程/班级信息与列名），第三行起每行：学号、姓名、平时分、期末分；
+同一块中的学生一次查询，成绩逐条 save() 以便模型按权重重新计算总评
+"""
+from typing import Any, List, Optional, Sequence
+
+from accounts.importers import ImportResult
+from accounts.models import StudentProfile
+from .models import Grade
+
+
+FIRST_DATA_ROW = 3  # Excel 中第一条数据所在的行号
+
+
+def read_grade_sheet(f) -> List[tuple]:
+    """读取成绩表的数据行（去掉前两行表头）；文件无法解析时抛出 ValueError"""
+    import pandas as pd
+
+    try:
+        df = pd.read_excel(f, header=None)
+    except Exception as e:
+        raise ValueError(f'Excel 文件解析失败: {e}')
+    if df.shape[0] <= 2:
+        raise ValueError('Excel 内容不足，缺少数据行')
+    return list(df.iloc[2:].itertuples(index=False))
+
+
+def _cell(row: Sequence[Any], index: int) -> str:
+    if len(row) <= index or row[index] is None:
+        return ''
+    value = str(row[index]).strip()
+    return '' if value == 'nan' else value
+
+
+def _student_number(row: Sequence[Any]) -> str:
+    # 学号列含空单元格时 pandas 按浮点读入，如 20240001.0
+    value = _cell(row, 0)
+    return value[:-2] if value.endswith('.0') else value
+
+
+def _score(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        score = float(value)
+    except ValueError:
+        return None
+    return score if 0 <= score <= 100 else None
+
+
+def import_grade_rows(rows: Sequence[tuple], school_class_id: int, course_id: int,
+                      result: Optional[ImportResult] = None, first_row: int = FIRST_DATA_ROW) -> ImportResult:
+    """
+    导入一块成绩行；first_row 为 rows[0] 在表格中的行号，用于错误信息
+    result.created 为写入（新建或更新）的成绩条数，两个分数都为空的行计入 skipped
+    """
+    result = result or ImportResult()
+    numbers = {_student_number(row) for row in rows} - {''}
+    students = dict(StudentProfile.objects.filter(
+        student_id__in=numbers, school_class_id=school_class_id
+    ).values_list('student_id', 'id'))
+
+    for row_number, row in enumerate(rows, start=first_row):
+        student_number = _student_number(row)
+        if not student_number:
+            continue
+        student_id = students.get(student_number)
+        if student_id is None:
+            result.errors.append({'row': row_number, 'student_number': student_number, 'error': '学生不存在或不在该班级'})
+            continue
+        regular_score, final_score = _score(_cell(row, 2)), _score(_cell(row, 3))
+        if regular_score is None and final_score is None:
+            result.skipped += 1
+            continue
+        try:
+            grade, _ = Grade.objects.get_or_create(
+                student_id=student_id, course_id=course_id,
+                defaults={'score': 0, 'regular_weight': 60, 'final_weight': 40},
+            )
+            if regular_score is not None:
+                grade.regular_score = regular_score
+            if final_score is not None:
+                grade.final_score = final_score
+            grade.save()  # 模型中会按 60/40 重新计算
+            result.created += 1
+        except Exception as e:
+            result.errors.append({'row': row_number, 'student_number': student_number, 'error': str(e)})
+    return result
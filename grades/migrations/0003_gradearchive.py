@@ -0,0 +1,38 @@
+# 已毕业年级的历史成绩归档表
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_add_courseschedule_indexes'),
+        ('courses', '0007_remove_credit_field'),
+        ('grades', '0002_grade_created_at_grade_final_score_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('regular_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='平时分')),
+                ('final_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='期末分')),
+                ('regular_weight', models.DecimalField(decimal_places=2, default=50.0, max_digits=5, verbose_name='平时分占比(%)')),
+                ('final_weight', models.DecimalField(decimal_places=2, default=50.0, max_digits=5, verbose_name='期末分占比(%)')),
+                ('gpa', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True)),
+                ('approved', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='archived_grades', to='courses.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_grades', to='accounts.studentprofile')),
+            ],
+            options={
+                'verbose_name': '历史成绩',
+                'verbose_name_plural': '历史成绩',
+                'indexes': [models.Index(fields=['student', 'course'], name='grade_archive_student_idx')],
+            },
+        ),
+    ]
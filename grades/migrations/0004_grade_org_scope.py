@@ -0,0 +1,44 @@
+# 成绩冗余学生所在班级、专业、学院及组合索引，数据由 attendance_app 0008 统一回填
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_studentprofile_org_scope'),
+        ('courses', '0007_remove_credit_field'),
+        ('grades', '0003_gradearchive'),
+        ('organization', '0011_class_class_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grade',
+            name='college',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.college', verbose_name='学院'),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='major',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.major', verbose_name='专业'),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='school_class',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='organization.class', verbose_name='班级'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['college', 'course'], name='grade_college_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['major', 'course'], name='grade_major_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['school_class', 'course'], name='grade_class_course_idx'),
+        ),
+    ]
@@ -24,8 +24,27 @@ class Grade(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
+    # 学生所在班级、专业、学院（冗余字段），由 OrgScopeSync 维护
+    school_class = models.ForeignKey(
+        'organization.Class', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='班级'
+    )
+    major = models.ForeignKey(
+        'organization.Major', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='专业'
+    )
+    college = models.ForeignKey(
+        'organization.College', on_delete=models.SET_NULL, null=True, blank=True, db_constraint=False,
+        db_index=False, related_name='+', verbose_name='学院'
+    )
+
     class Meta:
         unique_together = ('student', 'course')
+        indexes = [
+            models.Index(fields=['college', 'course'], name='grade_college_course_idx'),
+            models.Index(fields=['major', 'course'], name='grade_major_course_idx'),
+            models.Index(fields=['school_class', 'course'], name='grade_class_course_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student}-{self.course}-{self.score}"
@@ -49,3 +68,32 @@ class Grade(models.Model):
         if calculated_score is not None:
             self.score = calculated_score
         super().save(*args, **kwargs)
+
+
+class GradeArchive(models.Model):
+    """
+    已毕业年级的历史成绩（冷数据）
+    按块从 Grade 迁入，主键沿用原记录ID；课程可能被删除，因此不建外键约束
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='archived_grades')
+    course = models.ForeignKey(
+        Course, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='archived_grades'
+    )
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    regular_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='平时分')
+    final_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name='期末分')
+    regular_weight = models.DecimalField(max_digits=5, decimal_places=2, default=50.00, verbose_name='平时分占比(%)')
+    final_weight = models.DecimalField(max_digits=5, decimal_places=2, default=50.00, verbose_name='期末分占比(%)')
+    gpa = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True)
+    approved = models.BooleanField(default=False)
+    created_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['student', 'course'], name='grade_archive_student_idx')]
+        verbose_name = '历史成绩'
+        verbose_name_plural = '历史成绩'
+
+    def __str__(self):
+        return f"{self.student}-{self.course_id}-{self.score}"
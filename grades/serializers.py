@@ -28,7 +28,7 @@ class GradeSerializer(serializers.ModelSerializer):
         ]
         
     def get_teacher_name(self, obj):
-        if obj.course.teacher:
+        if obj.course and obj.course.teacher:
             return obj.course.teacher.user_profile.user.get_full_name() or obj.course.teacher.user_profile.user.username
         return '-'
     
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import AdministratorProfile, StudentProfile, UserProfile
+from courses.models import Course
+from grades.models import Grade, GradeArchive
+from organization.models import Class, College, Major
+
+
+class ArchivedGradeReadTests(TestCase):
+    """历史成绩表没有冗余的组织范围字段，按学院/专业过滤时应改走学生连表"""
+
+    def setUp(self):
+        cache.clear()
+        self.college = College.objects.create(code='01', name='信息学院')
+        self.major = Major.objects.create(code='01', name='软件', college=self.college)
+        self.school_class = Class.objects.create(major=self.major, enrollment_year=2018, class_number=1)
+        other_college = College.objects.create(code='02', name='外语学院')
+        other_major = Major.objects.create(code='02', name='英语', college=other_college)
+        other_class = Class.objects.create(major=other_major, enrollment_year=2018, class_number=1)
+
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=self.major)
+        self.student = self._student('S0', '20180001', self.school_class)
+        other = self._student('S1', '20180002', other_class)
+        GradeArchive.objects.create(id=1, student=self.student, course=course, score=80)
+        GradeArchive.objects.create(id=2, student=other, course=course, score=70)
+
+        admin = User.objects.create_superuser('admin', password='x')
+        self.admin = APIClient()
+        self.admin.force_authenticate(admin)
+
+    def _student(self, username, student_id, school_class):
+        profile = UserProfile.objects.create(user=User.objects.create_user(username, password='x'), role='student')
+        return StudentProfile.objects.create(user_profile=profile, student_id=student_id, school_class=school_class)
+
+    def test_admin_filters_archive_by_college_and_major(self):
+        r = self.admin.get('/api/grades/grades/', {'archive': 'true', 'college_id': self.college.id})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([g['id'] for g in r.data], [1])
+
+        r = self.admin.get('/api/grades/grades/', {'archive': 'true', 'major_id': self.major.id})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([g['id'] for g in r.data], [1])
+
+    def test_dean_reads_archive_of_own_college(self):
+        user = User.objects.create_user('D1', password='x')
+        profile = UserProfile.objects.create(user=user, role='dean')
+        AdministratorProfile.objects.create(user_profile=profile, position='院长', college=self.college)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        r = client.get('/api/grades/grades/', {'archive': 'true'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([g['id'] for g in r.data], [1])
+
+    def test_hot_table_uses_denormalized_scope(self):
+        Grade.objects.create(student=self.student, course_id=GradeArchive.objects.get(id=1).course_id, score=90)
+        r = self.admin.get('/api/grades/grades/', {'college_id': self.college.id})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data), 1)
@@ -5,13 +5,17 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser
 from django.db.models import Avg, Count, Q, Case, When, IntegerField
 
-from .models import Grade
+from .archive import is_archived_class, org_scope_lookups
+from .importers import import_grade_rows, read_grade_sheet
+from .models import Grade, GradeArchive
 from .serializers import (
     GradeSerializer,
     GradeCreateUpdateSerializer,
     GradeStatisticsSerializer,
 )
 from accounts.permissions import IsTeacherOrAdminOrReadOnly
+from accounts.principal import ADMIN_ROLES, principal_of
+from jobs.runner import enqueue_export, enqueue_import, job_accepted
 from accounts.models import StudentProfile, TeacherProfile
 from courses.models import Course, CourseSchedule
 from organization.models import College, Major, Class as SchoolClass
@@ -35,65 +39,60 @@ class GradeViewSet(viewsets.ModelViewSet):
             return GradeCreateUpdateSerializer
         return GradeSerializer
 
+    def _grade_model(self):
+        """archive=true 或查询已归档（已毕业）班级时，透明地读历史成绩表"""
+        if self.request.method != 'GET':
+            return Grade
+        params = self.request.query_params
+        if params.get('archive') == 'true':
+            return GradeArchive
+        class_id = params.get('class_id')
+        if class_id and is_archived_class(class_id):
+            return GradeArchive
+        return Grade
+
     def get_queryset(self):
         """根据用户角色过滤数据"""
-        user = self.request.user
-        queryset = Grade.objects.select_related(
+        model = self._grade_model()
+        queryset = model.objects.select_related(
             'student__user_profile__user',
             'student__school_class__major__college',
             'course__teacher__user_profile__user',
         ).all()
+        lookups = org_scope_lookups(model)
 
-        # 超级管理员可以看到所有成绩
-        if getattr(user, 'is_superuser', False):
-            return self._apply_filters(queryset)
-
-        profile = getattr(user, 'profile', None)
-        if not profile:
-            return Grade.objects.none()
-
-        role = profile.role
+        principal = principal_of(self.request)
 
-        # 校长、副校长可以看所有成绩
-        if role in ['super_admin', 'principal', 'vice_principal']:
+        # 超级管理员、校长、副校长可以看所有成绩
+        if principal.is_school_admin:
             return self._apply_filters(queryset)
 
         # 院长、副院长可以看自己学院的成绩
-        if role in ['dean', 'vice_dean']:
-            admin_profile = getattr(profile, 'administrator_profile', None)
-            if admin_profile and admin_profile.college:
-                queryset = queryset.filter(
-                    student__school_class__major__college=admin_profile.college
-                )
+        if principal.is_college_admin:
+            if principal.college_id:
+                queryset = queryset.filter(**{lookups['college']: principal.college_id})
                 return self._apply_filters(queryset)
             return Grade.objects.none()
 
         # 班主任可以看自己班级的成绩
-        if role == 'head_teacher':
-            teacher = getattr(profile, 'teacher_profile', None)
-            if not teacher:
+        if principal.role == 'head_teacher':
+            if not principal.teacher_id:
                 return Grade.objects.none()
-            managed_classes = SchoolClass.objects.filter(head_teacher=teacher)
-            queryset = queryset.filter(student__school_class__in=managed_classes)
+            queryset = queryset.filter(**{lookups['class'] + '__in': principal.head_class_ids})
             return self._apply_filters(queryset)
 
         # 教师可以看自己所教课程的成绩
-        if role == 'teacher':
-            teacher = getattr(profile, 'teacher_profile', None)
-            if not teacher:
+        if principal.role == 'teacher':
+            if not principal.teacher_id:
                 return Grade.objects.none()
-            course_ids = CourseSchedule.objects.filter(teacher=teacher).values_list(
-                'course_id', flat=True
-            ).distinct()
-            queryset = queryset.filter(course_id__in=list(course_ids))
+            queryset = queryset.filter(course_id__in=principal.course_ids)
             return self._apply_filters(queryset)
 
         # 学生只能看自己的成绩
-        if role == 'student':
-            student = getattr(profile, 'student_profile', None)
-            if not student:
+        if principal.is_student:
+            if not principal.student_id:
                 return Grade.objects.none()
-            queryset = queryset.filter(student=student)
+            queryset = queryset.filter(student_id=principal.student_id)
             return self._apply_filters(queryset)
 
         return Grade.objects.none()
@@ -101,6 +100,7 @@ class GradeViewSet(viewsets.ModelViewSet):
     def _apply_filters(self, queryset):
         """通用查询参数过滤（学院/专业/班级/课程/学生名/是否及格/是否审核）"""
         params = self.request.query_params
+        lookups = org_scope_lookups(queryset.model)
 
         student_id = params.get('student_id')
         if student_id:
@@ -124,13 +124,11 @@ class GradeViewSet(viewsets.ModelViewSet):
 
         major_id = params.get('major_id')
         if major_id:
-            queryset = queryset.filter(student__school_class__major_id=major_id)
+            queryset = queryset.filter(**{lookups['major']: major_id})
 
         college_id = params.get('college_id')
         if college_id:
-            queryset = queryset.filter(
-                student__school_class__major__college_id=college_id
-            )
+            queryset = queryset.filter(**{lookups['college']: college_id})
 
         is_passed = params.get('is_passed')
         if is_passed == 'true':
@@ -151,23 +149,21 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_grades(self, request):
         """学生查看自己的成绩"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(request)
 
-        if not profile or profile.role != 'student':
+        if not principal.is_student:
             return Response(
                 {'error': '只有学生可以访问此接口'},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        student = getattr(profile, 'student_profile', None)
-        if not student:
+        if not principal.student_id:
             return Response(
                 {'error': '学生信息不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        grades = Grade.objects.filter(student=student).select_related(
+        grades = Grade.objects.filter(student_id=principal.student_id).select_related(
             'course__teacher__user_profile__user',
             'student__school_class__major__college',
         )
@@ -182,16 +178,15 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def class_grades(self, request):
         """班主任 / 管理员查看班级成绩"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(request)
 
-        if not profile:
+        if not principal.role:
             return Response(
                 {'error': '用户信息不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        if profile.role not in [
+        if principal.role not in [
             'head_teacher',
             'super_admin',
             'principal',
@@ -204,16 +199,14 @@ class GradeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        if profile.role == 'head_teacher':
-            teacher = getattr(profile, 'teacher_profile', None)
-            if not teacher:
+        if principal.role == 'head_teacher':
+            if not principal.teacher_id:
                 return Response(
                     {'error': '教师信息不存在'},
                     status=status.HTTP_404_NOT_FOUND,
                 )
-            managed_classes = SchoolClass.objects.filter(head_teacher=teacher)
             grades = Grade.objects.filter(
-                student__school_class__in=managed_classes
+                school_class_id__in=principal.head_class_ids
             ).select_related(
                 'student__user_profile__user',
                 'student__school_class__major__college',
@@ -233,28 +226,23 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def teacher_grades(self, request):
         """教师管理自己课程的成绩（按单条成绩列表）"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(request)
 
-        teacher = getattr(profile, 'teacher_profile', None)
         # 只要用户是任课教师（在课程表中有课），不再强制要求 role 必须是 teacher/head_teacher
-        if not profile or not teacher:
+        if not principal.teacher_id:
             return Response(
                 {'error': '教师信息不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
         # 检查该教师是否在课程表中实际授课
-        if not CourseSchedule.objects.filter(teacher=teacher).exists():
+        if not principal.schedule_ids:
             return Response(
                 {'error': '当前账号未在课表中担任任课教师，无法通过教师端管理成绩'},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        course_ids = CourseSchedule.objects.filter(teacher=teacher).values_list(
-            'course_id', flat=True
-        ).distinct()
-        grades = Grade.objects.filter(course_id__in=list(course_ids)).select_related(
+        grades = Grade.objects.filter(course_id__in=principal.course_ids).select_related(
             'student__user_profile__user',
             'student__school_class__major__college',
             'course__teacher__user_profile__user',
@@ -269,22 +257,15 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """成绩统计 - 按学院/专业/班级"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(request)
 
-        if not profile:
+        if not principal.role:
             return Response(
                 {'error': '用户信息不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        if profile.role not in [
-            'super_admin',
-            'principal',
-            'vice_principal',
-            'dean',
-            'vice_dean',
-        ]:
+        if not principal.has_role(*ADMIN_ROLES):
             return Response(
                 {'error': '权限不足'},
                 status=status.HTTP_403_FORBIDDEN,
@@ -296,10 +277,8 @@ class GradeViewSet(viewsets.ModelViewSet):
         class_id = request.query_params.get('class_id')
 
         # 院长仅能看自己学院
-        if profile.role in ['dean', 'vice_dean']:
-            admin_profile = getattr(profile, 'administrator_profile', None)
-            if admin_profile and admin_profile.college:
-                college_id = admin_profile.college.id
+        if principal.is_college_admin and principal.college_id:
+            college_id = principal.college_id
 
         statistics_data = []
 
@@ -357,11 +336,9 @@ class GradeViewSet(viewsets.ModelViewSet):
     def _calculate_statistics(self, college_id=None, major_id=None, class_id=None):
         grades = Grade.objects.all()
         if college_id:
-            grades = grades.filter(
-                student__school_class__major__college_id=college_id
-            )
+            grades = grades.filter(college_id=college_id)
         if major_id:
-            grades = grades.filter(student__school_class__major_id=major_id)
+            grades = grades.filter(major_id=major_id)
         if class_id:
             grades = grades.filter(student__school_class__class_id=class_id)
 
@@ -429,16 +406,9 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def batch_create(self, request):
         """批量创建成绩（单条模式使用）"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
-
-        if not profile or profile.role not in [
-            'teacher',
-            'head_teacher',
-            'super_admin',
-            'principal',
-            'vice_principal',
-        ]:
+        if not principal_of(request).has_role(
+            'teacher', 'head_teacher', 'super_admin', 'principal', 'vice_principal'
+        ):
             return Response(
                 {'error': '权限不足'},
                 status=status.HTTP_403_FORBIDDEN,
@@ -476,7 +446,9 @@ class GradeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """导出成绩数据（JSON 格式）"""
+        """导出成绩数据（JSON 格式）；background=true 时改为后台导出任务，返回 202 和任务状态地址"""
+        if request.query_params.get('background') == 'true':
+            return job_accepted(enqueue_export(request, 'grades'))
         queryset = self.get_queryset()
         serializer = GradeSerializer(queryset, many=True)
         return Response(serializer.data)
@@ -486,26 +458,24 @@ class GradeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def teacher_classes(self, request):
         """教师查看自己授课的（课程 + 班级）列表及简要统计"""
-        user = request.user
-        profile = getattr(user, 'profile', None)
+        principal = principal_of(request)
 
-        teacher = getattr(profile, 'teacher_profile', None)
         # 只要用户是任课教师（在课程表中有课），不再强制要求 role 必须是 teacher/head_teacher
-        if not profile or not teacher:
+        if not principal.teacher_id:
             return Response(
                 {'error': '教师信息不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
         # 检查该教师是否在课程表中实际授课
-        if not CourseSchedule.objects.filter(teacher=teacher).exists():
+        if not principal.schedule_ids:
             return Response(
                 {'error': '当前账号未在课表中担任任课教师，无法查看授课班级列表'},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
         # 所有课程表中该教师授课的 (课程, 班级) 组合
-        schedules = CourseSchedule.objects.filter(teacher=teacher).select_related(
+        schedules = CourseSchedule.objects.filter(teacher_id=principal.teacher_id).select_related(
             'course', 'school_class'
         )
 
@@ -846,7 +816,10 @@ class GradeViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
     def class_grades_import(self, request):
-        """导入课程+班级的成绩表（Excel xlsx 文件）"""
+        """
+        导入课程+班级的成绩表（Excel xlsx 文件）
+        background=true 时暂存文件并转为后台导入任务，返回 202 和任务状态地址
+        """
         course_id = request.data.get('course_id')
         class_id = request.data.get('class_id')
         file_obj = request.FILES.get('file')
@@ -857,115 +830,26 @@ class GradeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            school_class = SchoolClass.objects.get(class_id=class_id)
-        except SchoolClass.DoesNotExist:
+        school_class = SchoolClass.objects.filter(class_id=class_id).first()
+        if school_class is None:
             return Response(
                 {'error': '班级不存在'},
                 status=status.HTTP_404_NOT_FOUND,
             )
-
-        import pandas as pd
+        if str(request.data.get('background')).lower() == 'true':
+            return job_accepted(enqueue_import(request, 'grades', {
+                'course_id': int(course_id), 'school_class_id': school_class.id,
+            }))
 
         try:
-            df = pd.read_excel(file_obj, header=None)
-        except Exception as e:
-            return Response(
-                {'error': f'Excel 文件解析失败: {e}'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if df.shape[0] <= 2:
-            return Response(
-                {'error': 'Excel 内容不足，缺少数据行'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        data_rows = df.iloc[2:]
-
-        saved_count = 0
-        errors = []
-
-        for idx, row in enumerate(data_rows.itertuples(index=False), start=3):
-            # row[0]: 学号, row[1]: 姓名, row[2]: 平时分, row[3]: 期末分
-            try:
-                student_number = str(row[0]).strip()
-            except Exception:
-                student_number = ''
-
-            if not student_number:
-                continue
-
-            # 姓名目前仅作展示，不强校验
-            regular_raw = ''
-            if len(row) > 2 and row[2] is not None and str(row[2]).strip():
-                regular_raw = str(row[2]).strip()
-            final_raw = ''
-            if len(row) > 3 and row[3] is not None and str(row[3]).strip():
-                final_raw = str(row[3]).strip()
-
-            try:
-                student = StudentProfile.objects.get(
-                    student_id=student_number, school_class=school_class
-                )
-            except StudentProfile.DoesNotExist:
-                errors.append(
-                    {
-                        'row': idx,
-                        'student_number': student_number,
-                        'error': '学生不存在或不在该班级',
-                    }
-                )
-                continue
-
-            def parse_score(val):
-                if not val:
-                    return None
-                try:
-                    s = float(val)
-                    if 0 <= s <= 100:
-                        return s
-                except Exception:
-                    pass
-                return None
-
-            regular_score = parse_score(regular_raw)
-            final_score = parse_score(final_raw)
-
-            if regular_score is None and final_score is None:
-                continue
-
-            try:
-                grade, _created = Grade.objects.get_or_create(
-                    student=student,
-                    course_id=course_id,
-                    defaults={
-                        'score': 0,
-                        'regular_weight': 60,
-                        'final_weight': 40,
-                    },
-                )
-
-                if regular_score is not None:
-                    grade.regular_score = regular_score
-                if final_score is not None:
-                    grade.final_score = final_score
-
-                grade.save()  # 模型中会按 60/40 重新计算
-                saved_count += 1
-            except Exception as e:
-                errors.append(
-                    {
-                        'row': idx,
-                        'student_number': student_number,
-                        'error': str(e),
-                    }
-                )
-
+            rows = read_grade_sheet(file_obj)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        result = import_grade_rows(rows, school_class.id, course_id)
         return Response(
             {
                 'success': True,
-                'saved_count': saved_count,
-                'errors': errors,
+                'saved_count': result.created,
+                'errors': result.errors,
             }
         )
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = '后台任务'
+
+    def ready(self):
+        from . import handlers  # noqa: F401
@@ -0,0 +1,188 @@
+"""
+后台任务处理函数
+导入：从暂存文件读取全部行，按块导入，每块与检查点在同一事务中提交，重启后从 processed 继续；
+      组织架构 Excel 导入按块整体校验，有错误的块不写入并记入 skipped
+导出：复用对应视图集的权限范围与过滤逻辑，结果写入磁盘文件；中断后从头重新导出
+批量：参数保存在 job.params，直接在数据库中执行
+"""
+import json
+import os
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import QueryDict
+
+from .models import BatchJob, ExportJob, ImportJob
+from .runner import register, result_path
+
+
+class JobRequest:
+    """在后台线程中调用视图集查询逻辑所需的最小请求对象（只读 GET）"""
+    method = 'GET'
+
+    def __init__(self, user, params):
+        self.user = user
+        self.query_params = QueryDict(mutable=True)
+        self.query_params.update(params or {})
+        self.GET = self.query_params
+
+
+def _view(viewset_class, job):
+    return viewset_class(request=JobRequest(job.created_by, job.params), action='export', format_kwarg=None)
+
+
+def _import_chunks(job, rows, import_chunk):
+    """
+    按块导入 rows；import_chunk(块, 块首行在 rows 中的位置) 返回该块的 ImportResult，
+    块的写入与检查点在同一事务中提交
+    """
+    from accounts.importers import IMPORT_CHUNK_SIZE
+
+    job.total = len(rows)
+    job.save(update_fields=['total'])
+    for start in range(job.processed, len(rows), IMPORT_CHUNK_SIZE):
+        with transaction.atomic():
+            result = import_chunk(rows[start:start + IMPORT_CHUNK_SIZE], start)
+            job.processed = min(start + IMPORT_CHUNK_SIZE, len(rows))
+            job.created += result.created
+            job.skipped += result.skipped
+            job.add_errors(result.errors)
+            job.save(update_fields=['processed', 'created', 'skipped', 'errors'])
+
+    os.remove(job.source_file)
+    job.source_file = ''
+
+
+@register(ImportJob, 'students')
+@register(ImportJob, 'teachers')
+def import_accounts(job):
+    from accounts.importers import ImportResult, import_student_rows, import_teacher_rows, read_rows
+
+    import_rows = import_student_rows if job.kind == 'students' else import_teacher_rows
+    with open(job.source_file, 'rb') as f:
+        rows = read_rows(File(f, name=job.source_name))
+
+    def import_chunk(chunk, start):
+        result = ImportResult()
+        import_rows(chunk, job.created_by, result)
+        return result
+
+    _import_chunks(job, rows, import_chunk)
+
+
+@register(ImportJob, 'grades')
+def import_grades(job):
+    """课程+班级成绩表；params: course_id、school_class_id"""
+    from grades.importers import FIRST_DATA_ROW, import_grade_rows, read_grade_sheet
+
+    course_id, class_id = job.params['course_id'], job.params['school_class_id']
+    with open(job.source_file, 'rb') as f:
+        rows = read_grade_sheet(File(f, name=job.source_name))
+    _import_chunks(job, rows, lambda chunk, start: import_grade_rows(
+        chunk, class_id, course_id, first_row=FIRST_DATA_ROW + start
+    ))
+
+
+@register(ImportJob, 'colleges')
+@register(ImportJob, 'majors')
+@register(ImportJob, 'classes')
+def import_organization_frame(job):
+    """学院/专业/班级 Excel；错误行号为文件中的数据行号（从1开始）"""
+    from accounts.importers import ImportResult
+    from organization.importers import OrganizationImporter, log_import, read_frame
+
+    run = {
+        'colleges': OrganizationImporter.import_colleges,
+        'majors': OrganizationImporter.import_majors,
+        'classes': OrganizationImporter.import_classes,
+    }[job.kind]
+    with open(job.source_file, 'rb') as f:
+        df = read_frame(File(f, name=job.source_name))
+
+    def import_chunk(chunk, start):
+        result = ImportResult()
+        records, errors = run(OrganizationImporter(), chunk)
+        if errors:
+            result.skipped = len(chunk)
+            result.errors = [dict(error, row=error['row'] + start) for error in errors]
+        else:
+            result.created = len(records)
+            log_import(job.created_by_id, job.kind, records)
+        return result
+
+    _import_chunks(job, df, lambda chunk, start: import_chunk(chunk.reset_index(drop=True), start))
+
+
+@register(ImportJob, 'organization')
+def import_organization_lines(job):
+    """POST /api/org/import 粘贴的文本：params.type 为 colleges（每行一个学院名称）或 departments（专业,学院）"""
+    from organization.importers import OrganizationImporter
+
+    importer = OrganizationImporter()
+    run = importer.import_college_names if job.params['type'] == 'colleges' else importer.import_major_lines
+    with open(job.source_file, encoding='utf-8') as f:
+        lines = f.read().strip().split('\n')
+    _import_chunks(job, lines, lambda chunk, start: run(chunk))
+
+
+def _export_progress(job):
+    def progress(count):
+        job.processed = count
+        job.save(update_fields=['processed'])
+    return progress
+
+
+@register(ExportJob, 'attendance')
+def export_attendance(job):
+    from attendance_app.views import AttendanceViewSet
+
+    exporter, file_type, filename = _view(AttendanceViewSet, job).build_exporter(_export_progress(job))
+    path = result_path(job, f'.{file_type}')
+    if file_type == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for chunk in exporter.iter_csv():
+                f.write(chunk)
+    else:
+        with open(path, 'wb') as f:
+            exporter.write_xlsx(f)
+    job.result_file, job.result_name = path, filename
+
+
+@register(ExportJob, 'grades')
+def export_grades(job):
+    """与 GET /api/grades/export/ 相同的 JSON 数组，按 ID 分块序列化后逐块写入"""
+    from grades.serializers import GradeSerializer
+    from grades.views import GradeViewSet
+
+    queryset = _view(GradeViewSet, job).get_queryset().order_by('id')
+    path = result_path(job, '.json')
+    last_id, count = None, 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        while True:
+            chunk = list((queryset if last_id is None else queryset.filter(id__gt=last_id))[:1000])
+            if not chunk:
+                break
+            for item in GradeSerializer(chunk, many=True).data:
+                f.write((',' if count else '') + json.dumps(item, ensure_ascii=False, cls=DjangoJSONEncoder))
+                count += 1
+            last_id = chunk[-1].id
+            job.processed = count
+            job.save(update_fields=['processed'])
+        f.write(']')
+    job.total = count
+    job.result_file, job.result_name = path, 'grades.json'
+
+
+@register(BatchJob, 'schedule_clone')
+def clone_schedules(job):
+    """POST /api/courses/schedules/clone/ 的后台执行；冲突样例写入 errors，未映射的班级写入 result"""
+    from courses.services import ScheduleCloneService
+
+    params = job.params
+    ScheduleCloneService(job).run(
+        params.get('school_classes'), params.get('college'),
+        params['source_weeks'], params['target_weeks'],
+        params.get('remap_cohort', False), job.created_by,
+    )
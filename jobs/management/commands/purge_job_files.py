@@ -0,0 +1,16 @@
+"""
+清理后台任务文件（建议每天由 cron 执行一次）
+使用方法: python manage.py purge_job_files
+删除超过 JOB_RESULT_RETENTION_HOURS 的导出结果，以及已结束导入任务残留的暂存上传文件
+"""
+from django.core.management.base import BaseCommand
+
+from jobs.runner import purge_expired_files
+
+
+class Command(BaseCommand):
+    help = '删除过期的导出结果文件与残留的导入暂存文件'
+
+    def handle(self, *args, **options):
+        removed = purge_expired_files()
+        self.stdout.write(self.style.SUCCESS(f'✓ 共删除 {removed} 个文件'))
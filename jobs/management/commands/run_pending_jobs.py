@@ -0,0 +1,34 @@
+"""
+继续执行中断的后台任务（进程重启后运行一次）
+使用方法: python manage.py run_pending_jobs
+导入任务从最后一个检查点继续；导出任务从头重新导出；
+批量任务（课表复制）重新执行，已逐块提交的排课按冲突跳过
+执行前先清理过期的导出结果与残留的暂存文件
+"""
+from django.core.management.base import BaseCommand
+
+from jobs.models import BatchJob, ExportJob, ImportJob
+from jobs.runner import job_runner, purge_expired_files
+
+
+class Command(BaseCommand):
+    help = '在当前进程中依次执行排队中或被中断的导入/导出/批量任务'
+
+    def handle(self, *args, **options):
+        removed = purge_expired_files()
+        if removed:
+            self.stdout.write(f'删除过期任务文件 {removed} 个')
+
+        # 状态为 running 的任务说明执行它的进程已退出，重置为排队中
+        ImportJob.objects.filter(status='running').update(status='pending')
+        ExportJob.objects.filter(status='running').update(status='pending', processed=0)
+        BatchJob.objects.filter(status='running').update(status='pending', processed=0)
+
+        count = 0
+        for model in (ImportJob, ExportJob, BatchJob):
+            for pk in model.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True):
+                job_runner.run(model, pk)
+                job = model.objects.get(pk=pk)
+                self.stdout.write(f'{job.kind} {pk}: {job.get_status_display()} {job.message}')
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'✓ 共执行 {count} 个任务'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:01
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=32, verbose_name='任务类型')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '执行中'), ('succeeded', '已完成'), ('failed', '失败')], default='pending', max_length=16, verbose_name='状态')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='参数')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='总行数')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='已处理行数')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='错误')),
+                ('message', models.TextField(blank=True, verbose_name='说明')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('created', models.PositiveIntegerField(default=0, verbose_name='新建数')),
+                ('skipped', models.PositiveIntegerField(default=0, verbose_name='跳过数')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='结果')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+            ],
+            options={
+                'verbose_name': '批量任务',
+                'verbose_name_plural': '批量任务',
+                'ordering': ['-created_at'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['created_by', '-created_at'], name='batch_job_user_idx')],
+            },
+        ),
+    ]
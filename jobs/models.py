@@ -0,0 +1,82 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+JOB_STATUS_CHOICES = [
+    ('pending', '排队中'),
+    ('running', '执行中'),
+    ('succeeded', '已完成'),
+    ('failed', '失败'),
+]
+
+MAX_JOB_ERRORS = 1000  # 只保留前 N 条逐行错误，避免错误列表无限增长
+
+
+class BackgroundJob(models.Model):
+    """
+    后台任务公共字段
+    processed 为已提交的检查点（已处理行数），进程重启后从该位置继续
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=32, verbose_name='任务类型')
+    status = models.CharField(max_length=16, choices=JOB_STATUS_CHOICES, default='pending', verbose_name='状态')
+    params = models.JSONField(default=dict, blank=True, verbose_name='参数')
+    total = models.PositiveIntegerField(default=0, verbose_name='总行数')
+    processed = models.PositiveIntegerField(default=0, verbose_name='已处理行数')
+    errors = models.JSONField(default=list, blank=True, verbose_name='错误')
+    message = models.TextField(blank=True, verbose_name='说明')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='创建人')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        abstract = True
+        ordering = ['-created_at']
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def add_errors(self, errors):
+        room = MAX_JOB_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+
+class ImportJob(BackgroundJob):
+    """导入任务：上传文件先暂存到磁盘，由后台线程分块导入"""
+    source_file = models.CharField(max_length=255, verbose_name='暂存文件')
+    source_name = models.CharField(max_length=255, verbose_name='原始文件名')
+    created = models.PositiveIntegerField(default=0, verbose_name='新建数')
+    skipped = models.PositiveIntegerField(default=0, verbose_name='跳过数')
+
+    class Meta(BackgroundJob.Meta):
+        verbose_name = '导入任务'
+        verbose_name_plural = '导入任务'
+        indexes = [models.Index(fields=['created_by', '-created_at'], name='import_job_user_idx')]
+
+
+class ExportJob(BackgroundJob):
+    """导出任务：结果写入磁盘文件，完成后通过 /api/jobs/<id>/download/ 下载"""
+    result_file = models.CharField(max_length=255, blank=True, verbose_name='结果文件')
+    result_name = models.CharField(max_length=255, blank=True, verbose_name='下载文件名')
+
+    class Meta(BackgroundJob.Meta):
+        verbose_name = '导出任务'
+        verbose_name_plural = '导出任务'
+        indexes = [models.Index(fields=['created_by', '-created_at'], name='export_job_user_idx')]
+
+
+class BatchJob(BackgroundJob):
+    """批量操作任务：不读写文件，直接在数据库中执行（如复制课表）；created / skipped 为新建数与跳过数"""
+    created = models.PositiveIntegerField(default=0, verbose_name='新建数')
+    skipped = models.PositiveIntegerField(default=0, verbose_name='跳过数')
+    result = models.JSONField(default=dict, blank=True, verbose_name='结果')
+
+    class Meta(BackgroundJob.Meta):
+        verbose_name = '批量任务'
+        verbose_name_plural = '批量任务'
+        indexes = [models.Index(fields=['created_by', '-created_at'], name='batch_job_user_idx')]
@@ -0,0 +1,179 @@
+"""
+进程内后台任务执行器
+
+任务记录保存在数据库（ImportJob / ExportJob / BatchJob），执行由本进程的线程池完成，不依赖外部消息队列；
+导入任务每处理一块就在同一事务中提交检查点，进程重启后可用 manage.py run_pending_jobs 从检查点继续
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import BatchJob, ExportJob, ImportJob
+
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS: Dict[Tuple[type, str], Callable] = {}
+
+
+def register(model, kind: str):
+    """注册任务处理函数：handler(job)，负责更新 job 的进度字段并调用 job.save()"""
+    def decorator(func):
+        JOB_HANDLERS[(model, kind)] = func
+        return func
+    return decorator
+
+
+def job_storage_dir() -> Path:
+    path = Path(getattr(settings, 'JOB_STORAGE_DIR', Path(settings.BASE_DIR) / 'job_files'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def stage_upload(uploaded) -> str:
+    """把上传文件分块写到暂存目录，返回文件路径"""
+    suffix = os.path.splitext(uploaded.name)[1].lower()
+    path = job_storage_dir() / f'upload_{uuid.uuid4().hex}{suffix}'
+    with open(path, 'wb') as f:
+        for chunk in uploaded.chunks():
+            f.write(chunk)
+    return str(path)
+
+
+def result_path(job, suffix: str) -> str:
+    return str(job_storage_dir() / f'export_{job.pk.hex}{suffix}')
+
+
+def remove_file(path: str) -> None:
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def discard_job_files(job) -> None:
+    """任务失败后删除暂存的上传文件与未写完的导出文件"""
+    if isinstance(job, ImportJob):
+        remove_file(job.source_file)
+        job.source_file = ''
+    elif isinstance(job, ExportJob):
+        remove_file(job.result_file)
+        job.result_file = ''
+
+
+def purge_expired_files(now=None) -> int:
+    """
+    删除超过 JOB_RESULT_RETENTION_HOURS 的导出结果文件，以及已结束导入任务残留的暂存文件；
+    返回删除的文件数
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(hours=getattr(settings, 'JOB_RESULT_RETENTION_HOURS', 24))
+    removed = 0
+    for model, field, jobs in (
+        (ExportJob, 'result_file', ExportJob.objects.filter(finished_at__lt=cutoff)),
+        (ImportJob, 'source_file', ImportJob.objects.filter(status__in=('succeeded', 'failed'))),
+    ):
+        for pk, path in jobs.exclude(**{field: ''}).values_list('pk', field):
+            if os.path.exists(path):
+                remove_file(path)
+                removed += 1
+            model.objects.filter(pk=pk).update(**{field: ''})
+    return removed
+
+
+class JobRunner:
+    """线程池在第一次提交时创建；线程数由 settings.JOB_WORKERS 配置"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'JOB_WORKERS', 2), thread_name_prefix='job'
+                )
+            return self.executor
+
+    def submit(self, job):
+        """事务提交后再入队，保证工作线程能读到任务记录"""
+        model, pk = type(job), job.pk
+        transaction.on_commit(lambda: self._executor().submit(self.run, model, pk))
+
+    def run(self, model, pk):
+        close_old_connections()
+        try:
+            # 条件更新抢占任务，避免同一任务被重复执行
+            claimed = model.objects.filter(pk=pk, status='pending').update(
+                status='running', started_at=timezone.now()
+            )
+            if not claimed:
+                return
+            job = model.objects.get(pk=pk)
+            handler = JOB_HANDLERS.get((model, job.kind))
+            try:
+                if handler is None:
+                    raise ValueError(f'未知的任务类型: {job.kind}')
+                handler(job)
+                job.status = 'succeeded'
+            except Exception as e:
+                logger.exception('后台任务 %s 执行失败', pk)
+                job.status = 'failed'
+                job.message = str(e)
+                discard_job_files(job)
+            job.finished_at = timezone.now()
+            job.save()
+        finally:
+            close_old_connections()
+
+
+job_runner = JobRunner()
+
+
+def enqueue_import(request, kind: str, params: Optional[dict] = None, uploaded=None) -> ImportJob:
+    """
+    暂存上传文件并创建导入任务
+    uploaded 默认为 request.FILES['file']；params 为处理函数需要的附加参数，须可 JSON 序列化
+    """
+    uploaded = uploaded or request.FILES['file']
+    job = ImportJob.objects.create(
+        kind=kind, created_by=request.user, params=params or {},
+        source_file=stage_upload(uploaded), source_name=uploaded.name,
+    )
+    job_runner.submit(job)
+    return job
+
+
+def enqueue_export(request, kind: str) -> ExportJob:
+    """按当前请求的查询参数创建导出任务"""
+    params = {k: v for k, v in request.query_params.items() if k != 'background'}
+    job = ExportJob.objects.create(kind=kind, created_by=request.user, params=params)
+    job_runner.submit(job)
+    return job
+
+
+def enqueue_batch(request, kind: str, params: dict) -> BatchJob:
+    """创建批量操作任务；params 须可 JSON 序列化"""
+    job = BatchJob.objects.create(kind=kind, created_by=request.user, params=params)
+    job_runner.submit(job)
+    return job
+
+
+def job_accepted(job) -> Response:
+    return Response({
+        'job_id': str(job.pk),
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.pk}/',
+    }, status=202)
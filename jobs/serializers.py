@@ -0,0 +1,51 @@
+from rest_framework import serializers
+
+from .models import BatchJob, ExportJob, ImportJob
+
+
+class JobSerializer(serializers.Serializer):
+    """导入/导出/批量操作任务共用的状态视图"""
+    id = serializers.UUIDField(read_only=True)
+    type = serializers.SerializerMethodField()
+    kind = serializers.CharField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    total = serializers.IntegerField(read_only=True)
+    processed = serializers.IntegerField(read_only=True)
+    progress = serializers.SerializerMethodField()
+    errors = serializers.JSONField(read_only=True)
+    message = serializers.CharField(read_only=True)
+    created = serializers.IntegerField(read_only=True, required=False)
+    skipped = serializers.IntegerField(read_only=True, required=False)
+    result = serializers.JSONField(read_only=True, required=False)
+    download_url = serializers.SerializerMethodField()
+    created_at = serializers.DateTimeField(read_only=True)
+    started_at = serializers.DateTimeField(read_only=True)
+    finished_at = serializers.DateTimeField(read_only=True)
+
+    def get_type(self, obj):
+        if isinstance(obj, BatchJob):
+            return 'batch'
+        return 'import' if isinstance(obj, ImportJob) else 'export'
+
+    def get_progress(self, obj):
+        """百分比；导出任务事先不知道总行数，完成前为 null"""
+        if obj.status == 'succeeded':
+            return 100
+        if obj.total:
+            return round(obj.processed * 100 / obj.total, 1)
+        return None
+
+    def get_download_url(self, obj):
+        if isinstance(obj, ExportJob) and obj.status == 'succeeded' and obj.result_file:
+            return f'/api/jobs/{obj.pk}/download/'
+        return None
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if isinstance(instance, ExportJob):
+            data.pop('created', None)
+            data.pop('skipped', None)
+        if not isinstance(instance, BatchJob):
+            data.pop('result', None)
+        return data
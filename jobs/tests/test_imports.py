@@ -0,0 +1,81 @@
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import StudentProfile, UserProfile
+from courses.models import Course
+from grades.models import Grade
+from jobs.models import ImportJob
+from jobs.runner import job_runner
+from organization.models import Class, College, Major
+
+
+class BackgroundImportTests(TestCase):
+    """成绩与组织架构导入在 background=true 时转为后台任务，按块导入并记录检查点"""
+
+    def setUp(self):
+        cache.clear()
+        storage = tempfile.TemporaryDirectory()
+        self.addCleanup(storage.cleanup)
+        settings_override = override_settings(JOB_STORAGE_DIR=storage.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='x'))
+
+    def _run(self, response):
+        self.assertEqual(response.status_code, 202, getattr(response, 'data', None))
+        job_runner.run(ImportJob, response.data['job_id'])
+        return ImportJob.objects.get(pk=response.data['job_id'])
+
+    def test_grade_sheet_import(self):
+        import pandas as pd
+
+        college = College.objects.create(code='01', name='信息学院')
+        major = Major.objects.create(code='01', name='软件', college=college)
+        school_class = Class.objects.create(major=major, enrollment_year=2024, class_number=1)
+        course = Course.objects.create(subject_id='S1', name='数学', course_type='required', department=major)
+        profile = UserProfile.objects.create(user=User.objects.create_user('S0', password='x'), role='student')
+        student = StudentProfile.objects.create(user_profile=profile, student_id='20240001', school_class=school_class)
+
+        output = io.BytesIO()
+        pd.DataFrame([
+            ['数学', school_class.name, '', ''], ['学号', '姓名', '平时分', '期末分'],
+            ['20240001', '学生甲', 90, 80], ['20249999', '查无此人', 70, 70],
+        ]).to_excel(output, index=False, header=False)
+        data = {'course_id': course.id, 'class_id': school_class.class_id}
+        r = self.client.post('/api/grades/grades/class_grades_import/', dict(
+            data, file=SimpleUploadedFile('grades.xlsx', output.getvalue())
+        ), format='multipart')
+        self.assertEqual((r.status_code, r.data['saved_count'], len(r.data['errors'])), (200, 1, 1))
+
+        job = self._run(self.client.post('/api/grades/grades/class_grades_import/', dict(
+            data, file=SimpleUploadedFile('grades.xlsx', output.getvalue()), background='true'
+        ), format='multipart'))
+
+        self.assertEqual((job.status, job.total, job.processed, job.created), ('succeeded', 2, 2, 1))
+        self.assertEqual(job.errors, [{'row': 4, 'student_number': '20249999', 'error': '学生不存在或不在该班级'}])
+        grade = Grade.objects.get(student=student, course=course)
+        self.assertEqual((grade.regular_score, grade.final_score), (90, 80))
+
+    def test_college_excel_import(self):
+        upload = SimpleUploadedFile('colleges.csv', '学院代码,学院名称\n11,信息学院\n,外语学院\n'.encode('utf-8'))
+        job = self._run(self.client.post('/api/org/colleges/import_excel/', {
+            'file': upload, 'background': 'true',
+        }, format='multipart'))
+        self.assertEqual((job.status, job.created, job.source_file), ('succeeded', 2, ''))
+        self.assertEqual(set(College.objects.values_list('name', flat=True)), {'信息学院', '外语学院'})
+
+    def test_pasted_lines_import(self):
+        College.objects.create(code='01', name='信息学院')
+        job = self._run(self.client.post('/api/org/import', {
+            'type': 'departments', 'csv': '软件工程,信息学院\n英语,外语学院', 'background': 'true',
+        }, format='json'))
+        self.assertEqual((job.status, job.created), ('succeeded', 1))
+        self.assertEqual(job.errors, ['学院不存在: 外语学院'])
+        self.assertTrue(Major.objects.filter(name='软件工程').exists())
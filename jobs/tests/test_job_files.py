@@ -0,0 +1,56 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from jobs.models import ExportJob, ImportJob
+from jobs.runner import job_runner, purge_expired_files, result_path
+
+
+class JobFileRetentionTests(TestCase):
+    """失败的导入不留下暂存文件；导出结果超过保留时长后删除，下载返回 410"""
+
+    def setUp(self):
+        self.storage = tempfile.TemporaryDirectory()
+        self.addCleanup(self.storage.cleanup)
+        settings_override = override_settings(JOB_STORAGE_DIR=self.storage.name, JOB_RESULT_RETENTION_HOURS=24)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_superuser('admin', password='x')
+
+    def _file(self, name, content=b'x'):
+        path = os.path.join(self.storage.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_failed_import_removes_staged_upload(self):
+        path = self._file('upload_bad.csv', b'\xff\xfe not a table')
+        job = ImportJob.objects.create(kind='unknown', created_by=self.user, source_file=path, source_name='bad.csv')
+        job_runner.run(ImportJob, job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.source_file), ('failed', ''))
+        self.assertFalse(os.path.exists(path))
+
+    def test_expired_export_is_purged(self):
+        old = ExportJob.objects.create(kind='grades', created_by=self.user, status='succeeded', result_name='grades.json')
+        recent = ExportJob.objects.create(kind='grades', created_by=self.user, status='succeeded', result_name='grades.json')
+        for job, age in ((old, 25), (recent, 1)):
+            job.result_file = self._file(os.path.basename(result_path(job, '.json')), b'[]')
+            job.finished_at = timezone.now() - timedelta(hours=age)
+            job.save()
+
+        self.assertEqual(purge_expired_files(), 1)
+        old.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual(old.result_file, '')
+        self.assertTrue(os.path.exists(recent.result_file))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(f'/api/jobs/{old.pk}/download/').status_code, 410)
+        self.assertEqual(client.get(f'/api/jobs/{recent.pk}/download/').status_code, 200)
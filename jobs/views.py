@@ -0,0 +1,61 @@
+import os
+
+from django.http import FileResponse
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import BatchJob, ExportJob, ImportJob
+from .serializers import JobSerializer
+
+
+JOB_MODELS = (ImportJob, ExportJob, BatchJob)
+
+
+class JobViewSet(viewsets.ViewSet):
+    """
+    后台导入/导出/批量操作任务
+    GET /api/jobs/ 最近的任务；GET /api/jobs/<id>/ 进度与错误；GET /api/jobs/<id>/download/ 下载导出结果
+    """
+    permission_classes = [IsAuthenticated]
+    RECENT_LIMIT = 20
+
+    def _visible(self, model):
+        queryset = model.objects.all()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    def _get_job(self, pk):
+        for model in JOB_MODELS:
+            try:
+                job = self._visible(model).filter(pk=pk).first()
+            except Exception:
+                # pk 不是合法的 UUID
+                return None
+            if job:
+                return job
+        return None
+
+    def list(self, request):
+        jobs = [job for model in JOB_MODELS for job in self._visible(model)[:self.RECENT_LIMIT]]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return Response(JobSerializer(jobs[:self.RECENT_LIMIT], many=True).data)
+
+    def retrieve(self, request, pk=None):
+        job = self._get_job(pk)
+        if not job:
+            return Response({'detail': '任务不存在'}, status=404)
+        return Response(JobSerializer(job).data)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self._get_job(pk)
+        if not isinstance(job, ExportJob):
+            return Response({'detail': '任务不存在'}, status=404)
+        if job.status != 'succeeded':
+            return Response({'detail': '导出结果尚未生成'}, status=409)
+        if not job.result_file or not os.path.exists(job.result_file):
+            return Response({'detail': '导出结果已过期，请重新导出'}, status=410)
+        return FileResponse(open(job.result_file, 'rb'), as_attachment=True, filename=job.result_name)
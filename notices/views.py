@@ -3,6 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Notice
 from .serializers import NoticeSerializer
 from accounts.permissions import IsAdminOnlyOrReadOnly
+from accounts.principal import principal_of
 
 
 class NoticeViewSet(viewsets.ModelViewSet):
@@ -14,16 +15,16 @@ class NoticeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         from django.db.models import Q
         user = self.request.user
+        principal = principal_of(self.request)
         
         # 超级管理员可以看到所有公告（即使没有profile）
-        if user.is_superuser:
+        if principal.is_superuser:
             return Notice.objects.all().order_by('-created_at')
         
-        profile = getattr(user, 'profile', None)
-        if not profile:
+        if not principal.role:
             return Notice.objects.none()
         
-        role = profile.role
+        role = principal.role
         params = self.request.query_params
         mine = params.get('mine')
         
@@ -0,0 +1,187 @@
+"""
+操作日志异步批量写入
+
+record_operation() 在当前事务提交后把日志放入进程内有界队列（事务回滚则不记录），
+后台线程每隔 AUDIT_LOG_FLUSH_INTERVAL 秒（积压到 AUDIT_LOG_BATCH_SIZE 条时立即）把队列中的日志合并成 bulk_create 写入；
+队列满时退回到在当前请求中同步写入，不丢日志
+
+注意：
+- created_at 为实际写入时间，通常比操作晚不到一个刷新间隔；排队超过 AUDIT_LOG_LATE_SECONDS 的计为 late
+- 队列在进程内存中，进程异常退出时尚未落库的日志会丢失（正常退出时会尽量写完）
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import OperationLog
+
+
+logger = logging.getLogger(__name__)
+
+
+def audit_setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def client_ip(request) -> Optional[str]:
+    """获取客户端IP地址"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+class AuditLogQueue:
+    """
+    操作日志写入队列（每个进程一个）
+    put() 只入队；后台线程每隔 flush_interval 批量写入，队列积压到 batch_size 条时由 put() 提前唤醒，
+    整批失败时逐条重试，只丢弃本身无法写入的日志
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, late_seconds: Optional[float] = None):
+        self.maxsize = maxsize or audit_setting('AUDIT_LOG_QUEUE_SIZE', 10000)
+        self.batch_size = batch_size or audit_setting('AUDIT_LOG_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or audit_setting('AUDIT_LOG_FLUSH_INTERVAL', 1.0)
+        self.late_seconds = late_seconds or audit_setting('AUDIT_LOG_LATE_SECONDS', 5.0)
+        self.queue: queue.Queue = queue.Queue(maxsize=self.maxsize)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = {
+            'queued': 0, 'sync_writes': 0, 'flushed': 0, 'flush_batches': 0, 'flush_errors': 0,
+            'dropped': 0, 'late': 0, 'max_depth': 0, 'last_flush_ms': 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._worker, name='operation-log-writer', daemon=True)
+            self.thread.start()
+
+    def put(self, entry: OperationLog) -> str:
+        """返回 queued / sync / dropped"""
+        try:
+            self.queue.put_nowait((time.monotonic(), entry))
+        except queue.Full:
+            return self._write_sync(entry)
+        depth = self.queue.qsize()
+        with self.lock:
+            self.metrics['queued'] += 1
+            self.metrics['max_depth'] = max(self.metrics['max_depth'], depth)
+        self._ensure_worker()
+        if depth >= self.batch_size:
+            self.wakeup.set()
+        return 'queued'
+
+    def _write_sync(self, entry: OperationLog) -> str:
+        try:
+            entry.save()
+        except Exception:
+            logger.exception('操作日志同步写入失败')
+            with self.lock:
+                self.metrics['dropped'] += 1
+            return 'dropped'
+        with self.lock:
+            self.metrics['sync_writes'] += 1
+        return 'sync'
+
+    def _drain(self) -> List[tuple]:
+        items = []
+        while len(items) < self.batch_size:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write_batch(self, entries: List[OperationLog]) -> int:
+        """返回写入条数；整批失败时逐条重试"""
+        try:
+            OperationLog.objects.bulk_create(entries)
+            return len(entries)
+        except Exception:
+            logger.exception('操作日志批量写入失败（%s 条），改为逐条写入', len(entries))
+            with self.lock:
+                self.metrics['flush_errors'] += 1
+        written = 0
+        for entry in entries:
+            try:
+                entry.save()
+                written += 1
+            except Exception:
+                logger.exception('操作日志写入失败: %s-%s', entry.table_name, entry.record_id)
+        return written
+
+    def flush(self) -> int:
+        """把队列中当前的日志写入数据库，返回写入条数"""
+        total = 0
+        while True:
+            items = self._drain()
+            if not items:
+                return total
+            started = time.monotonic()
+            close_old_connections()
+            written = self._write_batch([entry for _, entry in items])
+            total += written
+            with self.lock:
+                self.metrics['flushed'] += written
+                self.metrics['dropped'] += len(items) - written
+                self.metrics['flush_batches'] += 1
+                self.metrics['late'] += sum(1 for enqueued, _ in items if started - enqueued > self.late_seconds)
+                self.metrics['last_flush_ms'] = round((time.monotonic() - started) * 1000, 2)
+
+    def _worker(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('操作日志写入线程异常')
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.metrics, depth=self.queue.qsize(), capacity=self.maxsize,
+                        worker_alive=bool(self.thread and self.thread.is_alive()))
+
+
+audit_log = AuditLogQueue()
+atexit.register(audit_log.flush)
+
+
+def build_operation(user_id, operation_type: str, table_name: str, record_id, old_data=None, new_data=None,
+                    request=None) -> OperationLog:
+    return OperationLog(
+        user_id=user_id or 0,
+        operation_type=operation_type,
+        table_name=table_name,
+        record_id=str(record_id),
+        old_data=old_data or {},
+        new_data=new_data or {},
+        ip_address=client_ip(request) if request is not None else None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '') if request is not None else '',
+    )
+
+
+def record_operations(entries: Iterable[OperationLog]) -> None:
+    """事务提交后把日志放入写入队列"""
+    entries = list(entries)
+
+    def enqueue():
+        for entry in entries:
+            audit_log.put(entry)
+
+    if entries:
+        transaction.on_commit(enqueue)
+
+
+def record_operation(user_id, operation_type: str, table_name: str, record_id, old_data=None, new_data=None,
+                     request=None) -> None:
+    """记录一条操作日志（异步写入）"""
+    record_operations([build_operation(user_id, operation_type, table_name, record_id, old_data, new_data, request)])
@@ -0,0 +1,316 @@
+"""
+组织架构批量导入
+
+已有学院、专业、班级的名称与代码一次读入内存，新代码在内存中顺序分配；
+Excel/CSV 文件用 pandas 整列校验，全部通过后按模型 bulk_create，整个导入在一个事务中完成，
+不再逐行查询代码、名称是否存在，也不再逐行走序列化器
+"""
+from itertools import chain
+from typing import Dict, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.importers import ImportResult
+from accounts.principal import bump_principal_version
+from .audit import build_operation, record_operations
+from .models import Class, College, CollegeStatus, DurationType, Major
+from .services import bump_organization_version
+
+
+class CodeExhausted(Exception):
+    """指定位数的代码已全部占用"""
+
+
+class CodeAllocator:
+    """
+    按位数分配数字代码：从已有的最大编号之后顺延，跳过已占用的代码，顺延用完后再回头使用空缺编号
+    代码字段全局唯一（包括已软删除的记录），因此占用集合取全部记录
+    """
+
+    def __init__(self, model, width: int):
+        self.width = width
+        self.used = set(model.objects.values_list('code', flat=True))
+        nums = [int(code) for code in self.used if code and code.isdigit() and len(code) == width]
+        self.next_num = max(nums) + 1 if nums else 1
+
+    def reserve(self, code: str) -> None:
+        self.used.add(code)
+
+    def allocate(self) -> str:
+        for num in chain(range(self.next_num, 10 ** self.width), range(1, self.next_num)):
+            code = f'{num:0{self.width}d}'
+            if code not in self.used:
+                self.used.add(code)
+                self.next_num = num + 1
+                return code
+        raise CodeExhausted(f'{self.width}位代码已全部占用')
+
+
+def read_frame(f):
+    """读取上传的 Excel/CSV；全部按字符串读取，保留代码的前导零"""
+    import pandas as pd
+
+    if f.name.lower().endswith(('xlsx', 'xls')):
+        return pd.read_excel(f, dtype=str)
+    return pd.read_csv(f, dtype=str)
+
+
+def _text(df, column):
+    """取一列并规整为去掉首尾空白的字符串，缺失的列或单元格为空串"""
+    import pandas as pd
+
+    if column not in df.columns:
+        return pd.Series([''] * len(df), index=df.index, dtype=object)
+    return df[column].fillna('').astype(str).str.strip()
+
+
+def _number(column):
+    """数字列：Excel 中的整数可能读成 '1.0'，无法解析的为 NaN"""
+    import pandas as pd
+
+    return pd.to_numeric(column.where(column != ''), errors='coerce')
+
+
+class RowErrors:
+    """按行收集校验错误，输出格式与原序列化器逐行校验一致：[{'row': 行号(从1开始), 'errors': {字段: 信息}}]"""
+
+    def __init__(self):
+        self.by_row: Dict[int, Dict[str, str]] = {}
+
+    def add(self, mask, field: str, message: str) -> None:
+        """mask 为布尔 Series，同一字段只保留第一条错误"""
+        for position in mask.to_numpy().nonzero()[0]:
+            self.by_row.setdefault(int(position), {}).setdefault(field, message)
+
+    def as_list(self) -> List[dict]:
+        return [{'row': position + 1, 'errors': errors} for position, errors in sorted(self.by_row.items())]
+
+
+def log_import(user_id, table_name: str, records: List[dict], request=None) -> None:
+    """导入的记录整批写操作日志；records 中须包含 id，后台导入任务没有 request"""
+    record_operations(
+        build_operation(user_id, 'import', table_name, record['id'], {}, record, request)
+        for record in records
+    )
+
+
+def _organization_changed() -> None:
+    # bulk_create 不触发信号，手动使组织架构树与身份缓存失效；导入在事务中进行，提交后才失效
+    bump_organization_version()
+    transaction.on_commit(bump_principal_version)
+
+
+class OrganizationImporter:
+    """
+    组织架构批量导入
+    import_* 方法返回 (写入的记录, 错误列表)；有错误时不写入任何数据，由调用方返回错误
+    """
+
+    def import_colleges(self, df) -> Tuple[List[dict], List[dict]]:
+        """列：学院代码（可空，自动分配2位代码）、学院名称、成立日期（可空）、状态（可空）"""
+        import pandas as pd
+
+        codes = _text(df, '学院代码').str.replace(r'\.0$', '', regex=True)
+        names = _text(df, '学院名称')
+        dates = _text(df, '成立日期')
+        statuses = _text(df, '状态').replace('', CollegeStatus.ACTIVE)
+        parsed_dates = pd.to_datetime(dates.where(dates != ''), errors='coerce', format='mixed')
+
+        allocator = CodeAllocator(College, 2)
+        errors = RowErrors()
+        given = codes != ''
+        errors.add(given & ~codes.str.fullmatch(r'\d{2}'), 'code', '学院代码必须为2位数字')
+        errors.add(given & codes.isin(allocator.used), 'code', '学院代码已存在')
+        errors.add(given & codes.duplicated(keep=False), 'code', '文件中学院代码重复')
+        errors.add(names == '', 'name', '学院名称必填')
+        errors.add(names.str.len() > 100, 'name', '学院名称不能超过100个字符')
+        errors.add((dates != '') & parsed_dates.isna(), 'establishment_date', '日期格式应为 YYYY-MM-DD')
+        errors.add(~statuses.isin(CollegeStatus.values), 'status', '状态应为 active/inactive')
+        if errors.by_row:
+            return [], errors.as_list()
+
+        today = timezone.now().date()
+        for code in codes[given]:
+            allocator.reserve(code)
+        colleges = [
+            College(
+                code=code or allocator.allocate(), name=name, status=college_status,
+                establishment_date=today if pd.isna(established) else established.date(),
+            )
+            for code, name, college_status, established in zip(codes, names, statuses, parsed_dates)
+        ]
+        with transaction.atomic():
+            College.objects.bulk_create(colleges, batch_size=500)
+            records = list(College.objects.filter(code__in=[c.code for c in colleges]).values(
+                'id', 'code', 'name', 'establishment_date', 'status'
+            ))
+            for record in records:
+                # 操作日志为 JSON 字段
+                record['establishment_date'] = record['establishment_date'].isoformat()
+            _organization_changed()
+        return records, []
+
+    def import_majors(self, df) -> Tuple[List[dict], List[dict]]:
+        """列：专业代码（可空，自动分配2位代码）、专业名称、所属学院ID、学制类型（可空，默认3年制）"""
+        codes = _text(df, '专业代码').str.replace(r'\.0$', '', regex=True)
+        names = _text(df, '专业名称')
+        college_ids = _number(_text(df, '所属学院ID'))
+        durations = _text(df, '学制类型').replace('', DurationType.THREE_YEAR)
+
+        allocator = CodeAllocator(Major, 2)
+        valid_colleges = set(College.objects.filter(is_deleted=False).values_list('id', flat=True))
+        errors = RowErrors()
+        given = codes != ''
+        errors.add(~college_ids.isin(valid_colleges), 'college', '所属学院不存在')
+        errors.add(given & ~codes.str.fullmatch(r'\d{2}'), 'code', '专业代码必须为2位数字')
+        errors.add(given & codes.isin(allocator.used), 'code', '专业代码已存在')
+        errors.add(given & codes.duplicated(keep=False), 'code', '文件中专业代码重复')
+        errors.add(names == '', 'name', '专业名称必填')
+        errors.add(names.str.len() > 100, 'name', '专业名称不能超过100个字符')
+        errors.add(~durations.isin(DurationType.values), 'duration_type', '学制类型应为 3_year/5_year/6_year')
+        if errors.by_row:
+            return [], errors.as_list()
+
+        for code in codes[given]:
+            allocator.reserve(code)
+        majors = [
+            Major(code=code or allocator.allocate(), name=name, college_id=int(college_id), duration_type=duration)
+            for code, name, college_id, duration in zip(codes, names, college_ids, durations)
+        ]
+        with transaction.atomic():
+            Major.objects.bulk_create(majors, batch_size=500)
+            records = list(Major.objects.filter(code__in=[m.code for m in majors]).values(
+                'id', 'code', 'name', 'college_id', 'duration_type'
+            ))
+            _organization_changed()
+        return records, []
+
+    def import_classes(self, df) -> Tuple[List[dict], List[dict]]:
+        """列：所属专业ID、入学年份、班级序号（可空，默认1）、班主任工号（可空）"""
+        import pandas as pd
+        from personnel.models import Teacher
+
+        major_ids = _number(_text(df, '所属专业ID'))
+        years = _number(_text(df, '入学年份'))
+        numbers = _number(_text(df, '班级序号').replace('', '1'))
+        head_teachers = _text(df, '班主任工号').str.replace(r'\.0$', '', regex=True)
+
+        majors = {
+            major.id: major
+            for major in Major.objects.filter(is_deleted=False).select_related('college')
+        }
+        teachers = set(Teacher.objects.filter(is_deleted=False).values_list('employee_id', flat=True))
+        # 班主任为一对一关系，已软删除的班级同样占用
+        managed = dict(Class.objects.filter(head_teacher__isnull=False).values_list('head_teacher_id', 'name'))
+        existing = Class.objects.values_list('major_id', 'enrollment_year', 'class_number', 'name', 'class_id')
+        taken_keys = {(major_id, year, number) for major_id, year, number, _, _ in existing}
+        taken_names = {name for *_, name, _ in existing} | {class_id for *_, class_id in existing if class_id}
+
+        # 名称与班级ID由专业、学院代码拼出，逐行生成（纯内存），其余校验整列进行
+        current_year = timezone.now().year
+        classes, keys = [], []
+        for major_id, year, number in zip(major_ids, years, numbers):
+            if major_id in majors and pd.notna(year) and pd.notna(number):
+                school_class = Class(major=majors[int(major_id)], enrollment_year=int(year), class_number=int(number))
+                school_class.class_id = school_class.generate_class_id()
+                school_class.name = school_class.generate_class_name()
+                key = (school_class.major_id, school_class.enrollment_year, school_class.class_number)
+            else:
+                school_class, key = None, None
+            classes.append(school_class)
+            keys.append(key)
+        keys = pd.Series(keys, index=df.index, dtype=object)
+        generated_names = pd.Series([c.name if c else None for c in classes], index=df.index, dtype=object)
+        generated_ids = pd.Series([c.class_id if c else None for c in classes], index=df.index, dtype=object)
+
+        errors = RowErrors()
+        errors.add(~major_ids.isin(list(majors)), 'major', '所属专业不存在')
+        errors.add(years.isna(), 'enrollment_year', '入学年份必填')
+        errors.add((years < 2000) | (years > current_year + 5), 'enrollment_year',
+                   f'入学年份必须在2000-{current_year + 5}之间')
+        errors.add(numbers.isna() | (numbers < 1) | (numbers > 9), 'class_number', '班级ID必须是1-9之间的数字')
+        errors.add(keys.isin(taken_keys), 'class_number', '该专业该年级已存在相同序号的班级')
+        errors.add(keys.notna() & keys.duplicated(keep=False), 'class_number', '文件中班级重复')
+        errors.add(generated_names.isin(taken_names) | generated_ids.isin(taken_names), 'name',
+                   '班级名称或班级ID与已有班级重复')
+        errors.add(generated_names.notna() & generated_names.duplicated(keep=False), 'name', '文件中班级名称重复')
+        errors.add((head_teachers != '') & ~head_teachers.isin(teachers), 'head_teacher', '班主任工号不存在')
+        for position in head_teachers.isin(list(managed)).to_numpy().nonzero()[0]:
+            errors.by_row.setdefault(int(position), {}).setdefault(
+                'head_teacher', f'该教师已是班级 "{managed[head_teachers.iloc[position]]}" 的班主任'
+            )
+        errors.add((head_teachers != '') & head_teachers.duplicated(keep=False), 'head_teacher', '文件中班主任重复')
+        if errors.by_row:
+            return [], errors.as_list()
+
+        for school_class, head_teacher in zip(classes, head_teachers):
+            school_class.head_teacher_id = head_teacher or None
+        with transaction.atomic():
+            Class.objects.bulk_create(classes, batch_size=500)
+            records = list(Class.objects.filter(class_id__in=[c.class_id for c in classes]).values(
+                'id', 'class_id', 'name', 'major_id', 'enrollment_year', 'class_number', 'head_teacher_id'
+            ))
+            _organization_changed()
+        return records, []
+
+    @transaction.atomic
+    def import_college_names(self, lines: List[str]) -> ImportResult:
+        """
+        每行一个学院名称；同名学院已存在时跳过，代码自动分配（2位）
+        """
+        result = ImportResult()
+        names = set(College.objects.filter(is_deleted=False).values_list('name', flat=True))
+        allocator = CodeAllocator(College, 2)
+        colleges = []
+        for line in lines:
+            name = line.strip()
+            if not name:
+                continue
+            if name in names:
+                result.skipped += 1
+                continue
+            names.add(name)
+            colleges.append(College(name=name, code=allocator.allocate()))
+        College.objects.bulk_create(colleges, batch_size=500)
+        result.created = len(colleges)
+        if colleges:
+            _organization_changed()
+        return result
+
+    @transaction.atomic
+    def import_major_lines(self, lines: List[str]) -> ImportResult:
+        """
+        每行“专业名称,学院名称”；学院按名称匹配（同名取ID最小的一个），
+        同一学院下同名专业已存在时跳过，代码自动分配（3位）
+        """
+        result = ImportResult()
+        colleges: Dict[str, int] = {}
+        for college_id, name in College.objects.filter(is_deleted=False).order_by('id').values_list('id', 'name'):
+            colleges.setdefault(name, college_id)
+        existing = set(Major.objects.filter(is_deleted=False).values_list('college_id', 'name'))
+        allocator = CodeAllocator(Major, 3)
+        majors = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split(',')
+            if len(parts) < 2:
+                result.errors.append(f'格式错误: {line}')
+                continue
+            name, college_name = parts[0].strip(), parts[1].strip()
+            college_id = colleges.get(college_name)
+            if college_id is None:
+                result.errors.append(f'学院不存在: {college_name}')
+                continue
+            if (college_id, name) in existing:
+                result.skipped += 1
+                continue
+            existing.add((college_id, name))
+            majors.append(Major(name=name, college_id=college_id, code=allocator.allocate()))
+        Major.objects.bulk_create(majors, batch_size=500)
+        result.created = len(majors)
+        if majors:
+            _organization_changed()
+        return result
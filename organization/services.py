@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import Count, Q
@@ -6,6 +7,103 @@ from typing import List, Dict, Any, Optional
 from .models import College, Major, Class
 
 
+ORG_TREE_CACHE_PREFIX = 'org_tree:'
+ORG_TREE_VERSION_KEY = 'org_tree:version'
+ORG_TREE_CACHE_TIMEOUT = 300  # 秒，多进程部署下各进程缓存的兜底过期时间
+
+
+def bump_organization_version() -> None:
+    """
+    学院、专业、班级或班主任档案变化后调用，使组织架构树缓存失效
+    在事务提交后才递增版本，避免其他进程在提交前用旧数据重建缓存
+    """
+    transaction.on_commit(_incr_organization_version)
+
+
+def _incr_organization_version() -> None:
+    try:
+        cache.incr(ORG_TREE_VERSION_KEY)
+    except ValueError:
+        cache.set(ORG_TREE_VERSION_KEY, 2, None)
+
+
+def build_organization_tree() -> List[Dict[str, Any]]:
+    """
+    构建完整的组织架构树
+    学院、专业、班级（连同班主任）各一次查询，在内存中按外键挂接
+    """
+    majors_by_college: Dict[int, List[Dict[str, Any]]] = {}
+    classes_by_major: Dict[int, List[Dict[str, Any]]] = {}
+
+    classes = Class.objects.filter(is_deleted=False).order_by('-enrollment_year', 'class_number').values(
+        'id', 'name', 'enrollment_year', 'class_number', 'major_id',
+        'head_teacher_id', 'head_teacher__name',
+    )
+    for school_class in classes:
+        classes_by_major.setdefault(school_class['major_id'], []).append({
+            'id': school_class['id'],
+            'name': school_class['name'],
+            'type': 'class',
+            'enrollment_year': school_class['enrollment_year'],
+            'class_number': school_class['class_number'],
+            'head_teacher': {
+                'employee_id': school_class['head_teacher_id'],
+                'name': school_class['head_teacher__name'],
+            } if school_class['head_teacher_id'] else None,
+        })
+
+    # 学制标签沿用模型方法，只取需要的字段
+    for major in Major.objects.filter(is_deleted=False).order_by('code').only(
+        'id', 'code', 'name', 'duration_type', 'college_id'
+    ):
+        majors_by_college.setdefault(major.college_id, []).append({
+            'id': major.id,
+            'code': major.code,
+            'name': major.name,
+            'type': 'major',
+            'duration_type': major.duration_type,
+            'duration_label': major.get_duration_label(),
+            'children': classes_by_major.get(major.id, []),
+        })
+
+    colleges = College.objects.filter(is_deleted=False).order_by('code').values(
+        'id', 'code', 'name', 'status', 'establishment_date'
+    )
+    return [
+        {
+            'id': college['id'],
+            'code': college['code'],
+            'name': college['name'],
+            'type': 'college',
+            'status': college['status'],
+            'establishment_date': college['establishment_date'],
+            'children': majors_by_college.get(college['id'], []),
+        }
+        for college in colleges
+    ]
+
+
+def get_organization_tree(college_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    获取组织架构树（带缓存）
+    缓存整棵树，键中带组织架构版本号；指定学院时从整棵树中筛选
+    """
+    version = cache.get(ORG_TREE_VERSION_KEY, 1)
+    key = f'{ORG_TREE_CACHE_PREFIX}{version}'
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_organization_tree()
+        cache.set(key, tree, ORG_TREE_CACHE_TIMEOUT)
+
+    if college_id:
+        try:
+            college_id = int(college_id)
+        except (TypeError, ValueError):
+            return []
+        return [college for college in tree if college['id'] == college_id]
+    return tree
+
+
 class OrganizationService:
     """组织架构业务逻辑服务类"""
     
@@ -52,113 +150,14 @@ class OrganizationService:
         获取学院树形结构
         包含学院、专业和班级的层级关系
         """
-        colleges = College.objects.filter(is_deleted=False).prefetch_related(
-            'majors', 'majors__classes'
-        ).order_by('code')
-        
-        tree_data = []
-        for college in colleges:
-            college_data = {
-                'id': college.id,
-                'code': college.code,
-                'name': college.name,
-                'type': 'college',
-                'children': []
-            }
-            
-            # 获取该学院下的专业
-            majors = college.majors.filter(is_deleted=False).order_by('code')
-            for major in majors:
-                major_data = {
-                    'id': major.id,
-                    'code': major.code,
-                    'name': major.name,
-                    'type': 'major',
-                    'duration_type': major.duration_type,
-                    'duration_label': major.get_duration_label(),
-                    'children': []
-                }
-                
-                # 获取该专业下的班级
-                classes = major.classes.filter(is_deleted=False).order_by('-enrollment_year', 'class_number')
-                for school_class in classes:
-                    class_data = {
-                        'id': school_class.id,
-                        'name': school_class.name,
-                        'type': 'class',
-                        'enrollment_year': school_class.enrollment_year,
-                        'class_number': school_class.class_number,
-                        'head_teacher': {
-                            'employee_id': school_class.head_teacher.employee_id,
-                            'name': school_class.head_teacher.name
-                        } if school_class.head_teacher else None
-                    }
-                    major_data['children'].append(class_data)
-                
-                college_data['children'].append(major_data)
-            
-            tree_data.append(college_data)
-        
-        return tree_data
+        return get_organization_tree()
     
     def get_organization_tree(self, college_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         获取组织架构树
         可选：指定学院ID获取特定学院的树形结构
         """
-        if college_id:
-            colleges = College.objects.filter(id=college_id, is_deleted=False)
-        else:
-            colleges = College.objects.filter(is_deleted=False)
-        
-        colleges = colleges.prefetch_related(
-            'majors', 'majors__classes'
-        ).order_by('code')
-        
-        tree_data = []
-        for college in colleges:
-            college_data = {
-                'id': college.id,
-                'code': college.code,
-                'name': college.name,
-                'type': 'college',
-                'children': []
-            }
-            
-            # 获取该学院下的专业
-            majors = college.majors.filter(is_deleted=False).order_by('code')
-            for major in majors:
-                major_data = {
-                    'id': major.id,
-                    'code': major.code,
-                    'name': major.name,
-                    'type': 'major',
-                    'duration_type': major.duration_type,
-                    'duration_label': major.get_duration_label(),
-                    'children': []
-                }
-                
-                # 获取该专业下的班级
-                classes = major.classes.filter(is_deleted=False).order_by('-enrollment_year', 'class_number')
-                for school_class in classes:
-                    class_data = {
-                        'id': school_class.id,
-                        'name': school_class.name,
-                        'type': 'class',
-                        'enrollment_year': school_class.enrollment_year,
-                        'class_number': school_class.class_number,
-                        'head_teacher': {
-                            'employee_id': school_class.head_teacher.employee_id,
-                            'name': school_class.head_teacher.name
-                        } if school_class.head_teacher else None
-                    }
-                    major_data['children'].append(class_data)
-                
-                college_data['children'].append(major_data)
-            
-            tree_data.append(college_data)
-        
-        return tree_data
+        return get_organization_tree(college_id)
     
     def get_college_statistics(self, college: College) -> Dict[str, Any]:
         """
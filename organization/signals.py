@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Class, College, Major
+from .services import bump_organization_version
+
+
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+@receiver(post_save, sender=Major)
+@receiver(post_delete, sender=Major)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+# 班主任姓名出现在组织架构树中；personnel 依赖 organization，这里按模型标签引用避免循环导入
+@receiver(post_save, sender='personnel.Teacher')
+@receiver(post_delete, sender='personnel.Teacher')
+def invalidate_organization_tree(sender, raw=False, **kwargs):
+    if raw:
+        return
+    bump_organization_version()
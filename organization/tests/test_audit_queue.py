@@ -0,0 +1,18 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from organization.audit import AuditLogQueue
+from organization.models import OperationLog
+
+
+class AuditLogQueueWakeupTests(SimpleTestCase):
+    """队列积压到 batch_size 条时唤醒写入线程，不必等满 flush_interval"""
+
+    def test_put_wakes_worker_at_batch_size(self):
+        log_queue = AuditLogQueue(batch_size=2, flush_interval=60)
+        with mock.patch.object(log_queue, '_ensure_worker'):
+            self.assertEqual(log_queue.put(OperationLog(table_name='college', record_id=1)), 'queued')
+            self.assertFalse(log_queue.wakeup.is_set())
+            log_queue.put(OperationLog(table_name='college', record_id=2))
+        self.assertTrue(log_queue.wakeup.is_set())
@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from organization.models import College
+from organization.services import ORG_TREE_VERSION_KEY, get_organization_tree
+
+
+class OrganizationTreeCacheTests(TestCase):
+    """组织架构树缓存版本在事务提交后才递增，提交前重建的缓存不会被当成新版本"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_bumped_on_commit(self):
+        self.assertEqual(get_organization_tree(), [])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            College.objects.create(code='01', name='信息学院')
+            self.assertIsNone(cache.get(ORG_TREE_VERSION_KEY))
+        self.assertTrue(callbacks)
+        self.assertEqual(cache.get(ORG_TREE_VERSION_KEY), 2)
+        self.assertEqual([c['name'] for c in get_organization_tree()], ['信息学院'])
@@ -6,6 +6,7 @@ from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
 from django.db import models
 
 from .models import College, Major, Class, SystemDictionary, OperationLog
@@ -21,7 +22,35 @@ from .serializers import (
 from .permissions import (
     CollegePermission, MajorPermission, ClassPermission, OrganizationPermission
 )
+from .audit import audit_log, record_operation
+from .importers import CodeExhausted, OrganizationImporter, log_import, read_frame
 from .services import OrganizationService
+from accounts.principal import SCHOOL_ADMIN_ROLES, principal_of
+from jobs.runner import enqueue_import, job_accepted
+
+
+def _import_excel(request, run, table_name):
+    """
+    学院/专业/班级 Excel 导入的公共流程：解析文件、整批校验写入、整批记录操作日志
+    background=true 时暂存文件并转为后台导入任务（按块校验写入），返回 202 和任务状态地址
+    """
+    f = request.FILES.get('file')
+    if not f:
+        return Response({'error': '请上传文件参数 file'}, status=status.HTTP_400_BAD_REQUEST)
+    if str(request.data.get('background')).lower() == 'true':
+        return job_accepted(enqueue_import(request, table_name))
+    try:
+        df = read_frame(f)
+    except Exception:
+        return Response({'error': '文件解析失败，请使用标准模板'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        records, errors = run(OrganizationImporter(), df)
+    except CodeExhausted as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if errors:
+        return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    log_import(request.user.id, table_name, records, request)
+    return Response({'created': len(records)})
 
 
 class CollegeViewSet(viewsets.ModelViewSet):
@@ -144,39 +173,8 @@ class CollegeViewSet(viewsets.ModelViewSet):
     @transaction.atomic
     @action(detail=False, methods=['post'])
     def import_excel(self, request):
-        """导入学院数据(Excel/CSV)，失败自动回滚"""
-        f = request.FILES.get('file')
-        if not f:
-            return Response({'error': '请上传文件参数 file'}, status=status.HTTP_400_BAD_REQUEST)
-        rows = []
-        try:
-            import pandas as pd
-            df = pd.read_excel(f) if f.name.lower().endswith(('xlsx', 'xls')) else pd.read_csv(f)
-            for _, row in df.iterrows():
-                rows.append({
-                    'code': str(row.get('学院代码')).strip(),
-                    'name': str(row.get('学院名称')).strip(),
-                    'establishment_date': str(row.get('成立日期')).strip(),
-                    'status': str(row.get('状态')).strip() or 'active',
-                })
-        except Exception:
-            return Response({'error': '文件解析失败，请使用标准模板'}, status=status.HTTP_400_BAD_REQUEST)
-        errors = []
-        created = 0
-        for i, data in enumerate(rows, start=1):
-            serializer = CollegeCreateSerializer(data=data)
-            if not serializer.is_valid():
-                errors.append({'row': i, 'errors': serializer.errors})
-                continue
-        if errors:
-            transaction.set_rollback(True)
-            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
-        created_objs = []
-        for data in rows:
-            obj = College.objects.create(**serializer.__class__(data=data).validated_data)
-            created_objs.append(obj)
-            self._log_operation('import', 'colleges', obj.id, {}, CollegeSerializer(obj).data, request)
-        return Response({'created': len(created_objs)})
+        """导入学院数据(Excel/CSV)，整批校验后一次写入，有错误时不导入任何数据"""
+        return _import_excel(request, OrganizationImporter.import_colleges, 'colleges')
     
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
@@ -208,26 +206,8 @@ class CollegeViewSet(viewsets.ModelViewSet):
         return Response(data)
     
     def _log_operation(self, operation_type, table_name, record_id, old_data, new_data, request):
-        """记录操作日志"""
-        OperationLog.objects.create(
-            user_id=request.user.id,
-            operation_type=operation_type,
-            table_name=table_name,
-            record_id=str(record_id),
-            old_data=old_data,
-            new_data=new_data,
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-    
-    def _get_client_ip(self, request):
-        """获取客户端IP地址"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """记录操作日志（事务提交后异步批量写入）"""
+        record_operation(request.user.id, operation_type, table_name, record_id, old_data, new_data, request)
 
 
 class ClassroomViewSet(viewsets.ModelViewSet):
@@ -274,33 +254,24 @@ class MajorViewSet(viewsets.ModelViewSet):
         """根据用户权限过滤查询集"""
         queryset = super().get_queryset()
         
-        if not self.request.user.is_authenticated:
-            return queryset.none()
+        principal = principal_of(self.request)
         
         # 系统管理员（Django超级用户）可以查看所有专业
-        if getattr(self.request.user, 'is_superuser', False):
+        if principal.is_superuser:
             return queryset
 
-        if not hasattr(self.request.user, 'teacher_profile'):
+        # 以下按人事教师档案判断
+        if principal.employee_id is None:
             return queryset.none()
-        
-        teacher = self.request.user.teacher_profile
-        role = getattr(self.request.user.profile, 'role', '')
 
         # 系统管理员可以查看所有专业
-        if role in ['super_admin', 'principal', 'vice_principal']:
+        if principal.has_role(*SCHOOL_ADMIN_ROLES):
             return queryset
         
-        # 学院管理员只能查看本学院的专业
-        if role in ['dean', 'vice_dean']:
-            if teacher.college:
-                return queryset.filter(college=teacher.college)
-            return queryset.none()
-        
-        # 普通教师只能查看所属学院的专业
-        if role in ['teacher', 'head_teacher']:
-            if teacher.college:
-                return queryset.filter(college=teacher.college)
+        # 学院管理员只能查看本学院的专业，普通教师只能查看所属学院的专业
+        if principal.is_college_admin or principal.is_teacher:
+            if principal.personnel_college_id:
+                return queryset.filter(college_id=principal.personnel_college_id)
             return queryset.none()
         
         return queryset.none()
@@ -395,43 +366,8 @@ class MajorViewSet(viewsets.ModelViewSet):
     @transaction.atomic
     @action(detail=False, methods=['post'])
     def import_excel(self, request):
-        """导入专业数据(Excel/CSV)，失败自动回滚"""
-        f = request.FILES.get('file')
-        if not f:
-            return Response({'error': '请上传文件参数 file'}, status=status.HTTP_400_BAD_REQUEST)
-        rows = []
-        try:
-            import pandas as pd
-            df = pd.read_excel(f) if f.name.lower().endswith(('xlsx', 'xls')) else pd.read_csv(f)
-            for _, row in df.iterrows():
-                rows.append({
-                    'code': str(row.get('专业代码')).strip(),
-                    'name': str(row.get('专业名称')).strip(),
-                    'college': int(row.get('所属学院ID')) if row.get('所属学院ID') else None,
-                    'duration_type': str(row.get('学制类型')).strip(),
-                })
-        except Exception:
-            return Response({'error': '文件解析失败，请使用标准模板'}, status=status.HTTP_400_BAD_REQUEST)
-        errors = []
-        created_objs = []
-        for i, data in enumerate(rows, start=1):
-            try:
-                college = College.objects.get(id=data['college'], is_deleted=False)
-                data['college'] = college
-            except Exception:
-                errors.append({'row': i, 'errors': {'college': '所属学院不存在'}})
-                continue
-            serializer = MajorCreateSerializer(data=data)
-            if not serializer.is_valid():
-                errors.append({'row': i, 'errors': serializer.errors})
-                continue
-            obj = serializer.save()
-            created_objs.append(obj)
-            self._log_operation('import', 'majors', obj.id, {}, MajorSerializer(obj).data, request)
-        if errors:
-            transaction.set_rollback(True)
-            return Response({'created': len(created_objs), 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({'created': len(created_objs)})
+        """导入专业数据(Excel/CSV)，整批校验后一次写入，有错误时不导入任何数据"""
+        return _import_excel(request, OrganizationImporter.import_majors, 'majors')
     
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
@@ -455,26 +391,8 @@ class MajorViewSet(viewsets.ModelViewSet):
         return Response(data)
     
     def _log_operation(self, operation_type, table_name, record_id, old_data, new_data, request):
-        """记录操作日志"""
-        OperationLog.objects.create(
-            user_id=request.user.id,
-            operation_type=operation_type,
-            table_name=table_name,
-            record_id=str(record_id),
-            old_data=old_data,
-            new_data=new_data,
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-    
-    def _get_client_ip(self, request):
-        """获取客户端IP地址"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """记录操作日志（事务提交后异步批量写入）"""
+        record_operation(request.user.id, operation_type, table_name, record_id, old_data, new_data, request)
 
 
 class ClassViewSet(viewsets.ModelViewSet):
@@ -514,37 +432,28 @@ class ClassViewSet(viewsets.ModelViewSet):
         """根据用户权限过滤查询集"""
         queryset = super().get_queryset()
         
-        if not self.request.user.is_authenticated:
-            return queryset.none()
+        principal = principal_of(self.request)
         
         # 系统管理员（Django超级用户）可以查看所有班级
-        if getattr(self.request.user, 'is_superuser', False):
+        if principal.is_superuser:
             return queryset
 
-        if not hasattr(self.request.user, 'teacher_profile'):
+        # 以下按人事教师档案判断
+        if principal.employee_id is None:
             return queryset.none()
         
-        teacher = self.request.user.teacher_profile
-        role = getattr(self.request.user.profile, 'role', '')
-        
         # 系统管理员可以查看所有班级
-        if role in ['super_admin', 'principal', 'vice_principal']:
+        if principal.has_role(*SCHOOL_ADMIN_ROLES):
             return queryset
         
-        # 学院管理员只能查看本学院的班级
-        if role in ['dean', 'vice_dean']:
-            if teacher.college:
-                return queryset.filter(major__college=teacher.college)
-            return queryset.none()
-        
         # 班主任只能查看自己管理的班级
-        if role == 'head_teacher':
-            return queryset.filter(head_teacher=teacher)
+        if principal.role == 'head_teacher':
+            return queryset.filter(head_teacher_id=principal.employee_id)
         
-        # 普通教师只能查看所属学院的班级
-        if role == 'teacher':
-            if teacher.college:
-                return queryset.filter(major__college=teacher.college)
+        # 学院管理员只能查看本学院的班级，普通教师只能查看所属学院的班级
+        if principal.is_college_admin or principal.role == 'teacher':
+            if principal.personnel_college_id:
+                return queryset.filter(major__college_id=principal.personnel_college_id)
             return queryset.none()
         
         return queryset.none()
@@ -692,55 +601,8 @@ class ClassViewSet(viewsets.ModelViewSet):
     @transaction.atomic
     @action(detail=False, methods=['post'])
     def import_excel(self, request):
-        """导入班级数据(Excel/CSV)，失败自动回滚"""
-        f = request.FILES.get('file')
-        if not f:
-            return Response({'error': '请上传文件参数 file'}, status=status.HTTP_400_BAD_REQUEST)
-        rows = []
-        try:
-            import pandas as pd
-            df = pd.read_excel(f) if f.name.lower().endswith(('xlsx', 'xls')) else pd.read_csv(f)
-            for _, row in df.iterrows():
-                rows.append({
-                    'major': int(row.get('所属专业ID')) if row.get('所属专业ID') else None,
-                    'enrollment_year': int(row.get('入学年份')) if row.get('入学年份') else None,
-                    'class_number': int(row.get('班级序号')) if row.get('班级序号') else 1,
-                    'head_teacher': str(row.get('班主任工号')).strip() if row.get('班主任工号') else None,
-                })
-        except Exception:
-            return Response({'error': '文件解析失败，请使用标准模板'}, status=status.HTTP_400_BAD_REQUEST)
-        errors = []
-        created_objs = []
-        for i, data in enumerate(rows, start=1):
-            try:
-                major = Major.objects.get(id=data['major'], is_deleted=False)
-                data['major'] = major
-            except Exception:
-                errors.append({'row': i, 'errors': {'major': '所属专业不存在'}})
-                continue
-            if data.get('head_teacher'):
-                from personnel.models import Teacher
-                try:
-                    data['head_teacher'] = Teacher.objects.get(employee_id=data['head_teacher'], is_deleted=False)
-                except Exception:
-                    errors.append({'row': i, 'errors': {'head_teacher': '班主任工号不存在'}})
-                    continue
-            serializer = ClassCreateSerializer(data=data)
-            if not serializer.is_valid():
-                errors.append({'row': i, 'errors': serializer.errors})
-                continue
-            major = serializer.validated_data['major']
-            enrollment_year = serializer.validated_data['enrollment_year']
-            class_number = serializer.validated_data['class_number']
-            duration_label = major.get_duration_label()
-            name = f"{enrollment_year}年{major.name}{duration_label}-{class_number}班"
-            obj = serializer.save(name=name)
-            created_objs.append(obj)
-            self._log_operation('import', 'classes', obj.id, {}, ClassSerializer(obj).data, request)
-        if errors:
-            transaction.set_rollback(True)
-            return Response({'created': len(created_objs), 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
-        return Response({'created': len(created_objs)})
+        """导入班级数据(Excel/CSV)，整批校验后一次写入，有错误时不导入任何数据"""
+        return _import_excel(request, OrganizationImporter.import_classes, 'classes')
     
     @action(detail=False, methods=['get'])
     def available_teachers(self, request):
@@ -772,26 +634,8 @@ class ClassViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     def _log_operation(self, operation_type, table_name, record_id, old_data, new_data, request):
-        """记录操作日志"""
-        OperationLog.objects.create(
-            user_id=request.user.id,
-            operation_type=operation_type,
-            table_name=table_name,
-            record_id=str(record_id),
-            old_data=old_data,
-            new_data=new_data,
-            ip_address=self._get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-    
-    def _get_client_ip(self, request):
-        """获取客户端IP地址"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """记录操作日志（事务提交后异步批量写入）"""
+        record_operation(request.user.id, operation_type, table_name, record_id, old_data, new_data, request)
 
 
 class OrganizationViewSet(viewsets.ViewSet):
@@ -868,77 +712,29 @@ class OrganizationImportView(APIView):
         if not import_type or not csv_data:
             return Response({'error': 'type和csv参数必填'}, status=status.HTTP_400_BAD_REQUEST)
         
-        created_count = 0
-        skipped_count = 0
-        errors = []
-        
+        importer = OrganizationImporter()
+        if import_type == 'colleges':
+            run = importer.import_college_names
+        elif import_type == 'departments':
+            run = importer.import_major_lines
+        else:
+            return Response({'error': '不支持的导入类型'}, status=status.HTTP_400_BAD_REQUEST)
+        if str(request.data.get('background')).lower() == 'true':
+            # 粘贴的 CSV 文本同样暂存为文件，由后台任务按块导入
+            uploaded = ContentFile(csv_data.encode('utf-8'), name=f'{import_type}.csv')
+            return job_accepted(enqueue_import(request, 'organization', {'type': import_type}, uploaded))
+
         lines = csv_data.strip().split('\n')
-        
+
         try:
-            with transaction.atomic():
-                if import_type == 'colleges':
-                    for line in lines:
-                        line = line.strip()
-                        if not line: continue
-                        # Format: Name
-                        name = line
-                        if College.objects.filter(name=name, is_deleted=False).exists():
-                            skipped_count += 1
-                            continue
-                            
-                        # Generate code
-                        existing = College.objects.filter(is_deleted=False).values_list('code', flat=True)
-                        nums = [int(c) for c in existing if isinstance(c, str) and c.isdigit() and len(c)==2]
-                        next_num = (max(nums) + 1) if nums else 1
-                        code = f"{next_num:02d}"
-                        
-                        College.objects.create(name=name, code=code)
-                        created_count += 1
-                        
-                elif import_type == 'departments':
-                    for line in lines:
-                        line = line.strip()
-                        if not line: continue
-                        # Format: Name,CollegeName
-                        parts = line.split(',')
-                        if len(parts) < 2:
-                            errors.append(f'格式错误: {line}')
-                            continue
-                            
-                        name = parts[0].strip()
-                        college_name = parts[1].strip()
-                        
-                        college = College.objects.filter(name=college_name, is_deleted=False).first()
-                        if not college:
-                            errors.append(f'学院不存在: {college_name}')
-                            continue
-                            
-                        if Major.objects.filter(name=name, college=college, is_deleted=False).exists():
-                            skipped_count += 1
-                            continue
-                            
-                        # Generate code
-                        existing = Major.objects.filter(is_deleted=False).values_list('code', flat=True)
-                        nums = [int(c) for c in existing if isinstance(c, str) and c.isdigit() and len(c)==3]
-                        next_num = (max(nums) + 1) if nums else 1
-                        code = f"{next_num:03d}"
-                        while Major.objects.filter(code=code, is_deleted=False).exists():
-                             next_num += 1
-                             code = f"{next_num:03d}"
-                        
-                        Major.objects.create(name=name, college=college, code=code)
-                        created_count += 1
-                        
-                else:
-                    return Response({'error': '不支持的导入类型'}, status=status.HTTP_400_BAD_REQUEST)
-                    
+            result = run(lines)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
-            
+
         return Response({
-            'created': created_count,
-            'skipped': skipped_count,
-            'errors': errors
+            'created': result.created,
+            'skipped': result.skipped,
+            'errors': result.errors
         })
 
 
@@ -990,30 +786,31 @@ class OperationLogViewSet(viewsets.ReadOnlyModelViewSet):
         """根据用户权限过滤查询集"""
         queryset = super().get_queryset()
         
-        if not self.request.user.is_authenticated:
-            return queryset.none()
-        
-        if not hasattr(self.request.user, 'teacher_profile'):
-            return queryset.none()
-        
-        teacher = self.request.user.teacher_profile
+        position_type = principal_of(self.request).position_type
         
         # 系统管理员可以查看所有日志
-        if teacher.position_type == 'super_admin':
+        if position_type == 'super_admin':
             return queryset
         
         # 学院管理员只能查看本学院相关的日志
-        if teacher.position_type in ['dean', 'vice_dean']:
+        if position_type in ['dean', 'vice_dean']:
             # 这里需要更复杂的逻辑来过滤本学院相关的日志
             # 暂时返回用户自己的操作日志
             return queryset.filter(user_id=self.request.user.id)
         
         # 普通教师只能查看自己的操作日志
-        if teacher.position_type in ['teacher', 'head_teacher']:
+        if position_type in ['teacher', 'head_teacher']:
             return queryset.filter(user_id=self.request.user.id)
         
         return queryset.none()
     
+    @action(detail=False, methods=['get'], url_path='write-metrics')
+    def write_metrics(self, request):
+        """操作日志写入队列的运行指标（本进程）"""
+        if not principal_of(request).is_school_admin:
+            return Response({'detail': '无权查看'}, status=403)
+        return Response(audit_log.snapshot())
+
     @action(detail=False, methods=['get'])
     def my_logs(self, request):
         """获取当前用户的操作日志"""
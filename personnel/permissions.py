@@ -1,197 +1,130 @@
 from rest_framework import permissions
-from django.contrib.auth.models import User
+
+from accounts.principal import principal_of
+from .models import Teacher
+
+
+def _same_college(obj, college_id):
+    """对象（教师或关联教师的记录）是否属于指定学院"""
+    if hasattr(obj, 'college_id'):
+        return obj.college_id == college_id
+    elif hasattr(obj, 'teacher'):
+        return obj.teacher.college_id == college_id
+    return False
 
 
 class IsSystemAdmin(permissions.BasePermission):
     """系统管理员权限"""
-    
+
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and hasattr(request.user, 'teacher_profile') and request.user.teacher_profile.position_type == 'super_admin'
+        return principal_of(request).position_type == 'super_admin'
 
 
 class IsCollegeAdmin(permissions.BasePermission):
     """学院管理员权限"""
-    
+
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        return teacher.position_type in ['dean', 'vice_dean']
-    
+        return principal_of(request).position_type in ['dean', 'vice_dean']
+
     def has_object_permission(self, request, view, obj):
         """检查用户是否有权限访问特定对象"""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        
+        principal = principal_of(request)
+
         # 系统管理员有所有权限
-        if teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return True
-        
+
         # 学院管理员只能管理本学院的数据
-        if teacher.position_type in ['dean', 'vice_dean']:
-            if hasattr(obj, 'college'):
-                return obj.college == teacher.college
-            elif hasattr(obj, 'teacher'):
-                return obj.teacher.college == teacher.college
-        
+        if principal.position_type in ['dean', 'vice_dean']:
+            return _same_college(obj, principal.personnel_college_id)
+
         return False
 
 
 class IsTeacher(permissions.BasePermission):
     """教师权限"""
-    
+
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and hasattr(request.user, 'teacher_profile')
-    
+        return principal_of(request).employee_id is not None
+
     def has_object_permission(self, request, view, obj):
         """检查用户是否有权限访问特定对象"""
-        if not request.user or not request.user.is_authenticated:
+        principal = principal_of(request)
+        if principal.employee_id is None:
             return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        
+
         # 系统管理员有所有权限
-        if teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return True
-        
+
         # 学院管理员可以管理本学院的数据
-        if teacher.position_type in ['dean', 'vice_dean']:
-            if hasattr(obj, 'college'):
-                return obj.college == teacher.college
-            elif hasattr(obj, 'teacher'):
-                return obj.teacher.college == teacher.college
-        
+        if principal.position_type in ['dean', 'vice_dean']:
+            return _same_college(obj, principal.personnel_college_id)
+
         # 普通教师只能查看和编辑自己的信息
-        if teacher.position_type in ['teacher', 'head_teacher']:
+        if principal.position_type in ['teacher', 'head_teacher']:
             if isinstance(obj, Teacher):
-                return obj == teacher
-            elif hasattr(obj, 'teacher'):
-                return obj.teacher == teacher
-        
+                return obj.pk == principal.employee_id
+            elif hasattr(obj, 'teacher_id'):
+                return obj.teacher_id == principal.employee_id
+
         return False
 
 
 class TeacherPermission(permissions.BasePermission):
     """教师管理权限"""
-    
+
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        
-        # 系统管理员有所有权限
-        if teacher.position_type == 'super_admin':
-            return True
-        
-        # 学院管理员可以管理本学院的教师
-        if teacher.position_type in ['dean', 'vice_dean']:
-            if request.method in permissions.SAFE_METHODS:
-                return True
-            return True  # 可以创建、更新、删除本学院的教师
-        
+        # 系统管理员有所有权限；学院管理员可以创建、查看、更新、删除本学院的教师；
         # 教师/班主任不能访问教师管理功能（包括列表和详情）
-        if teacher.position_type in ['teacher', 'head_teacher']:
-            return False
-        
-        return False
-    
+        return principal_of(request).position_type in ['super_admin', 'dean', 'vice_dean']
+
     def has_object_permission(self, request, view, obj):
         """检查用户是否有权限访问特定教师对象"""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        current_teacher = request.user.teacher_profile
-        
+        principal = principal_of(request)
+
         # 系统管理员有所有权限
-        if current_teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return True
-        
+
         # 学院管理员可以管理本学院的教师
-        if current_teacher.position_type in ['dean', 'vice_dean']:
-            return obj.college == current_teacher.college
-        
+        if principal.position_type in ['dean', 'vice_dean']:
+            return obj.college_id == principal.personnel_college_id
+
         # 普通教师只能查看和编辑自己的信息
-        if current_teacher.position_type in ['teacher', 'head_teacher']:
-            return obj == current_teacher and request.method in permissions.SAFE_METHODS + ('PUT', 'PATCH')
-        
+        if principal.position_type in ['teacher', 'head_teacher']:
+            return obj.pk == principal.employee_id and request.method in permissions.SAFE_METHODS + ('PUT', 'PATCH')
+
         return False
 
 
 class RolePermission(permissions.BasePermission):
     """角色管理权限"""
-    
+
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        
         # 只有系统管理员可以管理角色
-        return teacher.position_type == 'super_admin'
+        return principal_of(request).position_type == 'super_admin'
 
 
 class UserRolePermission(permissions.BasePermission):
     """用户角色关联权限"""
-    
+
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        teacher = request.user.teacher_profile
-        
-        # 系统管理员有所有权限
-        if teacher.position_type == 'super_admin':
-            return True
-        
-        # 学院管理员可以管理本学院的用户角色
-        if teacher.position_type in ['dean', 'vice_dean']:
-            return True
-        
-        return False
-    
+        # 系统管理员有所有权限；学院管理员可以管理本学院的用户角色
+        return principal_of(request).position_type in ['super_admin', 'dean', 'vice_dean']
+
     def has_object_permission(self, request, view, obj):
         """检查用户是否有权限访问特定用户角色对象"""
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        if not hasattr(request.user, 'teacher_profile'):
-            return False
-        
-        current_teacher = request.user.teacher_profile
-        
+        principal = principal_of(request)
+
         # 系统管理员有所有权限
-        if current_teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return True
-        
-        # 学院管理员可以管理本学院的用户角色
-        if current_teacher.position_type in ['dean', 'vice_dean']:
-            # 检查目标用户是否属于本学院
-            if hasattr(obj.user, 'teacher_profile'):
-                return obj.user.teacher_profile.college == current_teacher.college
-        
-        return False
\ No newline at end of file
+
+        # 学院管理员可以管理本学院的用户角色：检查目标用户是否属于本学院
+        if principal.position_type in ['dean', 'vice_dean']:
+            return Teacher.objects.filter(
+                user_id=obj.user_id, college_id=principal.personnel_college_id
+            ).exists()
+
+        return False
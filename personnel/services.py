@@ -190,12 +190,12 @@ class TeacherService:
             change_reason=change_reason
         )
         try:
-            from organization.models import OperationLog
-            OperationLog.objects.create(
-                user_id=getattr(changed_by, 'id', None) or 0,
-                operation_type='update',
-                table_name='teachers',
-                record_id=str(teacher.employee_id),
+            from organization.audit import record_operation
+            record_operation(
+                getattr(changed_by, 'id', None),
+                'update',
+                'teachers',
+                teacher.employee_id,
                 old_data={'position_type': old_position, 'college_id': getattr(old_college, 'id', None)},
                 new_data={'position_type': new_position, 'college_id': getattr(teacher.college, 'id', None)}
             )
@@ -379,62 +379,9 @@ class OrganizationService:
     
     def get_organization_tree(self, college_id=None):
         """获取组织架构树"""
-        from organization.models import College, Major, Class
+        from organization.services import get_organization_tree
         
-        if college_id:
-            colleges = College.objects.filter(id=college_id, is_deleted=False)
-        else:
-            colleges = College.objects.filter(is_deleted=False)
-        
-        tree_data = []
-        
-        for college in colleges:
-            college_data = {
-                'id': college.id,
-                'code': college.code,
-                'name': college.name,
-                'type': 'college',
-                'status': college.status,
-                'establishment_date': college.establishment_date,
-                'children': []
-            }
-            
-            # 获取学院下的专业
-            majors = Major.objects.filter(college=college, is_deleted=False)
-            
-            for major in majors:
-                major_data = {
-                    'id': major.id,
-                    'code': major.code,
-                    'name': major.name,
-                    'type': 'major',
-                    'duration_type': major.duration_type,
-                    'duration_label': major.get_duration_label(),
-                    'children': []
-                }
-                
-                # 获取专业下的班级
-                classes = Class.objects.filter(major=major, is_deleted=False)
-                
-                for school_class in classes:
-                    class_data = {
-                        'id': school_class.id,
-                        'name': school_class.name,
-                        'type': 'class',
-                        'enrollment_year': school_class.enrollment_year,
-                        'class_number': school_class.class_number,
-                        'head_teacher': {
-                            'id': school_class.head_teacher.employee_id if school_class.head_teacher else None,
-                            'name': school_class.head_teacher.name if school_class.head_teacher else None
-                        } if school_class.head_teacher else None
-                    }
-                    major_data['children'].append(class_data)
-                
-                college_data['children'].append(major_data)
-            
-            tree_data.append(college_data)
-        
-        return tree_data
+        return get_organization_tree(college_id)
     
     def validate_organization_hierarchy(self, college_id=None, major_id=None, class_id=None):
         """验证组织架构层级关系"""
@@ -14,6 +14,7 @@ from .serializers import (
 )
 from .permissions import TeacherPermission, RolePermission, UserRolePermission
 from .services import TeacherService
+from accounts.principal import principal_of
 
 
 class TeacherViewSet(viewsets.ModelViewSet):
@@ -41,25 +42,19 @@ class TeacherViewSet(viewsets.ModelViewSet):
         """根据用户权限过滤查询集"""
         queryset = super().get_queryset()
         
-        if not self.request.user.is_authenticated:
-            return queryset.none()
-        
-        if not hasattr(self.request.user, 'teacher_profile'):
-            return queryset.none()
-        
-        teacher = self.request.user.teacher_profile
+        principal = principal_of(self.request)
         
         # 系统管理员可以查看所有教师
-        if teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return queryset
         
         # 学院管理员只能查看本学院的教师
-        if teacher.position_type in ['dean', 'vice_dean']:
-            return queryset.filter(college=teacher.college)
+        if principal.position_type in ['dean', 'vice_dean']:
+            return queryset.filter(college_id=principal.personnel_college_id)
         
         # 普通教师只能查看自己的信息
-        if teacher.position_type in ['teacher', 'head_teacher']:
-            return queryset.filter(employee_id=teacher.employee_id)
+        if principal.position_type in ['teacher', 'head_teacher']:
+            return queryset.filter(employee_id=principal.employee_id)
         
         return queryset.none()
     
@@ -234,29 +229,24 @@ class TeacherPositionHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         """根据用户权限过滤查询集"""
         queryset = super().get_queryset()
         
-        if not self.request.user.is_authenticated:
-            return queryset.none()
-        
-        if not hasattr(self.request.user, 'teacher_profile'):
-            return queryset.none()
-        
-        teacher = self.request.user.teacher_profile
+        principal = principal_of(self.request)
         
         # 系统管理员可以查看所有历史
-        if teacher.position_type == 'super_admin':
+        if principal.position_type == 'super_admin':
             return queryset
         
         # 学院管理员只能查看本学院的历史
-        if teacher.position_type in ['dean', 'vice_dean']:
+        if principal.position_type in ['dean', 'vice_dean']:
+            college_id = principal.personnel_college_id
             return queryset.filter(
-                models.Q(teacher__college=teacher.college) |
-                models.Q(old_college=teacher.college) |
-                models.Q(new_college=teacher.college)
+                models.Q(teacher__college_id=college_id) |
+                models.Q(old_college_id=college_id) |
+                models.Q(new_college_id=college_id)
             )
         
         # 普通教师只能查看自己的历史
-        if teacher.position_type in ['teacher', 'head_teacher']:
-            return queryset.filter(teacher=teacher)
+        if principal.position_type in ['teacher', 'head_teacher']:
+            return queryset.filter(teacher_id=principal.employee_id)
         
         return queryset.none()
 
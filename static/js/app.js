@@ -555,4 +555,31 @@ function initGlobalSearch() {
     });
 }
 
+// 考勤风险标记：按学生ID批量读取（由夜间批处理生成），返回 {学生ID: [标记]}
+async function fetchRiskFlags(studentIds) {
+    const ids = [...new Set((studentIds || []).filter(id => id))];
+    const map = {};
+    if (ids.length === 0) return map;
+    // 分批请求，避免学生较多时 URL 过长
+    for (let i = 0; i < ids.length; i += 200) {
+        try {
+            const r = await api('/api/attendance/risk-flags/?students=' + ids.slice(i, i + 200).join(','));
+            (Array.isArray(r) ? r : (r.results || [])).forEach(f => {
+                (map[f.student] = map[f.student] || []).push(f);
+            });
+        } catch (e) {
+            console.error('加载考勤风险标记失败:', e);
+            break;
+        }
+    }
+    return map;
+}
+
+function riskBadge(flags) {
+    if (!flags || flags.length === 0) return '';
+    const danger = flags.some(f => f.level === 'danger');
+    const title = flags.map(f => `${f.course_name}：${f.kind_display}（${Math.round(f.rate * 100)}%）`).join('\n');
+    return ` <span class="badge ${danger ? 'bg-danger' : 'bg-warning text-dark'}" title="${title}">${danger ? '严重' : '预警'}</span>`;
+}
+
 window.addEventListener('DOMContentLoaded', initGlobalSearch);
@@ -156,9 +156,12 @@ async function fetchAttendance(params) {
     }
 }
 
+// 当前列表中学生的考勤风险标记 {学生ID: [标记]}
+let attRiskFlags = {};
+
 function mkRow(att, canEdit) {
     const sid = att.student_id || '-';
-    const name = att.student_name || '-';
+    const name = (att.student_name || '-') + riskBadge(attRiskFlags[att.student]);
     const courseName = att.course_name || '-';
     const college = att.college_name || '-';
     const major = att.major_name || '-';
@@ -167,8 +170,10 @@ function mkRow(att, canEdit) {
     const statusDisplay = att.status_display || (status === 'present' ? '正常' : status === 'late' ? '迟到' : status === 'absent' ? '缺勤' : '请假');
     const color = statusColor(status);
     const remark = att.remark || '';
+    // 虚拟默认记录（id 为 null）没有对应的数据库记录，修改时按 学生+课程安排+日期 新建
+    const keyAttrs = `data-att-id="${att.id || ''}" data-student="${att.student}" data-schedule="${att.schedule}" data-date="${att.date}"`;
     const statusCell = canEdit ? 
-        `<select data-att-id="${att.id}" class="form-select form-select-sm" onchange="onStatusChange(this)" style="min-width:100px;">
+        `<select ${keyAttrs} class="form-select form-select-sm" onchange="onStatusChange(this)" style="min-width:100px;">
             <option value="present" ${status === 'present' ? 'selected' : ''}>正常</option>
             <option value="late" ${status === 'late' ? 'selected' : ''}>迟到</option>
             <option value="absent" ${status === 'absent' ? 'selected' : ''}>缺勤</option>
@@ -176,7 +181,7 @@ function mkRow(att, canEdit) {
         </select>` :
         `<span style="display:inline-block;padding:4px 8px;border-radius:4px;background:${color};color:#fff;font-size:0.875rem;">${statusDisplay}</span>`;
     const remarkCell = canEdit ? 
-        `<input type="text" data-att-id="${att.id}" class="form-control form-control-sm" value="${remark}" placeholder="填写备注" onblur="onRemarkChange(this)" style="min-width:150px;">` :
+        `<input type="text" ${keyAttrs} class="form-control form-control-sm" value="${remark}" placeholder="填写备注" onblur="onRemarkChange(this)" style="min-width:150px;">` :
         `<span>${remark || '-'}</span>`;
     return `<tr>
         <td>${sid}</td>
@@ -232,6 +237,8 @@ async function renderAttendance() {
     };
     const attRecs = await fetchAttendance(params);
     let records = Array.isArray(attRecs) ? attRecs : (attRecs.results || []);
+    // 未同时指定课程和日期时，接口按 (日期, ID) 键集分页返回 {count, count_exact, next, results}
+    attPage = Array.isArray(attRecs) ? null : { count: attRecs.count, exact: attRecs.count_exact, next: attRecs.next };
     if (scheduleIds.length > 1) {
         const statusPriority = { 'absent': 3, 'late': 2, 'leave': 1, 'present': 0 };
         const seen = new Map();
@@ -251,9 +258,9 @@ async function renderAttendance() {
         records = Array.from(seen.values());
     }
     const canEdit = attRole.isAdmin || attRole.isTeacher;
+    attRiskFlags = await fetchRiskFlags(records.map(att => att.student));
     const rows = records.map(att => mkRow(att, canEdit));
     const tbody = document.getElementById('att-rows');
-    const total = document.getElementById('att-total');
     if (tbody) {
         if (rows.length === 0) {
             tbody.innerHTML = '<tr><td colspan="8" class="text-center text-muted py-3">暂无考勤记录</td></tr>';
@@ -261,7 +268,58 @@ async function renderAttendance() {
             tbody.innerHTML = rows.join('');
         }
     }
-    if (total) total.textContent = '共 ' + records.length + ' 条记录';
+    attLoadedCount = records.length;
+    renderAttendanceTotal();
+}
+
+// 分页列表的总数与"加载更多"
+let attPage = null;
+let attLoadedCount = 0;
+
+function renderAttendanceTotal() {
+    const total = document.getElementById('att-total');
+    if (!total) return;
+    if (!attPage) {
+        total.textContent = '共 ' + attLoadedCount + ' 条记录';
+        return;
+    }
+    let text = attPage.count == null ? '' : '共 ' + attPage.count + (attPage.exact ? '' : '+') + ' 条记录，';
+    text += '已显示 ' + attLoadedCount + ' 条';
+    total.innerHTML = text + (attPage.next ? ' <a href="javascript:void(0)" onclick="loadMoreAttendance()">加载更多</a>' : '');
+}
+
+async function loadMoreAttendance() {
+    if (!attPage || !attPage.next) return;
+    let resp;
+    try {
+        resp = await api(attPage.next);
+    } catch (e) {
+        console.error('加载更多考勤记录失败:', e);
+        return;
+    }
+    const records = resp.results || [];
+    Object.assign(attRiskFlags, await fetchRiskFlags(records.map(att => att.student)));
+    const canEdit = attRole.isAdmin || attRole.isTeacher;
+    const tbody = document.getElementById('att-rows');
+    if (tbody && records.length) tbody.insertAdjacentHTML('beforeend', records.map(att => mkRow(att, canEdit)).join(''));
+    attPage.next = resp.next || null;
+    attLoadedCount += records.length;
+    renderAttendanceTotal();
+}
+
+// 导出：按当前筛选条件与导出日期范围下载（服务端流式生成，不经过页面加载）
+function exportAttendance(fileType, layout) {
+    const p = new URLSearchParams({ file_type: fileType, layout: layout });
+    const start = document.getElementById('att-export-start')?.value;
+    const end = document.getElementById('att-export-end')?.value;
+    if (start) p.append('start', start);
+    if (end) p.append('end', end);
+    const filters = { college: 'att-college', department: 'att-dept', class: 'att-class', student: 'att-student', status: 'att-status' };
+    Object.entries(filters).forEach(([key, id]) => {
+        const value = document.getElementById(id)?.value;
+        if (value) p.append(key, value);
+    });
+    window.location.href = '/api/attendance/records/export/?' + p.toString();
 }
 
 // 初始化默认筛选：学院、专业、班级、课程
@@ -358,11 +416,24 @@ function notifyAttendanceUpdate(attendanceId, studentId) {
     }
 }
 
+// 保存单条考勤：已有记录用 PATCH，虚拟默认记录用 POST 新建
+function saveAttendanceField(el, fields) {
+    const attId = Number(el.getAttribute('data-att-id'));
+    if (attId) {
+        return api('/api/attendance/records/' + attId + '/', 'PATCH', fields);
+    }
+    return api('/api/attendance/records/', 'POST', Object.assign({
+        student: Number(el.getAttribute('data-student')),
+        schedule: Number(el.getAttribute('data-schedule')),
+        date: el.getAttribute('data-date'),
+    }, fields));
+}
+
 async function onStatusChange(sel) {
     const attId = Number(sel.getAttribute('data-att-id'));
     const status = sel.value;
     try {
-        const response = await api('/api/attendance/records/' + attId + '/', 'PATCH', { status });
+        const response = await saveAttendanceField(sel, { status });
         // 从响应中获取学生ID
         const studentId = response?.student || null;
         // 发送更新通知
@@ -377,7 +448,7 @@ async function onRemarkChange(input) {
     const attId = Number(input.getAttribute('data-att-id'));
     const remark = input.value || '';
     try {
-        const response = await api('/api/attendance/records/' + attId + '/', 'PATCH', { remark });
+        const response = await saveAttendanceField(input, { remark });
         // 从响应中获取学生ID
         const studentId = response?.student || null;
         // 发送更新通知
@@ -69,6 +69,7 @@ async function searchStudents() {
         const r = await api('/api/accounts/students/?' + p.toString());
         const list = Array.isArray(r) ? r : (r.results || []); 
         const count = list.length;
+        const riskFlags = await fetchRiskFlags(list.map(x => x.id));
         
         if (rows) {
             if (list.length === 0) {
@@ -78,7 +79,7 @@ async function searchStudents() {
                     <tr>
                         <td class="ps-3"><input type="checkbox" class="form-check-input student-check" value="${x.id}"></td>
                         <td>${x.student_id}</td>
-                        <td>${(x.user_profile && x.user_profile.user && x.user_profile.user.first_name) || (x.user_profile && x.user_profile.user && x.user_profile.user.username) || '-'}</td>
+                        <td>${(x.user_profile && x.user_profile.user && x.user_profile.user.first_name) || (x.user_profile && x.user_profile.user && x.user_profile.user.username) || '-'}${riskBadge(riskFlags[x.id])}</td>
                         <td>${x.gender_display || '-'}</td>
                         <td>${x.class_name || x.school_class || '-'}</td>
                         <td>${x.status || '-'}</td>